@@ -0,0 +1,104 @@
+"""Content-addressed cache of LLM analyses."""
+import hashlib
+import json
+import re
+from typing import Iterable, Optional
+
+from cache_store import SQLiteCache
+from config import get_settings
+
+settings = get_settings()
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_cache: Optional[SQLiteCache] = None
+
+
+def get_cache() -> SQLiteCache:
+    """Get the process-wide analysis cache, opening it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = SQLiteCache(
+            settings.analysis_cache_path,
+            table="analysis_cache",
+            max_entries=settings.analysis_cache_max_entries,
+        )
+    return _cache
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    """Collapse whitespace so formatting-only differences share an entry."""
+    return _WHITESPACE_RE.sub(" ", value or "").strip()
+
+
+def _normalize_hashtags(hashtags: Optional[Iterable[str]]) -> list[str]:
+    """Lower-case, de-duplicated, sorted hashtags without the leading #."""
+    return sorted({tag.lstrip("#").strip().lower() for tag in hashtags or () if tag and tag.strip("# ")})
+
+
+def cache_key(model: str, prompt_version: str, **inputs) -> str:
+    """
+    Hash the model, prompt template version and normalised inputs.
+
+    Hashtags are compared as a set; every other input as whitespace-collapsed
+    text, so a reposted or resubmitted video with the same content maps to
+    the same key.
+    """
+    normalized = {
+        name: _normalize_hashtags(value) if name == "hashtags" else _normalize_text(value)
+        for name, value in sorted(inputs.items())
+    }
+    payload = json.dumps(
+        {"model": model, "prompt_version": prompt_version, "inputs": normalized},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> Optional[dict]:
+    """Return a cached analysis and count the hit or miss; cache errors are a miss."""
+    try:
+        cache = get_cache()
+        analysis = cache.get(key)
+        cache.incr_stat("hits" if analysis is not None else "misses")
+        return analysis
+    except Exception as e:
+        print(f"Analysis cache error: {e}")
+        return None
+
+
+def get_any(keys: Iterable[str]) -> Optional[dict]:
+    """get() for the first of several keys that is cached, counting one hit or miss."""
+    keys = list(keys)
+    try:
+        cache = get_cache()
+        found = cache.get_many(keys)
+        analysis = next((found[key] for key in keys if key in found), None)
+        cache.incr_stat("hits" if analysis is not None else "misses")
+        return analysis
+    except Exception as e:
+        print(f"Analysis cache error: {e}")
+        return None
+
+
+def put(key: str, analysis: dict) -> None:
+    """Store an analysis, ignoring cache errors."""
+    try:
+        get_cache().set(key, analysis)
+    except Exception as e:
+        print(f"Analysis cache error: {e}")
+
+
+def get_stats() -> dict:
+    """Hit/miss counters, hit rate and current size."""
+    cache = get_cache()
+    stats = cache.get_stats()
+    hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        "entries": len(cache),
+        "max_entries": cache.max_entries,
+    }
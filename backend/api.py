@@ -1,18 +1,29 @@
 """FastAPI backend for dashboard API."""
+import json
+from datetime import datetime
 from typing import List, Optional
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 
-from database import SessionLocal, Video, ChatMessage, init_db
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import load_only
+
+from database import ANALYSIS_FIELDS, SUMMARY_FIELDS, VIDEO_FIELDS, SessionLocal, Video, ChatMessage, init_db
+from http_client import aclose_clients
+from pagination import InvalidCursor, decode_cursor, encode_cursor, get_total_cache
+import search_index
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database on startup."""
+    """Initialize database on startup and close pooled HTTP clients on shutdown."""
     init_db()
     yield
+    await aclose_clients()
 
 
 app = FastAPI(title="Tikodea API", version="1.0.0", lifespan=lifespan)
@@ -33,6 +44,51 @@ async def health():
     return {"status": "healthy", "service": "tikodea-api"}
 
 
+@app.get("/api/metrics/rate-limits")
+async def rate_limit_metrics():
+    """Per-provider rate limiter wait-time metrics."""
+    import rate_limiter
+    return {"providers": rate_limiter.get_metrics()}
+
+
+@app.get("/api/metrics/analysis-cache")
+async def analysis_cache_metrics():
+    """LLM analysis cache hit/miss counters."""
+    import analysis_cache
+    return analysis_cache.get_stats()
+
+
+@app.get("/api/metrics/llm")
+async def llm_metrics(hours: int = Query(24, ge=1, le=24 * 30)):
+    """Per task and model LLM calls, tokens and cost, plus model health."""
+    import model_router
+    db = SessionLocal()
+    try:
+        return model_router.get_usage(db, hours)
+    finally:
+        db.close()
+
+
+def _list_fields(fields: Optional[str]) -> Optional[tuple]:
+    """
+    Parse the fields= parameter of a list endpoint.
+
+    "summary" (the default) is the feed card projection plus each lens's
+    summary, "full" (returned as None) is the complete to_dict(), and
+    anything else is a comma-separated list of to_dict() keys and/or
+    "summaries".
+    """
+    if not fields or fields == "summary":
+        return (*SUMMARY_FIELDS, "summaries")
+    if fields == "full":
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in VIDEO_FIELDS and name != "summaries"]
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown) or fields}")
+    return names
+
+
 # Video endpoints
 @app.get("/api/videos")
 async def list_videos(
@@ -41,8 +97,24 @@ async def list_videos(
     favorites_only: bool = False,
     search: Optional[str] = None,
     tag: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    fields: Optional[str] = None,
 ):
-    """List videos with optional filtering."""
+    """
+    List videos with optional filtering.
+
+    Rows are a summary projection by default (see _list_fields); only the
+    projected columns are read from the database, so the payload scales
+    with the page size rather than transcript length. Use
+    /api/videos/{id} for full detail.
+
+    Pages by skip/limit, or by cursor: pass a response's next_cursor to get
+    the rows after it, which costs the same however deep the page is. The
+    total is only returned with include_total=true: counted exactly in skip
+    mode, and from a short-lived per-filter cache in cursor mode.
+    """
+    projection = _list_fields(fields)
     db = SessionLocal()
     try:
         query = db.query(Video)
@@ -50,7 +122,11 @@ async def list_videos(
         if favorites_only:
             query = query.filter(Video.is_favorite == True)
 
-        if search:
+        matches = search_index.search_matches(db, search) if search else None
+        if matches is not None:
+            # Full-text index, best BM25 match first
+            query = query.join(matches, matches.c.rowid == Video.id)
+        elif search:
             search_term = f"%{search}%"
             query = query.filter(
                 (Video.title.ilike(search_term))
@@ -62,15 +138,76 @@ async def list_videos(
             # Search in hashtags JSON array
             query = query.filter(Video.hashtags.contains([tag]))
 
-        videos = query.order_by(Video.created_at.desc()).offset(skip).limit(limit).all()
-        total = query.count()
-
-        return {
-            "videos": [v.to_dict() for v in videos],
-            "total": total,
-            "skip": skip,
-            "limit": limit,
-        }
+        filtered = query
+        # Sort keys are unique (id breaks ties) so a cursor marks an exact position
+        if matches is not None:
+            kind, keys = "rank", (matches.c.rank, Video.id)
+            query = query.order_by(matches.c.rank, Video.id)
+        else:
+            kind, keys = "feed", (Video.created_at, Video.id)
+            query = query.order_by(Video.created_at.desc(), Video.id.desc())
+
+        if cursor:
+            try:
+                after = decode_cursor(cursor, kind)
+                if kind == "feed":
+                    after[0] = datetime.fromisoformat(after[0])
+            except (InvalidCursor, TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            position = tuple_(*keys)
+            query = query.filter(position > tuple_(*after) if kind == "rank" else position < tuple_(*after))
+        else:
+            query = query.offset(skip)
+
+        # Leave unprojected columns unloaded; id and created_at are needed for the cursor
+        columns = None
+        if projection is not None:
+            columns = tuple(name for name in projection if name != "summaries")
+            loaded = {"id", "created_at", *columns}
+            query = query.options(load_only(*(getattr(Video, name) for name in loaded)))
+
+        extras = {}
+        if matches is not None:
+            extras["snippet"] = matches.c.snippet
+            extras["rank"] = matches.c.rank
+        if projection is not None and "summaries" in projection:
+            # Pulled out of the JSON in SQL so the analysis blobs aren't loaded
+            for name in ANALYSIS_FIELDS:
+                extras[name] = func.json_extract(getattr(Video, name), "$.summary")
+
+        # One extra row tells us whether there is a next page
+        rows = query.add_columns(*extras.values()).limit(limit + 1).all()
+        if not extras:
+            rows = [(video,) for video in rows]
+
+        videos = []
+        for video, *values in rows[:limit]:
+            extra = dict(zip(extras, values))
+            item = video.to_dict(columns)
+            if "snippet" in extra:
+                item["snippet"] = extra["snippet"]
+            if projection is not None and "summaries" in projection:
+                item["summaries"] = {name.removesuffix("_analysis"): extra[name] for name in ANALYSIS_FIELDS}
+            videos.append(item)
+
+        next_cursor = None
+        if len(rows) > limit:
+            video, *values = rows[limit - 1]
+            extra = dict(zip(extras, values))
+            last = (extra["rank"], video.id) if kind == "rank" else (video.created_at.isoformat(), video.id)
+            next_cursor = encode_cursor(kind, *last)
+
+        # Count ids directly rather than wrapping the full row select
+        count = filtered.with_entities(func.count(Video.id)).scalar
+        response = {"videos": videos, "limit": limit, "next_cursor": next_cursor}
+        if cursor is None:
+            response["skip"] = skip
+            if include_total:
+                response["total"] = count()
+        elif include_total:
+            key = (favorites_only, search, tag)
+            response["total"] = get_total_cache().get(key, count)
+        return response
     finally:
         db.close()
 
@@ -126,6 +263,31 @@ async def update_tags(video_id: int, update: TagUpdate):
         db.close()
 
 
+@app.post("/api/videos/{video_id}/analysis/{lens}")
+async def rerun_lens(video_id: int, lens: str):
+    """Re-run a single analysis lens for a stored video and save the result."""
+    from llm_analyzer import LENSES, reanalyze_lens_async
+
+    if lens not in LENSES:
+        raise HTTPException(status_code=404, detail=f"Unknown lens: {lens}")
+
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if not video:
+            raise HTTPException(status_code=404, detail="Video not found")
+
+        result = await reanalyze_lens_async(video, lens)
+        if "error" in result:
+            raise HTTPException(status_code=502, detail=f"Lens analysis failed: {result['error']}")
+
+        setattr(video, f"{lens}_analysis", result)
+        db.commit()
+        return {"id": video_id, "lens": lens, "analysis": result}
+    finally:
+        db.close()
+
+
 # Chat endpoints
 class ChatRequest(BaseModel):
     message: str
@@ -153,7 +315,7 @@ async def get_chat_history(video_id: int):
 
 
 @app.post("/api/videos/{video_id}/chat")
-async def send_chat_message(video_id: int, request: ChatRequest):
+async def send_chat_message(video_id: int, request: ChatRequest, background_tasks: BackgroundTasks):
     """Send a chat message and get AI response."""
     db = SessionLocal()
     try:
@@ -161,25 +323,95 @@ async def send_chat_message(video_id: int, request: ChatRequest):
         if not video:
             raise HTTPException(status_code=404, detail="Video not found")
 
+        # Prompt from stored context, rolling summary and recent turns
+        from chat_context import build_chat_messages, fold_summary
+        messages = build_chat_messages(db, video, request.message)
+
         # Save user message
         user_msg = ChatMessage(video_id=video_id, role="user", content=request.message)
         db.add(user_msg)
         db.commit()
 
-        # Get AI response
-        from llm_analyzer import chat_with_video
-        response = chat_with_video(video, request.message)
+        # Get AI response without blocking the event loop
+        from llm_analyzer import chat_async
+        response = await chat_async(messages)
 
         # Save assistant message
         assistant_msg = ChatMessage(video_id=video_id, role="assistant", content=response)
         db.add(assistant_msg)
         db.commit()
 
+        # Update the rolling summary once the reply is on its way
+        background_tasks.add_task(fold_summary, video_id)
         return {"role": "assistant", "content": response}
     finally:
         db.close()
 
 
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/videos/{video_id}/chat/stream")
+async def stream_chat_message(video_id: int, request: ChatRequest):
+    """
+    Send a chat message and stream the AI response as Server-Sent Events.
+
+    Emits "delta" events ({"content": text}) as tokens arrive, then one
+    "done" event with the saved assistant message, or an "error" event.
+    The user message is saved together with the reply, so a stream that
+    fails before any output leaves no unanswered turn in the history.
+    """
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if not video:
+            raise HTTPException(status_code=404, detail="Video not found")
+
+        from chat_context import build_chat_messages, fold_summary
+        messages = build_chat_messages(db, video, request.message)
+    finally:
+        db.close()
+
+    async def events():
+        from llm_analyzer import stream_chat
+
+        parts = []
+        try:
+            async for text in stream_chat(messages):
+                parts.append(text)
+                yield _sse("delta", {"content": text})
+        except Exception as e:
+            yield _sse("error", {"detail": f"Error generating response: {e}"})
+            if not parts:
+                return
+            parts.append("\n\n[response interrupted]")
+
+        # Save the exchange once the stream has finished
+        db = SessionLocal()
+        try:
+            assistant_msg = ChatMessage(video_id=video_id, role="assistant", content="".join(parts).strip())
+            db.add(ChatMessage(video_id=video_id, role="user", content=request.message))
+            db.add(assistant_msg)
+            db.commit()
+            yield _sse("done", {
+                "role": "assistant",
+                "content": assistant_msg.content,
+                "created_at": assistant_msg.created_at.isoformat(),
+            })
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Update the rolling summary after the stream has finished
+        background=BackgroundTask(fold_summary, video_id),
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Re-process videos in bulk (failed or never analysed).
+
+Videos are queued in batches so they share scrapes and LLM requests, at
+backfill priority so scarce provider quota is paced (see quota_planner).
+
+Usage: python backfill.py [--status failed] [--batch-size 5] [--limit 100] [--dry-run]
+"""
+import argparse
+
+from config import get_settings
+from database import SessionLocal, Video
+
+settings = get_settings()
+
+
+def find_videos(db, statuses: list[str], limit: int = None) -> list[int]:
+    """IDs of primary videos in the given statuses, oldest first."""
+    query = (
+        db.query(Video.id)
+        .filter(Video.status.in_(statuses), Video.coalesced_into_id.is_(None))
+        .order_by(Video.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    return [video_id for (video_id,) in query.all()]
+
+
+def main():
+    """Queue matching videos in batches."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--status", action="append", help="status to re-process (repeatable, default: failed)")
+    parser.add_argument("--batch-size", type=int, default=settings.analysis_batch_size)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        video_ids = find_videos(db, args.status or ["failed"], args.limit)
+    finally:
+        db.close()
+
+    batches = [video_ids[i:i + args.batch_size] for i in range(0, len(video_ids), args.batch_size)]
+    print(f"{len(video_ids)} video(s) in {len(batches)} batch(es)")
+    if args.dry_run:
+        return
+
+    from queue_manager import enqueue_video_batch
+    db = SessionLocal()
+    try:
+        for batch in batches:
+            job_id = enqueue_video_batch(batch)
+            # Lets duplicate submissions wait on the batch instead of re-queuing
+            db.query(Video).filter(Video.id.in_(batch)).update({Video.job_id: job_id}, synchronize_session=False)
+            db.commit()
+            print(f"Queued {batch} as job {job_id}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Compare SQLite storage profiles under concurrent reads and writes.
+
+Reader processes run the video list query the API serves while writer
+processes update videos and add chat messages, as workers and the API do.
+Each profile gets a fresh database file; throughput and "database is
+locked" errors are reported per profile.
+
+Usage: python benchmark_db.py [--readers 4] [--writers 2] [--seconds 5] [--videos 2000]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+PROFILES = ("default", "tuned")
+
+
+def _engine(path: str, profile: str, role: str):
+    from database import create_db_engine
+    return create_db_engine(f"sqlite:///{path}", profile=profile, role=role)
+
+
+def seed(path: str, profile: str, videos: int) -> None:
+    """Create the schema and some completed videos."""
+    from sqlalchemy.orm import sessionmaker
+    from database import Base, Video
+
+    engine = _engine(path, profile, "api")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all(
+        Video(
+            tiktok_url=f"https://www.tiktok.com/@bench/video/{i}",
+            title=f"Video {i}",
+            transcript="words " * 200,
+            content_analysis={"summary": "x" * 200},
+            status="completed",
+        )
+        for i in range(videos)
+    )
+    db.commit()
+    db.close()
+    engine.dispose()
+
+
+def run_client(path: str, profile: str, kind: str, seconds: float, videos: int, results) -> None:
+    """Run reads or writes until the deadline and report (ops, locked errors)."""
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import sessionmaker
+    from database import ChatMessage, Video
+
+    engine = _engine(path, profile, "api" if kind == "read" else "worker")
+    db = sessionmaker(bind=engine)()
+    ops = locked = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if kind == "read":
+                db.query(Video).order_by(Video.created_at.desc()).offset(random.randrange(videos - 20)).limit(20).all()
+            else:
+                video = db.get(Video, random.randrange(1, videos + 1))
+                video.view_count = (video.view_count or 0) + 1
+                db.add(ChatMessage(video_id=video.id, role="user", content="benchmark message"))
+                db.commit()
+            ops += 1
+        except OperationalError as e:
+            db.rollback()
+            if "locked" not in str(e):
+                raise
+            locked += 1
+    db.close()
+    engine.dispose()
+    results.put((kind, ops, locked))
+
+
+def bench(profile: str, readers: int, writers: int, seconds: float, videos: int) -> dict:
+    """Run one profile against a fresh database file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path, profile, videos)
+
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(target=run_client, args=(path, profile, kind, seconds, videos, results))
+            for kind in ["read"] * readers + ["write"] * writers
+        ]
+        for proc in procs:
+            proc.start()
+        totals = {"read": [0, 0], "write": [0, 0]}
+        for _ in procs:
+            kind, ops, locked = results.get()
+            totals[kind][0] += ops
+            totals[kind][1] += locked
+        for proc in procs:
+            proc.join()
+
+    return {
+        "reads_per_sec": totals["read"][0] / seconds,
+        "writes_per_sec": totals["write"][0] / seconds,
+        "locked_errors": totals["read"][1] + totals["write"][1],
+    }
+
+
+def main():
+    """Benchmark every profile and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--videos", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{args.readers} reader(s), {args.writers} writer(s), {args.seconds:g}s per profile\n")
+    print(f"{'profile':<10} {'reads/s':>10} {'writes/s':>10} {'locked':>8}")
+    for profile in PROFILES:
+        result = bench(profile, args.readers, args.writers, args.seconds, args.videos)
+        print(
+            f"{profile:<10} {result['reads_per_sec']:>10.0f} "
+            f"{result['writes_per_sec']:>10.0f} {result['locked_errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
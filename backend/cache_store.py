@@ -0,0 +1,120 @@
+"""SQLite-backed key/value cache shared by every process on the host."""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+class SQLiteCache:
+    """
+    Size-bounded JSON cache stored in a SQLite file.
+
+    TTLs are applied on read, so one table can hold entries with different
+    lifetimes. When the table grows past max_entries the least recently used
+    rows are evicted. Named counters (e.g. hits/misses) live in a side table
+    so every process sees the same totals.
+    """
+
+    def __init__(self, path: str, table: str = "cache", max_entries: int = 10000):
+        self.path = str(Path(path))
+        self.table = table
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        """Create the cache table and LRU index if missing."""
+        conn = self._connect()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed_at ON {self.table} (accessed_at)"
+        )
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table}_stats ("
+            "name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[dict]:
+        """Return the cached value, or None if missing or older than max_age seconds."""
+        return self.get_many([key], max_age).get(key)
+
+    def get_many(self, keys: Iterable[str], max_age: Optional[float] = None) -> dict:
+        """Return {key: value} for every fresh key in a single query."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        conn = self._connect()
+        placeholders = ",".join("?" * len(keys))
+        rows = conn.execute(
+            f"SELECT key, value, created_at FROM {self.table} WHERE key IN ({placeholders})",
+            keys,
+        ).fetchall()
+
+        fresh = {}
+        for key, value, created_at in rows:
+            if max_age is not None and now - created_at > max_age:
+                continue
+            fresh[key] = json.loads(value)
+
+        if fresh:
+            conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key IN ({','.join('?' * len(fresh))})",
+                [now, *fresh],
+            )
+        return fresh
+
+    def set(self, key: str, value: dict) -> None:
+        """Store a value, evicting least recently used rows past max_entries."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now, now),
+        )
+        conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def delete(self, key: str) -> None:
+        """Remove a single entry."""
+        self._connect().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._connect().execute(f"DELETE FROM {self.table}")
+
+    def incr_stat(self, name: str, amount: int = 1) -> None:
+        """Add to a named counter."""
+        self._connect().execute(
+            f"INSERT INTO {self.table}_stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def get_stats(self) -> dict[str, int]:
+        """Return every named counter."""
+        return dict(self._connect().execute(f"SELECT name, value FROM {self.table}_stats").fetchall())
+
+    def __len__(self) -> int:
+        return self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
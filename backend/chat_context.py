@@ -0,0 +1,240 @@
+"""Bounded, prefix-stable prompt building for per-video chat."""
+import hashlib
+import json
+from typing import Optional
+
+from config import get_settings
+from database import ChatMessage, Video
+from text_budget import estimate_tokens, truncate_to_tokens
+
+settings = get_settings()
+
+# Bump whenever the context layout changes so stored contexts are rebuilt
+CONTEXT_VERSION = "1"
+
+# Older turns are folded into the summary in groups, so the summary message
+# (and the prompt prefix after it) only changes every few turns
+FOLD_MIN_MESSAGES = 4
+
+LENS_LABELS = {
+    "investment": "Investment",
+    "product": "Product",
+    "content": "Content",
+    "knowledge": "Knowledge",
+}
+
+CHAT_INSTRUCTIONS = """You are a research assistant helping analyze a TikTok video. Use the video context below to answer the user's questions.
+
+Provide helpful, concise answers based on the video content and analysis. If a question isn't answerable from the context, say so."""
+
+
+def _compact(value) -> str:
+    """Deterministic, whitespace-free JSON."""
+    return json.dumps(value, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+
+
+def _analysis(video: Video, lens: str) -> Optional[dict]:
+    analysis = getattr(video, f"{lens}_analysis")
+    if isinstance(analysis, dict) and "error" not in analysis:
+        return analysis
+    return None
+
+
+def _context_sections(video: Video) -> list[tuple[str, bool]]:
+    """(text, truncatable) sections in priority order, most important first."""
+    header = [
+        f"Title: {video.title}" if video.title else None,
+        f"Creator: @{video.creator}" if video.creator else None,
+        f"Hashtags: {' '.join('#' + h for h in video.hashtags)}" if video.hashtags else None,
+        f"User context: {video.context}" if video.context else None,
+    ]
+    sections = [("\n".join(p for p in header if p), False)]
+
+    summaries = [
+        f"{label}: {analysis['summary']}"
+        for lens, label in LENS_LABELS.items()
+        if (analysis := _analysis(video, lens)) and analysis.get("summary")
+    ]
+    if summaries:
+        sections.append(("Analysis summaries:\n" + "\n".join(summaries), False))
+    if video.description:
+        sections.append((f"Description: {video.description}", True))
+    if video.transcript:
+        sections.append((f"Transcript: {video.transcript}", True))
+    for lens, label in LENS_LABELS.items():
+        analysis = _analysis(video, lens)
+        details = {k: v for k, v in (analysis or {}).items() if k != "summary"}
+        if details:
+            sections.append((f"{label} analysis: {_compact(details)}", False))
+    return [(text, truncatable) for text, truncatable in sections if text]
+
+
+def build_video_context(video: Video, max_tokens: Optional[int] = None) -> str:
+    """
+    Serialise a video for chat within a token budget.
+
+    Sections are kept in priority order (metadata, lens summaries,
+    description, transcript, full lens details); the first section that
+    doesn't fit is truncated if it is free text, otherwise dropped.
+    """
+    budget = max_tokens or settings.chat_context_tokens
+    parts = []
+    for text, truncatable in _context_sections(video):
+        cost = estimate_tokens(text) + 1
+        if cost <= budget:
+            parts.append(text)
+            budget -= cost
+        elif truncatable and budget > 50:
+            parts.append(truncate_to_tokens(text, budget - 10) + " [truncated]")
+            budget = 0
+    return "\n\n".join(parts)
+
+
+def _context_key(video: Video) -> str:
+    """Hash of everything the stored context is built from."""
+    inputs = [
+        CONTEXT_VERSION,
+        settings.chat_context_tokens,
+        video.title, video.creator, video.hashtags, video.context, video.description, video.transcript,
+        *(getattr(video, f"{lens}_analysis") for lens in LENS_LABELS),
+    ]
+    return hashlib.sha256(_compact(inputs).encode("utf-8")).hexdigest()
+
+
+def get_video_context(video: Video) -> str:
+    """
+    Return the stored compact context, rebuilding it if its inputs changed.
+
+    The caller commits; the worker calls this once a video is analysed so
+    the first chat message doesn't pay for it.
+    """
+    key = _context_key(video)
+    if video.chat_context is None or video.chat_context_key != key:
+        video.chat_context = build_video_context(video)
+        video.chat_context_key = key
+    return video.chat_context
+
+
+def _turn(message: ChatMessage) -> dict:
+    """A stored message as a chat turn, capped so one long turn can't blow the budget."""
+    return {"role": message.role, "content": truncate_to_tokens(message.content, settings.chat_history_tokens)}
+
+
+def _turn_tokens(messages: list[ChatMessage]) -> int:
+    return sum(estimate_tokens(_turn(m)["content"]) for m in messages)
+
+
+async def _summarize(previous: Optional[str], messages: list[ChatMessage]) -> str:
+    """Fold earlier turns into the rolling summary."""
+    from model_router import complete_prompt
+
+    transcript = "\n".join(f"{m.role.upper()}: {_turn(m)['content']}" for m in messages)
+    prompt = f"""Update the summary of a research conversation about a TikTok video.
+
+CURRENT SUMMARY:
+{previous or "(none)"}
+
+NEW TURNS:
+{transcript}
+
+Write the updated summary in at most {settings.chat_summary_tokens * 3 // 4} words. Keep the questions asked, the conclusions reached and any facts or preferences the user stated. Return only the summary."""
+    summary = (await complete_prompt(prompt, task="summary")).strip()
+    return truncate_to_tokens(summary, settings.chat_summary_tokens)
+
+
+def _split_history(db, video: Video) -> tuple[list[ChatMessage], list[ChatMessage]]:
+    """(older, recent) turns not yet in the summary; recent ones fit the history budget."""
+    history = (
+        db.query(ChatMessage)
+        .filter(ChatMessage.video_id == video.id, ChatMessage.id > (video.chat_summary_through_id or 0))
+        .order_by(ChatMessage.id)
+        .all()
+    )
+
+    # Most recent turns that fit the history budget stay verbatim
+    recent: list[ChatMessage] = []
+    for m in reversed(history):
+        if len(recent) >= settings.chat_recent_messages or _turn_tokens([m, *recent]) > settings.chat_history_tokens:
+            break
+        recent.insert(0, m)
+    return history[:len(history) - len(recent)], recent
+
+
+def _unfolded(older: list[ChatMessage]) -> list[ChatMessage]:
+    """Newest older turns that fit the summary's budget, sent while they await a fold."""
+    kept: list[ChatMessage] = []
+    for m in reversed(older):
+        if _turn_tokens([m, *kept]) > settings.chat_summary_tokens:
+            break
+        kept.insert(0, m)
+    return kept
+
+
+def build_chat_messages(db, video: Video, message: str) -> list[dict]:
+    """
+    Build the chat request for a new user message.
+
+    Layout, from most to least stable so provider-side prompt caching can
+    reuse the prefix: instructions + stored video context (changes only
+    when the video does), the rolling summary of older turns (changes only
+    when a group of turns is folded in), recent turns verbatim, then the
+    new message. Makes no LLM call: the last stored summary is used, and
+    older turns it doesn't cover yet are sent verbatim within the summary's
+    budget until fold_summary catches up. Call before saving the new
+    message.
+    """
+    context = get_video_context(video)
+    older, recent = _split_history(db, video)
+    db.commit()
+
+    messages = [{"role": "system", "content": f"{CHAT_INSTRUCTIONS}\n\nVIDEO CONTEXT:\n{context}"}]
+    if video.chat_summary:
+        messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{video.chat_summary}"})
+    messages.extend(_turn(m) for m in [*_unfolded(older), *recent])
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
+# Videos with a fold in progress in this process
+_folding: set[int] = set()
+
+
+async def fold_summary(video_id: int) -> None:
+    """
+    Fold turns that fell out of the recent window into the rolling summary.
+
+    Run in the background once a reply has been sent, so the summary's LLM
+    round trip never delays a response. Turns are folded in groups of at
+    least FOLD_MIN_MESSAGES (or sooner if the history is over budget). If
+    the summary call fails, nothing changes and the next reply retries.
+    """
+    from database import SessionLocal
+
+    if video_id in _folding:
+        return
+    _folding.add(video_id)
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if video is None:
+            return
+        older, recent = _split_history(db, video)
+        if not older or (len(older) < FOLD_MIN_MESSAGES and _turn_tokens(older + recent) <= settings.chat_history_tokens):
+            return
+        try:
+            summary = await _summarize(video.chat_summary, older)
+        except Exception as e:
+            print(f"Chat summary failed: {e}")
+            return
+        # Another process may have folded meanwhile; only move the summary forward
+        db.query(Video).filter(
+            Video.id == video_id,
+            Video.chat_summary_through_id.is_not_distinct_from(video.chat_summary_through_id),
+        ).update(
+            {Video.chat_summary: summary, Video.chat_summary_through_id: older[-1].id},
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+        _folding.discard(video_id)
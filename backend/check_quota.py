@@ -1,37 +1,47 @@
 #!/usr/bin/env python3
 """Check API quota status."""
-from quota_tracker import get_quota_status
+from quota_planner import INTERACTIVE_RESERVE, get_budget_status
+from quota_tracker import PROVIDER_LIMITS
 
-# ScrapTik free tier limit
-SCRAPTIK_MONTHLY_LIMIT = 50
 
+def print_provider(status: dict):
+    """Display one provider's usage and pacing."""
+    percent_used = status["used"] / status["limit"] * 100 if status["limit"] else 0
 
-def main():
-    """Display quota status."""
-    status = get_quota_status("scraptik", SCRAPTIK_MONTHLY_LIMIT)
-
-    print("\n" + "="*50)
-    print("ScrapTik API Quota Status")
-    print("="*50)
-    print(f"Used:      {status['used']}/{status['limit']} requests")
-    print(f"Remaining: {status['remaining']} requests")
-    print(f"Progress:  {status['percent_used']}%")
+    print(f"\n{status['service'].capitalize()}")
+    print("-"*50)
+    print(f"Used:       {status['used']}/{status['limit']} requests ({status['used_today']} today)")
+    print(f"Remaining:  {status['remaining']} requests")
+    print(f"Pace:       {status['daily_rate']}/day so far")
+    print(f"Backfill:   {status['daily_backfill_budget']}/day for the next {status['days_left']} days "
+          f"(cap {status['backfill_limit']})")
 
     # Visual progress bar
     bar_length = 40
-    filled = int(bar_length * status['percent_used'] / 100)
+    filled = min(bar_length, int(bar_length * percent_used / 100))
     bar = "#" * filled + "-" * (bar_length - filled)
-    print(f"\n[{bar}] {status['percent_used']}%")
+    print(f"[{bar}] {percent_used:.1f}%")
 
     # Status indicator
-    if status['percent_used'] >= 100:
-        print("\n[!] Quota exhausted - using fallback methods")
-    elif status['percent_used'] >= 80:
-        print(f"\n[!] Warning: Only {status['remaining']} requests remaining")
-    elif status['percent_used'] >= 50:
-        print(f"\n[*] Half used: {status['remaining']} requests left")
+    if status["remaining"] == 0:
+        print("[!] Quota exhausted - using fallback methods")
+    elif status["projected_exhaustion"]:
+        print(f"[!] At this pace, runs out on {status['projected_exhaustion']}")
+    elif status["used"] >= status["backfill_limit"]:
+        print("[*] Backfill share used - remaining quota is for interactive submissions")
     else:
-        print(f"\n[OK] Healthy: {status['remaining']} requests available")
+        print("[OK] On pace to last the month")
+
+
+def main():
+    """Display quota status for every quota-limited provider."""
+    print("\n" + "="*50)
+    print("API Quota Status")
+    print(f"({int(INTERACTIVE_RESERVE * 100)}% of each allowance reserved for interactive submissions)")
+    print("="*50)
+
+    for service in PROVIDER_LIMITS:
+        print_provider(get_budget_status(service))
 
     print("="*50 + "\n")
 
@@ -22,10 +22,90 @@ class Settings(BaseSettings):
     # Proxy
     proxy_url: str = ""
 
+    # Bulk scraping (scrape_many): max videos scraped at once
+    scrape_concurrency: int = 8
+
+    # Metadata chain: seconds a provider runs before the next fallback is
+    # started alongside it (0 waits for it to fail)
+    metadata_hedge_after: float = 4.0
+
+    # yt-dlp extractor pool (per worker process); seconds a scrape waits for
+    # a free extractor before treating yt-dlp as a miss
+    ytdlp_pool_size: int = 2
+    ytdlp_max_uses: int = 50
+    ytdlp_checkout_timeout: float = 10.0
+
+    # LLM client: concurrent OpenRouter requests per process, attempts per
+    # request, and seconds before a slow request is duplicated (0 disables)
+    llm_max_in_flight: int = 4
+    llm_max_attempts: int = 4
+    llm_hedge_after: float = 20.0
+
+    # Model routing: latency SLOs (seconds) per task, and the input size
+    # (estimated tokens) from which analysis goes to the stronger model
+    llm_latency_slo_chat: float = 15.0
+    llm_latency_slo_analysis: float = 60.0
+    llm_strong_model_min_tokens: int = 5000
+
+    # "combined" (one prompt for all four lenses) or "per_lens" (four concurrent requests)
+    analysis_mode: str = "combined"
+
+    # Transcripts over this estimated size are chunked, summarised in parallel
+    # and analysed in condensed form (map-reduce)
+    analysis_max_transcript_tokens: int = 6000
+    analysis_chunk_tokens: int = 3000
+    analysis_chunk_overlap_tokens: int = 200
+
+    # Batch analysis (worker batch jobs / backfill): videos per request, and
+    # the largest video (estimated tokens) that is packed into a batch
+    analysis_batch_size: int = 5
+    analysis_batch_item_tokens: int = 1000
+
+    # Near-duplicate transcripts: estimated similarity at which a new video
+    # reuses an existing analysis, and the shortest transcript compared
+    near_duplicate_threshold: float = 0.85
+    near_duplicate_min_words: int = 30
+
+    # Duplicate submissions: seconds a pending or processing video may go
+    # untouched (longer than the 10 min job timeout) before it is treated as
+    # stuck and re-queued instead of being waited on
+    coalesce_lease_seconds: int = 15 * 60
+
+    # Quota store: "auto" (Redis if reachable, else SQLite), "redis" or "sqlite"
+    quota_backend: str = "auto"
+
     # Infrastructure
     redis_url: str = "redis://localhost:6379"
     database_url: str = "sqlite:///./tikodea.db"
 
+    # SQLite storage profile: "tuned" (WAL plus the PRAGMAs below, applied to
+    # every connection) or "default" (SQLite's own settings). db_role picks
+    # the connection pool: "api", "worker", "bot", or "auto" to go by the
+    # script being run.
+    db_profile: str = "tuned"
+    db_role: str = "auto"
+    db_synchronous: str = "NORMAL"
+    db_busy_timeout_ms: int = 5000
+    db_cache_size_kib: int = 16384
+    db_mmap_size: int = 256 * 1024 * 1024
+
+    # Scrape cache (shared SQLite file, keyed by TikTok video ID)
+    scrape_cache_path: str = "./scrape_cache.db"
+    scrape_cache_max_entries: int = 20000
+    scrape_cache_immutable_ttl: int = 30 * 24 * 3600  # transcript, creator, description
+    scrape_cache_volatile_ttl: int = 6 * 3600  # view/like counts, thumbnail
+
+    # LLM analysis cache (content-addressed, shared SQLite file)
+    analysis_cache_path: str = "./analysis_cache.db"
+    analysis_cache_max_entries: int = 5000
+
+    # Chat prompt budgets (estimated tokens): video context, verbatim recent
+    # turns, and the rolling summary of older turns
+    chat_context_tokens: int = 3000
+    chat_history_tokens: int = 1500
+    chat_recent_messages: int = 6
+    chat_summary_tokens: int = 300
+
     model_config = SettingsConfigDict(
         env_file="../.env",
         env_file_encoding="utf-8",
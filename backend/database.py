@@ -1,15 +1,71 @@
 """Database models and connection management."""
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Iterable, Optional
 import json
+import os
+import sys
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, DateTime, JSON
+from sqlalchemy import create_engine, event, Column, Index, Integer, String, Text, Boolean, DateTime, Float, JSON, LargeBinary
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from config import get_settings
+import search_index
 
 settings = get_settings()
 
+# Connection pool per process role: the API serves many requests at once, a
+# worker runs one job at a time (plus the odd write from the LLM loop), and a
+# bot mostly waits on the chat platform
+POOL_PROFILES = {
+    "api": {"pool_size": 10, "max_overflow": 20},
+    "worker": {"pool_size": 2, "max_overflow": 2},
+    "bot": {"pool_size": 2, "max_overflow": 4},
+}
+
+
+def detect_role() -> str:
+    """The process role from settings.db_role, or from the script being run."""
+    if settings.db_role != "auto":
+        return settings.db_role
+    script = os.path.basename(sys.argv[0])
+    if script.startswith("worker") or script == "rq":
+        return "worker"
+    if script.endswith("bot.py"):
+        return "bot"
+    return "api"
+
+
+def _apply_pragmas(dbapi_connection, connection_record) -> None:
+    """Configure each new SQLite connection for concurrent readers and writers."""
+    cursor = dbapi_connection.cursor()
+    # Readers don't block the writer (or each other) under WAL
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # NORMAL only syncs at checkpoints in WAL mode - durable across app crashes
+    cursor.execute(f"PRAGMA synchronous={settings.db_synchronous}")
+    # Wait for a competing writer instead of failing with "database is locked"
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.db_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA cache_size={-int(settings.db_cache_size_kib)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.db_mmap_size)}")
+    cursor.close()
+
+
+def create_db_engine(url: str, profile: Optional[str] = None, role: Optional[str] = None):
+    """Create the engine for a SQLite URL with the storage profile and role's pool."""
+    profile = profile or settings.db_profile
+    if profile == "default":
+        return create_engine(url, echo=False)
+
+    engine = create_engine(
+        url,
+        echo=False,
+        # Pooled connections move between threads; SQLite itself serialises access
+        connect_args={"check_same_thread": False, "timeout": settings.db_busy_timeout_ms / 1000},
+        **POOL_PROFILES[role or detect_role()],
+    )
+    event.listen(engine, "connect", _apply_pragmas)
+    return engine
+
+
 # Create engine - handle SQLite URL format
 db_url = settings.database_url
 if db_url.startswith("file:"):
@@ -17,7 +73,7 @@ if db_url.startswith("file:"):
 elif not db_url.startswith("sqlite"):
     db_url = f"sqlite:///{db_url}"
 
-engine = create_engine(db_url, echo=False)
+engine = create_db_engine(db_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -26,11 +82,21 @@ class Video(Base):
     """Processed TikTok video with analysis."""
 
     __tablename__ = "videos"
+    __table_args__ = (
+        # Keyset pagination of the feed: ORDER BY created_at DESC, id DESC
+        Index("ix_videos_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     tiktok_url = Column(String(500), nullable=False, index=True)
+    tiktok_video_id = Column(String(50), nullable=True, index=True)  # Canonical numeric TikTok ID
     context = Column(Text, nullable=True)  # User-provided context
 
+    # Duplicate submissions share the pipeline run of this video instead of their own
+    coalesced_into_id = Column(Integer, nullable=True, index=True)
+    # RQ job queued for this video; None if it was never queued (e.g. Redis down)
+    job_id = Column(String(64), nullable=True)
+
     # Metadata from TikTok
     title = Column(String(500), nullable=True)
     description = Column(Text, nullable=True)
@@ -42,6 +108,10 @@ class Video(Base):
 
     # Extracted content
     transcript = Column(Text, nullable=True)
+    # MinHash signature of the transcript (see near_duplicates)
+    transcript_minhash = Column(LargeBinary, nullable=True)
+    # Analyses were copied from this video because the transcripts nearly match
+    near_duplicate_of_id = Column(Integer, nullable=True, index=True)
 
     # Analysis results (JSON for flexibility)
     investment_analysis = Column(JSON, nullable=True)
@@ -49,6 +119,13 @@ class Video(Base):
     content_analysis = Column(JSON, nullable=True)
     knowledge_analysis = Column(JSON, nullable=True)
 
+    # Compact chat context, rebuilt when chat_context_key (hash of its inputs) changes
+    chat_context = Column(Text, nullable=True)
+    chat_context_key = Column(String(64), nullable=True)
+    # Rolling summary of chat turns up to and including this ChatMessage ID
+    chat_summary = Column(Text, nullable=True)
+    chat_summary_through_id = Column(Integer, nullable=True)
+
     # Status
     status = Column(String(50), default="pending")  # pending, processing, completed, failed
     error_message = Column(Text, nullable=True)
@@ -70,32 +147,61 @@ class Video(Base):
     discord_channel_id = Column(String(100), nullable=True)
     discord_message_id = Column(String(100), nullable=True)
 
-    def to_dict(self) -> dict:
-        """Convert to dictionary for API responses."""
-        return {
-            "id": self.id,
-            "tiktok_url": self.tiktok_url,
-            "context": self.context,
-            "title": self.title,
-            "description": self.description,
-            "creator": self.creator,
-            "hashtags": self.hashtags or [],
-            "view_count": self.view_count,
-            "like_count": self.like_count,
-            "thumbnail_url": self.thumbnail_url,
-            "transcript": self.transcript,
-            "investment_analysis": self.investment_analysis,
-            "product_analysis": self.product_analysis,
-            "content_analysis": self.content_analysis,
-            "knowledge_analysis": self.knowledge_analysis,
-            "status": self.status,
-            "error_message": self.error_message,
-            "is_favorite": self.is_favorite,
-            "manual_tags": self.manual_tags or [],
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "processed_at": self.processed_at.isoformat() if self.processed_at else None,
-        }
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> dict:
+        """
+        Convert to dictionary for API responses.
+
+        With fields, only those keys are built, so columns left unloaded by
+        a projected query (see SUMMARY_FIELDS) are never fetched.
+        """
+        data = {}
+        for name in VIDEO_FIELDS if fields is None else fields:
+            value = getattr(self, name)
+            if name in ("hashtags", "manual_tags"):
+                value = value or []
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            data[name] = value
+        return data
+
+
+# Keys of Video.to_dict(), in response order
+VIDEO_FIELDS = (
+    "id",
+    "tiktok_url",
+    "context",
+    "title",
+    "description",
+    "creator",
+    "hashtags",
+    "view_count",
+    "like_count",
+    "thumbnail_url",
+    "transcript",
+    "near_duplicate_of_id",
+    "investment_analysis",
+    "product_analysis",
+    "content_analysis",
+    "knowledge_analysis",
+    "status",
+    "error_message",
+    "is_favorite",
+    "manual_tags",
+    "created_at",
+    "updated_at",
+    "processed_at",
+)
+
+ANALYSIS_FIELDS = ("investment_analysis", "product_analysis", "content_analysis", "knowledge_analysis")
+
+# Heavy columns whose size grows with the video rather than the page
+HEAVY_FIELDS = ("description", "transcript", *ANALYSIS_FIELDS)
+
+# What a feed card needs
+SUMMARY_FIELDS = tuple(name for name in VIDEO_FIELDS if name not in HEAVY_FIELDS)
+
+
+search_index.attach(Video.__table__)
 
 
 class ChatMessage(Base):
@@ -110,9 +216,37 @@ class ChatMessage(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
 
+class TranscriptBand(Base):
+    """LSH band key of an analysed video's transcript signature."""
+
+    __tablename__ = "transcript_lsh"
+
+    id = Column(Integer, primary_key=True)
+    band_hash = Column(Integer, nullable=False, index=True)
+    video_id = Column(Integer, nullable=False, index=True)
+
+
+class LLMCall(Base):
+    """Token, cost and latency accounting for one routed LLM call."""
+
+    __tablename__ = "llm_calls"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task = Column(String(20), nullable=False)  # analysis, summary, chat
+    model = Column(String(100), nullable=False, index=True)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    cost_usd = Column(Float, default=0.0)
+    latency_ms = Column(Integer, default=0)
+    ok = Column(Boolean, default=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+
+
 def init_db():
     """Initialize database tables."""
     Base.metadata.create_all(bind=engine)
+    search_index.ensure_index(engine)
 
 
 def get_db():
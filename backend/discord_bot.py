@@ -6,6 +6,8 @@ from discord import app_commands
 
 from config import get_settings
 from database import SessionLocal, Video, init_db
+from http_client import close_clients
+from ingest import submit_video, confirmation_message
 from scraper import validate_tiktok_url
 
 logging.basicConfig(level=logging.INFO)
@@ -127,41 +129,21 @@ async def save_video(interaction: discord.Interaction, url: str, context: str =
         )
         return
 
-    db = SessionLocal()
+    # Discord drops interactions not answered within 3s; resolving short
+    # links and saving can take longer, so acknowledge first
+    await interaction.response.defer()
     try:
-        # Create video record
-        video = Video(
-            tiktok_url=url,
-            context=context,
-            status="pending",
+        result = await submit_video(
+            url,
+            context,
             discord_channel_id=str(interaction.channel_id),
             discord_message_id=str(interaction.id),
         )
-        db.add(video)
-        db.commit()
-        db.refresh(video)
-
-        # Queue for processing
-        try:
-            from queue_manager import enqueue_video_processing
-            job_id = enqueue_video_processing(video.id)
-            logger.info(f"Queued video {video.id} as job {job_id}")
-        except Exception as e:
-            logger.warning(f"Queue not available, will process synchronously: {e}")
-
-        # Confirm to user
-        response = f"✅ Video saved! (ID: {video.id})\n"
-        if context:
-            response += f"📝 Context: {context}\n"
-        response += "\n🔄 Processing will start shortly..."
-
-        await interaction.response.send_message(response)
+        await interaction.followup.send(confirmation_message(result, context))
 
     except Exception as e:
         logger.error(f"Error saving video: {e}")
-        await interaction.response.send_message(f"❌ Error saving video: {e}", ephemeral=True)
-    finally:
-        db.close()
+        await interaction.followup.send(f"❌ Error saving video: {e}")
 
 
 async def save_video_from_message(message: discord.Message, url: str, context: str = None):
@@ -176,41 +158,18 @@ async def save_video_from_message(message: discord.Message, url: str, context: s
         )
         return
 
-    db = SessionLocal()
     try:
-        # Create video record
-        video = Video(
-            tiktok_url=url,
-            context=context,
-            status="pending",
+        result = await submit_video(
+            url,
+            context,
             discord_channel_id=str(message.channel.id),
             discord_message_id=str(message.id),
         )
-        db.add(video)
-        db.commit()
-        db.refresh(video)
-
-        # Queue for processing
-        try:
-            from queue_manager import enqueue_video_processing
-            job_id = enqueue_video_processing(video.id)
-            logger.info(f"Queued video {video.id} as job {job_id}")
-        except Exception as e:
-            logger.warning(f"Queue not available, will process synchronously: {e}")
-
-        # Confirm to user
-        response = f"✅ Video saved! (ID: {video.id})\n"
-        if context:
-            response += f"📝 Context: {context}\n"
-        response += "\n🔄 Processing will start shortly..."
-
-        await message.reply(response)
+        await message.reply(confirmation_message(result, context))
 
     except Exception as e:
         logger.error(f"Error saving video: {e}")
         await message.reply(f"❌ Error saving video: {e}")
-    finally:
-        db.close()
 
 
 def main():
@@ -221,7 +180,10 @@ def main():
 
     init_db()
     logger.info("Starting Tikodea Discord bot...")
-    bot.run(settings.discord_bot_token)
+    try:
+        bot.run(settings.discord_bot_token)
+    finally:
+        close_clients()
 
 
 if __name__ == "__main__":
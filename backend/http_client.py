@@ -0,0 +1,157 @@
+"""Process-wide pooled HTTP clients for outbound API calls."""
+import asyncio
+import concurrent.futures
+import threading
+from dataclasses import dataclass
+from typing import Awaitable, Optional, TypeVar
+
+import httpx
+
+from config import get_settings
+
+try:
+    import h2  # noqa: F401  # enables HTTP/2 in httpx when installed
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Connection pool settings for a single upstream host."""
+
+    max_connections: int = 10
+    max_keepalive_connections: int = 5
+    keepalive_expiry: float = 60.0
+    use_proxy: bool = False
+    follow_redirects: bool = False
+
+
+# One pool per upstream host, so limits are effectively per host
+POOLS = {
+    "supadata": PoolConfig(max_connections=4, max_keepalive_connections=4),
+    "scraptik": PoolConfig(max_connections=4, max_keepalive_connections=4),
+    "openrouter": PoolConfig(max_connections=8, max_keepalive_connections=8),
+    # TikTok itself (oEmbed, short links) goes through the proxy when configured
+    "tiktok": PoolConfig(max_connections=8, use_proxy=True, follow_redirects=True),
+}
+
+_lock = threading.Lock()
+_async_clients: dict[tuple[asyncio.AbstractEventLoop, str], httpx.AsyncClient] = {}
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+
+
+def _client_kwargs(name: str) -> dict:
+    """Build httpx client arguments for a named pool."""
+    config = POOLS.get(name, PoolConfig())
+    kwargs = {
+        "limits": httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        "http2": HTTP2_AVAILABLE,
+        "follow_redirects": config.follow_redirects,
+    }
+    if config.use_proxy and settings.proxy_url:
+        kwargs["proxy"] = settings.proxy_url
+    return kwargs
+
+
+def get_async_client(name: str) -> httpx.AsyncClient:
+    """
+    Get the shared async client for a named pool.
+
+    Async clients are bound to the event loop that created them, so there is
+    one per (running loop, pool). Sync code should go through run_sync, which
+    uses a long-lived background loop so connections survive between jobs.
+    """
+    loop = asyncio.get_running_loop()
+    key = (loop, name)
+    with _lock:
+        # Forget clients whose loop has gone away (e.g. finished asyncio.run calls)
+        for stale in [k for k in _async_clients if k[0].is_closed()]:
+            del _async_clients[stale]
+        client = _async_clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(**_client_kwargs(name))
+            _async_clients[key] = client
+        return client
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Start (once) and return the background event loop used by run_sync."""
+    global _loop, _loop_thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever, name="http-client-loop", daemon=True
+            )
+            _loop_thread.start()
+        return _loop
+
+
+def run_in_background(coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+    """Schedule a coroutine on the shared background loop without waiting."""
+    loop = _get_background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("Cannot block on the background loop from inside it")
+    return asyncio.run_coroutine_threadsafe(coro, loop)
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run a coroutine on the shared background loop and wait for its result."""
+    return run_in_background(coro).result()
+
+
+async def aclose_clients() -> None:
+    """Close the async clients bound to the running loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        owned = [key for key in _async_clients if key[0] is loop]
+        clients = [_async_clients.pop(key) for key in owned]
+    for client in clients:
+        await client.aclose()
+
+
+def close_clients() -> None:
+    """
+    Close every pooled client and stop the background loop.
+
+    Call from sync shutdown paths (worker, Discord bot). Async apps should
+    await aclose_clients() on their own loop instead.
+    """
+    global _loop, _loop_thread
+    with _lock:
+        async_clients = list(_async_clients.items())
+        _async_clients.clear()
+        loop, thread = _loop, _loop_thread
+        _loop, _loop_thread = None, None
+
+    for (client_loop, _), client in async_clients:
+        if client_loop.is_closed():
+            continue
+        try:
+            if client_loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), client_loop).result(timeout=5)
+            else:
+                client_loop.run_until_complete(client.aclose())
+        except Exception as e:
+            print(f"HTTP client shutdown error: {e}")
+
+    if loop is not None and not loop.is_closed():
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+        loop.close()
@@ -0,0 +1,223 @@
+"""Video submission with single-flight coalescing of duplicate jobs."""
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from config import get_settings
+from database import SessionLocal, Video
+from tiktok_url import resolve_tiktok_url
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Pipeline output copied from the primary video to every coalesced submission
+SHARED_FIELDS = (
+    "title",
+    "description",
+    "creator",
+    "hashtags",
+    "view_count",
+    "like_count",
+    "thumbnail_url",
+    "transcript",
+    "investment_analysis",
+    "product_analysis",
+    "content_analysis",
+    "knowledge_analysis",
+    "status",
+    "error_message",
+    "processed_at",
+)
+
+
+@dataclass
+class SubmitResult:
+    """Outcome of a video submission."""
+
+    video_id: int
+    job_id: Optional[str] = None
+    coalesced_into_id: Optional[int] = None
+    status: str = "pending"
+
+
+def find_primary(db: Session, tiktok_video_id: Optional[str], before_id: Optional[int] = None) -> Optional[Video]:
+    """
+    Find the video whose pipeline run a new submission should share.
+
+    That is the oldest non-coalesced, non-failed video with the same TikTok
+    video ID. before_id restricts the search to rows created earlier.
+    """
+    if not tiktok_video_id:
+        return None
+
+    query = db.query(Video).filter(
+        Video.tiktok_video_id == tiktok_video_id,
+        Video.coalesced_into_id.is_(None),
+        Video.status != "failed",
+    )
+    if before_id is not None:
+        query = query.filter(Video.id < before_id)
+    return query.order_by(Video.id).first()
+
+
+def is_live(primary: Video) -> bool:
+    """
+    Whether a primary's result can still be waited on.
+
+    Completed videos always can. A pending or processing one only while it
+    has a queued job and was touched within settings.coalesce_lease_seconds:
+    a job that was never queued (Redis down) or whose worker died hard
+    would otherwise hold every later submission of the video forever.
+    """
+    if primary.status == "completed":
+        return True
+    if not primary.job_id or primary.updated_at is None:
+        return False
+    updated_at = primary.updated_at
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - updated_at < timedelta(seconds=settings.coalesce_lease_seconds)
+
+
+def enqueue(db: Session, video: Video) -> Optional[str]:
+    """Queue a video for processing and record its job ID; None if the queue is unavailable."""
+    try:
+        from queue_manager import enqueue_video_processing
+        job_id = enqueue_video_processing(video.id)
+    except Exception as e:
+        logger.warning(f"Queue not available, video {video.id} was not queued: {e}")
+        return None
+    video.job_id = job_id
+    db.commit()
+    logger.info(f"Queued video {video.id} as job {job_id}")
+    return job_id
+
+
+def requeue_stale(db: Session, primary: Video) -> bool:
+    """
+    Queue a stuck primary again so its followers get a result.
+
+    The row is claimed first (compare-and-set on its job and update time),
+    so only one of several concurrent submissions re-queues it; the others
+    see the claim and attach. Returns False if the queue is unavailable.
+    """
+    claimed = (
+        db.query(Video)
+        .filter(
+            Video.id == primary.id,
+            Video.job_id.is_(None) if primary.job_id is None else Video.job_id == primary.job_id,
+            Video.updated_at == primary.updated_at,
+        )
+        .update(
+            {Video.status: "pending", Video.job_id: None, Video.updated_at: datetime.now(timezone.utc)},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    db.refresh(primary)
+    if not claimed:
+        return True
+    logger.info(f"Video {primary.id} looks stuck ({primary.status}), queuing it again")
+    return enqueue(db, primary) is not None
+
+
+def copy_results(source: Video, target: Video) -> None:
+    """Copy pipeline output from one video to another."""
+    for field in SHARED_FIELDS:
+        setattr(target, field, getattr(source, field))
+
+
+def propagate_results(db: Session, primary: Video) -> int:
+    """Share a finished video's result with every submission coalesced into it."""
+    followers = db.query(Video).filter(Video.coalesced_into_id == primary.id).all()
+    for follower in followers:
+        copy_results(primary, follower)
+        if primary.status == "failed":
+            # Let a later resubmission start a fresh run
+            follower.coalesced_into_id = None
+    db.commit()
+    return len(followers)
+
+
+def catch_up(db: Session, primary: Video) -> None:
+    """
+    Share the primary's result if it finished while a follower was attaching.
+
+    propagate_results only sees followers committed before it ran, so call
+    this after committing a new coalesced_into_id link: the primary is read
+    again and, if it has finished, its result is propagated once more.
+    """
+    db.refresh(primary)
+    if primary.status in ("completed", "failed"):
+        propagate_results(db, primary)
+
+
+async def submit_video(url: str, context: Optional[str] = None, **source_fields) -> SubmitResult:
+    """
+    Save a submission and queue it, unless the same video is already known.
+
+    Every submission gets its own row (with its own context and chat/message
+    IDs). When a pending, processing or completed video with the same TikTok
+    ID exists, the new row attaches to it instead of enqueuing another job.
+    A primary that is no longer live (see is_live) is queued again first;
+    if that fails the new row is queued as a primary of its own.
+    """
+    parsed = await resolve_tiktok_url(url)
+    tiktok_video_id = parsed.video_id if parsed else None
+
+    db = SessionLocal()
+    try:
+        primary = find_primary(db, tiktok_video_id)
+        if primary and not is_live(primary) and not requeue_stale(db, primary):
+            primary = None
+
+        video = Video(
+            tiktok_url=url,
+            tiktok_video_id=tiktok_video_id,
+            context=context,
+            status="pending",
+            **source_fields,
+        )
+        if primary:
+            video.coalesced_into_id = primary.id
+            if primary.status == "completed":
+                copy_results(primary, video)
+
+        db.add(video)
+        db.commit()
+        if primary:
+            catch_up(db, primary)
+        db.refresh(video)
+
+        result = SubmitResult(
+            video_id=video.id,
+            coalesced_into_id=primary.id if primary else None,
+            status=video.status,
+        )
+        if primary:
+            logger.info(f"Video {video.id} coalesced into video {primary.id} ({primary.status})")
+            return result
+
+        # Queue for processing
+        result.job_id = enqueue(db, video)
+        return result
+    finally:
+        db.close()
+
+
+def confirmation_message(result: SubmitResult, context: Optional[str] = None) -> str:
+    """Build the user-facing reply for a submission."""
+    response = f"✅ Video saved! (ID: {result.video_id})\n"
+    if context:
+        response += f"📝 Context: {context}\n"
+
+    if result.coalesced_into_id and result.status == "completed":
+        response += f"\n⚡ Already analyzed as video {result.coalesced_into_id} - results are ready."
+    elif result.coalesced_into_id:
+        response += f"\n🔗 Already processing as video {result.coalesced_into_id} - results will be shared."
+    else:
+        response += "\n🔄 Processing will start shortly..."
+    return response
@@ -0,0 +1,176 @@
+"""Tolerant extraction of JSON objects from LLM output."""
+import json
+import re
+from typing import Any, Optional
+
+# Repairs tried, in order, when the extracted text doesn't parse as-is
+_REPAIRS = (
+    (re.compile(r",\s*([}\]])"), r"\1"),  # trailing commas
+    (re.compile(r"[“”]"), '"'),  # smart double quotes
+    (re.compile(r"\bTrue\b"), "true"),
+    (re.compile(r"\bFalse\b"), "false"),
+    (re.compile(r"\bNone\b"), "null"),
+)
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+# What may follow the quote that really closes a string
+_STRING_END_RE = re.compile(r"\s*(?:[:,}\]]|$)")
+
+# How many earlier cut points to try when recovering a truncated object
+_MAX_CUTS = 8
+
+
+class JSONExtractError(ValueError):
+    """No JSON object could be recovered from the text."""
+
+
+def loads_repaired(text: str) -> Any:
+    """json.loads, retrying with common LLM defects repaired."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as error:
+        repaired = text
+        for pattern, replacement in _REPAIRS:
+            repaired = pattern.sub(replacement, repaired)
+            try:
+                return json.loads(repaired)
+            except json.JSONDecodeError:
+                continue
+        try:
+            return json.loads(_escape_inner_quotes(repaired))
+        except json.JSONDecodeError:
+            raise error
+
+
+def _escape_inner_quotes(text: str) -> str:
+    """Escape quotes inside strings that aren't followed by a delimiter (e.g. 'said "hi" to')."""
+    out = []
+    in_string = escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                if not _STRING_END_RE.match(text, i + 1):
+                    out.append('\\"')
+                    continue
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        out.append(ch)
+    return "".join(out)
+
+
+class _ObjectScan:
+    """
+    One pass over text for the first JSON object.
+
+    Text before the first "{" is skipped and anything after the object
+    closes is ignored. Records where the text can be cut and closed
+    cleanly, so value() can recover a truncated or damaged object.
+    """
+
+    def __init__(self, text: str):
+        self.buffer = ""
+        self.done = False
+        self._stack: list[str] = []
+        self._in_string = False
+        # (offset, open containers) where the text can be cut and closed cleanly
+        self._cuts: list[tuple[int, tuple[str, ...]]] = []
+
+        start = text.find("{")
+        if start == -1:
+            return
+        escape = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in _CLOSERS:
+                self._stack.append(ch)
+                self._cuts.append((i + 1 - start, tuple(self._stack)))
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                self._cuts.append((i + 1 - start, tuple(self._stack)))
+                if not self._stack:
+                    self.done = True
+                    self.buffer = text[start:i + 1]
+                    return
+            elif ch == ",":
+                self._cuts.append((i - start, tuple(self._stack)))
+        self.buffer = text[start:]
+
+    def value(self) -> Optional[Any]:
+        """
+        Best-effort parse of the object (None if nothing usable).
+
+        An unfinished trailing string is dropped rather than closed, so a
+        truncated value is never mistaken for a whole one.
+        """
+        if not self.buffer:
+            return None
+
+        candidates = []
+        if self.done:
+            # A closed object that doesn't parse is cut back to its last
+            # member that does, wherever the damage is (but not to a bare
+            # "{}", so stray braces in prose don't count as an answer)
+            candidates.append(self.buffer)
+            cuts = self._cuts[1:]
+        else:
+            if not self._in_string:
+                # Close everything that is still open
+                candidates.append(_close(self.buffer, self._stack))
+            # Otherwise back off to the last few points where a member ended
+            cuts = self._cuts[-_MAX_CUTS:]
+        for offset, stack in reversed(cuts):
+            candidates.append(_close(self.buffer[:offset], stack))
+
+        for candidate in candidates:
+            try:
+                return loads_repaired(candidate)
+            except json.JSONDecodeError:
+                continue
+        return None
+
+
+def _close(text: str, stack) -> str:
+    """Append the closers for every open container."""
+    text = text.rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    return text + "".join(_CLOSERS[ch] for ch in reversed(stack))
+
+
+def extract_json(text: str) -> dict:
+    """
+    Recover the outermost JSON object from mixed model output.
+
+    Handles surrounding prose and code fences, trailing commas, smart
+    quotes, unescaped inner quotes, Python literals and truncation. A
+    damaged object is cut back to its members that parse; the search only
+    moves on past the end of an object, so a nested object is never
+    returned in place of the whole answer. Raises JSONExtractError when no
+    object can be recovered.
+    """
+    start = text.find("{")
+    while start != -1:
+        scan = _ObjectScan(text[start:])
+        value = scan.value()
+        if isinstance(value, dict):
+            return value
+        if not scan.done:
+            break
+        start = text.find("{", start + len(scan.buffer))
+    raise JSONExtractError("No JSON object found in model output")
@@ -1,48 +1,116 @@
 """LLM-powered video analysis - Phase 4 implementation."""
-import json
+import asyncio
+import re
 from typing import Optional, List
-import httpx
 from config import get_settings
+from http_client import run_sync
+from model_router import complete, complete_prompt, complete_sync, route_models, stream
+from json_extract import JSONExtractError, extract_json
+from text_budget import estimate_tokens, split_into_chunks, truncate_to_tokens
+import analysis_cache
 
 settings = get_settings()
 
-# OpenRouter API configuration
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
-MODEL = "google/gemini-2.0-flash-001"  # Fast and cheap via OpenRouter
-
-
-def call_llm(prompt: str) -> str:
-    """Call OpenRouter API with the given prompt."""
-    response = httpx.post(
-        OPENROUTER_API_URL,
-        headers={
-            "Authorization": f"Bearer {settings.openrouter_api_key}",
-            "Content-Type": "application/json",
-        },
-        json={
-            "model": MODEL,
-            "messages": [{"role": "user", "content": prompt}],
-        },
-        timeout=60.0,
+# Bump whenever the analysis prompt changes so cached analyses are not reused
+ANALYSIS_PROMPT_VERSION = "1"
+
+LENSES = ("investment", "product", "content", "knowledge")
+
+# Attempts per lens in per-lens mode; only failed lenses are sent again
+LENS_ATTEMPTS = 2
+
+# Target size of each chunk summary in the map-reduce path
+CHUNK_SUMMARY_TOKENS = 400
+
+LENS_PROMPTS = {
+    "investment": """Analyze for investment/trading signals:
+- traction_indicators: List of growth/momentum signals
+- market_signals: Market trends or timing opportunities
+- red_flags: Warning signs or risks
+- opportunity_score: 1-10 rating
+- summary: 2-3 sentence investment thesis""",
+    "product": """Analyze for product/business opportunities:
+- problem_solved: What problem does this address?
+- solution_approach: How is it being solved?
+- recreatability: How easy to replicate (easy/medium/hard)
+- market_size: Estimated market (small/medium/large)
+- monetization_potential: Revenue opportunities
+- summary: 2-3 sentence product opportunity""",
+    "content": """Analyze for content creation insights:
+- hook_structure: How does it grab attention?
+- engagement_techniques: What keeps viewers watching?
+- format_pattern: Video format/style used
+- viral_indicators: Why might this spread?
+- replication_tips: How to create similar content
+- summary: 2-3 sentence content strategy""",
+    "knowledge": """Extract learnings and insights:
+- key_facts: Important facts or data points
+- frameworks: Mental models or frameworks mentioned
+- actionable_insights: What can be applied immediately
+- related_topics: Connected areas to explore
+- credibility_assessment: How trustworthy is this info
+- summary: 2-3 sentence knowledge takeaway""",
+}
+
+
+# Fields each lens prompt asks for; a result missing any of them is re-requested
+LENS_REQUIRED_FIELDS = {
+    lens: tuple(re.findall(r"^- (\w+):", prompt, re.MULTILINE)) for lens, prompt in LENS_PROMPTS.items()
+}
+
+
+def call_llm(prompt: str, models: Optional[set] = None) -> str:
+    """Call OpenRouter with the given prompt on the routed analysis model."""
+    return complete_sync(prompt, task="analysis", answered_by=models)
+
+
+def analysis_failed(analysis: dict) -> bool:
+    """True when no lens produced a usable result."""
+    return all(
+        not isinstance(analysis.get(lens), dict) or "error" in analysis[lens]
+        for lens in LENSES
     )
-    response.raise_for_status()
-    data = response.json()
-    return data["choices"][0]["message"]["content"]
 
 
-def analyze_video(
-    transcript: Optional[str],
-    title: Optional[str],
-    description: Optional[str],
-    hashtags: Optional[List[str]],
-    context: Optional[str] = None,
-) -> dict:
-    """
-    Run 4-lens analysis on video content.
+_SCORE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(?:/\s*10)?\s*$")
 
-    Returns dict with keys: investment, product, content, knowledge
-    """
-    # Build content context
+
+def lens_error(lens: str, value) -> Optional[str]:
+    """Why a lens result is unusable, or None if it passes validation."""
+    if value is None:
+        return "missing from response"
+    if not isinstance(value, dict):
+        return f"expected an object, got {type(value).__name__}"
+    if "error" in value:
+        return str(value["error"])
+    missing = [field for field in LENS_REQUIRED_FIELDS.get(lens, ("summary",)) if field not in value]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    summary = value.get("summary")
+    if not isinstance(summary, str) or not summary.strip():
+        return "missing summary"
+    if "opportunity_score" in value:
+        score = value["opportunity_score"]
+        match = _SCORE_RE.match(score) if isinstance(score, str) else None
+        number = float(match.group(1)) if match else score
+        if isinstance(number, bool) or not isinstance(number, (int, float)) or not 1 <= number <= 10:
+            return "opportunity_score must be a number from 1-10"
+    return None
+
+
+def _lens_ok(analysis: dict, lens: str) -> bool:
+    """True when a lens holds a valid result rather than an error."""
+    return isinstance(analysis, dict) and lens_error(lens, analysis.get(lens)) is None
+
+
+def build_content(
+    transcript: Optional[str] = None,
+    title: Optional[str] = None,
+    description: Optional[str] = None,
+    hashtags: Optional[List[str]] = None,
+    context: Optional[str] = None,
+) -> str:
+    """Format the video fields the analysis prompts are built from."""
     content_parts = []
     if title:
         content_parts.append(f"Title: {title}")
@@ -55,115 +123,336 @@ def analyze_video(
     if context:
         content_parts.append(f"User Context: {context}")
 
-    content = "\n\n".join(content_parts)
+    return "\n\n".join(content_parts)
+
+
+def _lens_sections() -> str:
+    """The numbered instructions for all four lenses."""
+    return "\n\n".join(
+        f'{i}. {lens.upper()} LENS (key: "{lens}")\n{LENS_PROMPTS[lens]}'
+        for i, lens in enumerate(LENSES, 1)
+    )
 
-    if not content.strip():
-        return {
-            "investment": {"error": "No content to analyze"},
-            "product": {"error": "No content to analyze"},
-            "content": {"error": "No content to analyze"},
-            "knowledge": {"error": "No content to analyze"},
-        }
 
-    prompt = f"""Analyze this TikTok video content through 4 different lenses. Return a JSON object with exactly these keys: investment, product, content, knowledge.
+def _combined_prompt(content: str) -> str:
+    """One prompt asking for all four lenses as a single JSON object."""
+    sections = _lens_sections()
+    return f"""Analyze this TikTok video content through 4 different lenses. Return a JSON object with exactly these keys: investment, product, content, knowledge.
 
 VIDEO CONTENT:
 {content}
 
 ANALYSIS LENSES:
 
-1. INVESTMENT LENS (key: "investment")
-Analyze for investment/trading signals:
-- traction_indicators: List of growth/momentum signals
-- market_signals: Market trends or timing opportunities
-- red_flags: Warning signs or risks
-- opportunity_score: 1-10 rating
-- summary: 2-3 sentence investment thesis
+{sections}
 
-2. PRODUCT LENS (key: "product")
-Analyze for product/business opportunities:
-- problem_solved: What problem does this address?
-- solution_approach: How is it being solved?
-- recreatability: How easy to replicate (easy/medium/hard)
-- market_size: Estimated market (small/medium/large)
-- monetization_potential: Revenue opportunities
-- summary: 2-3 sentence product opportunity
+Return ONLY valid JSON, no markdown formatting or code blocks."""
 
-3. CONTENT LENS (key: "content")
-Analyze for content creation insights:
-- hook_structure: How does it grab attention?
-- engagement_techniques: What keeps viewers watching?
-- format_pattern: Video format/style used
-- viral_indicators: Why might this spread?
-- replication_tips: How to create similar content
-- summary: 2-3 sentence content strategy
 
-4. KNOWLEDGE LENS (key: "knowledge")
-Extract learnings and insights:
-- key_facts: Important facts or data points
-- frameworks: Mental models or frameworks mentioned
-- actionable_insights: What can be applied immediately
-- related_topics: Connected areas to explore
-- credibility_assessment: How trustworthy is this info
-- summary: 2-3 sentence knowledge takeaway
+def _batch_prompt(contents: dict[str, str]) -> str:
+    """One prompt analysing several videos, answered as {video_id: analysis}."""
+    ids = ", ".join(contents)
+    videos = "\n\n".join(f"[VIDEO {video_id}]\n{content}" for video_id, content in contents.items())
+    return f"""Analyze each of these {len(contents)} TikTok videos separately through 4 different lenses. Return a JSON object whose keys are exactly these video IDs: {ids}. Each value must be an object with exactly these keys: investment, product, content, knowledge.
+
+VIDEOS:
+
+{videos}
+
+ANALYSIS LENSES (apply to every video on its own):
+
+{_lens_sections()}
+
+Return ONLY valid JSON, no markdown formatting or code blocks."""
+
+
+def _lens_prompt(lens: str, content: str) -> str:
+    """Prompt for a single lens, answered with that lens's fields only."""
+    return f"""Analyze this TikTok video content through the {lens} lens. Return a JSON object with exactly the fields listed below.
+
+VIDEO CONTENT:
+{content}
+
+{lens.upper()} LENS:
+{LENS_PROMPTS[lens]}
 
 Return ONLY valid JSON, no markdown formatting or code blocks."""
 
+
+def _chunk_summary_prompt(chunk: str, index: int, total: int) -> str:
+    """Prompt condensing one part of a long transcript."""
+    return f"""This is part {index} of {total} of a TikTok video transcript (parts overlap slightly).
+
+Summarize it in at most {CHUNK_SUMMARY_TOKENS * 3 // 4} words. Keep every concrete fact, number, product, company, claim, framework and recommendation, and note the hook or storytelling techniques used. Do not add commentary.
+
+TRANSCRIPT PART {index}/{total}:
+{chunk}"""
+
+
+async def _summarize_chunk(chunk: str, index: int, total: int) -> str:
+    """Condense one chunk, falling back to its opening if the call fails."""
     try:
-        text = call_llm(prompt).strip()
-
-        # Clean up potential markdown formatting
-        if text.startswith("```"):
-            text = text.split("\n", 1)[1]
-        if text.endswith("```"):
-            text = text.rsplit("```", 1)[0]
-        if text.startswith("json"):
-            text = text[4:]
-
-        return json.loads(text)
-    except json.JSONDecodeError as e:
-        return {
-            "investment": {"error": f"JSON parse error: {e}"},
-            "product": {"error": f"JSON parse error: {e}"},
-            "content": {"error": f"JSON parse error: {e}"},
-            "knowledge": {"error": f"JSON parse error: {e}"},
-        }
+        return (await complete_prompt(_chunk_summary_prompt(chunk, index, total), task="summary")).strip()
     except Exception as e:
-        return {
-            "investment": {"error": str(e)},
-            "product": {"error": str(e)},
-            "content": {"error": str(e)},
-            "knowledge": {"error": str(e)},
-        }
+        print(f"LLM: chunk {index}/{total} summary failed ({e}) - using raw excerpt")
+        return truncate_to_tokens(chunk, CHUNK_SUMMARY_TOKENS)
 
 
-def chat_with_video(video, message: str) -> str:
+async def condense_transcript_async(transcript: Optional[str]) -> Optional[str]:
     """
-    Chat about a specific video's content and analysis.
+    Fit a transcript into the analysis token budget.
+
+    Transcripts within settings.analysis_max_transcript_tokens are returned
+    as-is (the single-call fast path). Longer ones are split into
+    overlapping chunks that are summarised concurrently; the analysis then
+    runs over the joined summaries.
     """
-    # Build context from video
-    context_parts = [
-        f"Title: {video.title}" if video.title else None,
-        f"Creator: {video.creator}" if video.creator else None,
-        f"Description: {video.description}" if video.description else None,
-        f"Transcript: {video.transcript}" if video.transcript else None,
-        f"Investment Analysis: {json.dumps(video.investment_analysis)}" if video.investment_analysis else None,
-        f"Product Analysis: {json.dumps(video.product_analysis)}" if video.product_analysis else None,
-        f"Content Analysis: {json.dumps(video.content_analysis)}" if video.content_analysis else None,
-        f"Knowledge Analysis: {json.dumps(video.knowledge_analysis)}" if video.knowledge_analysis else None,
-    ]
-    context = "\n\n".join([p for p in context_parts if p])
+    if not transcript or estimate_tokens(transcript) <= settings.analysis_max_transcript_tokens:
+        return transcript
+
+    chunks = split_into_chunks(
+        transcript, settings.analysis_chunk_tokens, settings.analysis_chunk_overlap_tokens
+    )
+    print(f"LLM: transcript ~{estimate_tokens(transcript)} tokens - summarizing {len(chunks)} chunks")
+    summaries = await asyncio.gather(
+        *(_summarize_chunk(chunk, i, len(chunks)) for i, chunk in enumerate(chunks, 1))
+    )
+    condensed = "\n\n".join(
+        f"[Part {i}/{len(chunks)} summary] {summary}" for i, summary in enumerate(summaries, 1)
+    )
+    # Many chunks can still add up to too much; keep the budget a hard cap
+    return truncate_to_tokens(condensed, settings.analysis_max_transcript_tokens)
 
-    prompt = f"""You are a research assistant helping analyze a TikTok video. Use the video context below to answer the user's question.
 
-VIDEO CONTEXT:
-{context}
+def _error_analysis(message: str) -> dict:
+    return {lens: {"error": message} for lens in LENSES}
+
+
+def _cache_key(prompt_version: str, fields: dict, model: str) -> str:
+    """analysis_cache key for a video's analysis inputs as answered by a model."""
+    return analysis_cache.cache_key(
+        model,
+        prompt_version,
+        title=fields.get("title"),
+        description=fields.get("description"),
+        hashtags=fields.get("hashtags"),
+        transcript=fields.get("transcript"),
+        context=fields.get("context"),
+    )
+
 
-USER QUESTION: {message}
+def _cache_get(prompt_version: str, fields: dict) -> Optional[dict]:
+    """A cached analysis of these inputs by any model the analysis route may use."""
+    return analysis_cache.get_any(_cache_key(prompt_version, fields, model) for model in route_models("analysis"))
 
-Provide a helpful, concise answer based on the video content and analysis. If the question isn't answerable from the context, say so."""
 
+def _cache_put(prompt_version: str, fields: dict, analysis: dict, models: set) -> None:
+    """
+    Cache a complete analysis under the model that produced it.
+
+    Analyses assembled from several models' answers (after a fallback) are
+    not cached, so every entry holds one model's output.
+    """
+    if _is_complete(analysis) and len(models) == 1:
+        analysis_cache.put(_cache_key(prompt_version, fields, next(iter(models))), analysis)
+
+
+def _prompt_version(mode: str) -> str:
+    return ANALYSIS_PROMPT_VERSION if mode == "combined" else f"{ANALYSIS_PROMPT_VERSION}-{mode}"
+
+
+def _is_complete(analysis) -> bool:
+    """True when every lens holds a real result."""
+    return isinstance(analysis, dict) and all(_lens_ok(analysis, lens) for lens in LENSES)
+
+
+def analyze_video(
+    transcript: Optional[str] = None,
+    title: Optional[str] = None,
+    description: Optional[str] = None,
+    hashtags: Optional[List[str]] = None,
+    context: Optional[str] = None,
+    mode: Optional[str] = None,
+) -> dict:
+    """
+    Run 4-lens analysis on video content.
+
+    mode (default settings.analysis_mode) is "combined" for one prompt that
+    returns every lens, or "per_lens" for four concurrent smaller requests
+    where only failed lenses are retried. Long transcripts are condensed
+    first (see condense_transcript_async). Identical inputs (after
+    normalisation) are served from analysis_cache instead of calling the
+    LLM again.
+
+    Returns dict with keys: investment, product, content, knowledge
+    """
+    mode = mode or settings.analysis_mode
+    fields = dict(transcript=transcript, title=title, description=description, hashtags=hashtags, context=context)
+    if not build_content(**fields).strip():
+        return _error_analysis("No content to analyze")
+
+    cached = _cache_get(_prompt_version(mode), fields)
+    if cached is not None:
+        return cached
+
+    models: set = set()
+    analysis = _run_analysis(fields, mode, models)
+    # Only complete analyses are worth reusing
+    _cache_put(_prompt_version(mode), fields, analysis, models)
+    return analysis
+
+
+def _run_analysis(fields: dict, mode: str, models: Optional[set] = None) -> dict:
+    """Call the LLM for one video, without the cache; answering models are added to models."""
+    transcript = fields.get("transcript")
+    if transcript and estimate_tokens(transcript) > settings.analysis_max_transcript_tokens:
+        fields = {**fields, "transcript": run_sync(condense_transcript_async(transcript))}
+    content = build_content(**fields)
+
+    if mode == "per_lens":
+        return run_sync(analyze_lenses_async(content, models=models))
+    try:
+        text = call_llm(_combined_prompt(content), models)
+    except Exception as e:
+        return _error_analysis(str(e))
+    try:
+        analysis = extract_json(text)
+    except JSONExtractError as e:
+        print(f"LLM: {e} - requesting lenses separately")
+        analysis = {}
+    return _fill_broken_lenses(analysis, content, models)
+
+
+def _fill_broken_lenses(analysis: dict, content: str, models: Optional[set] = None) -> dict:
+    """Keep the valid lenses of an answer and re-request only the broken ones."""
+    broken = [lens for lens in LENSES if not _lens_ok(analysis, lens)]
+    result = {lens: analysis[lens] for lens in LENSES if lens not in broken}
+    if broken:
+        print(f"LLM: re-requesting invalid lens(es): {', '.join(broken)}")
+        result.update(run_sync(analyze_lenses_async(content, broken, models)))
+    return result
+
+
+def analyze_videos_batch(videos: dict) -> dict:
+    """
+    Analyse several videos, packing small ones into shared requests.
+
+    videos maps any ID to analyze_video's keyword arguments (transcript,
+    title, description, hashtags, context); the result maps the same IDs to
+    analyses. Videos whose content fits settings.analysis_batch_item_tokens
+    are sent up to settings.analysis_batch_size per request, so the lens
+    instructions are paid for once per batch. Larger videos, and any batched
+    video whose answer is missing or incomplete, go through analyze_video on
+    their own.
+
+    Batched answers use the same lens instructions as the combined prompt,
+    so they share its cache entries.
+    """
+    results = {}
+    small = {}
+    for video_id, fields in videos.items():
+        content = build_content(**fields)
+        if not content.strip():
+            results[video_id] = _error_analysis("No content to analyze")
+            continue
+        if estimate_tokens(content) > settings.analysis_batch_item_tokens:
+            results[video_id] = analyze_video(**fields)
+            continue
+        cached = _cache_get(ANALYSIS_PROMPT_VERSION, fields)
+        if cached is not None:
+            results[video_id] = cached
+        else:
+            small[video_id] = content
+
+    pending = list(small)
+    size = max(1, settings.analysis_batch_size)
+    for start in range(0, len(pending), size):
+        batch = pending[start:start + size]
+        # Positional IDs keep the schema simple whatever the caller's keys are
+        labels = {f"video_{i}": video_id for i, video_id in enumerate(batch, 1)}
+
+        answer = {}
+        batch_models: set = set()
+        if len(batch) > 1:
+            prompt = _batch_prompt({label: small[video_id] for label, video_id in labels.items()})
+            try:
+                answer = extract_json(call_llm(prompt, batch_models))
+            except Exception as e:
+                print(f"LLM: batch of {len(batch)} failed ({e}) - analysing individually")
+
+        for label, video_id in labels.items():
+            analysis = answer.get(label)
+            if isinstance(analysis, dict) and any(_lens_ok(analysis, lens) for lens in LENSES):
+                # Partly valid - only the broken lenses are asked for again
+                models = set(batch_models)
+                analysis = _fill_broken_lenses(analysis, small[video_id], models)
+                prompt_version = ANALYSIS_PROMPT_VERSION
+            else:
+                # Missing or unusable in the batch answer - retry this one alone
+                models = set()
+                analysis = _run_analysis(videos[video_id], settings.analysis_mode, models)
+                prompt_version = _prompt_version(settings.analysis_mode)
+            _cache_put(prompt_version, videos[video_id], analysis, models)
+            results[video_id] = analysis
+    return results
+
+
+async def analyze_lens_async(lens: str, content: str, models: Optional[set] = None) -> dict:
+    """Run one lens; errors come back as {"error": ...} like the combined mode."""
+    try:
+        result = extract_json(await complete_prompt(_lens_prompt(lens, content), task="analysis", answered_by=models))
+    except JSONExtractError as e:
+        return {"error": f"JSON parse error: {e}"}
+    except Exception as e:
+        return {"error": str(e)}
+
+    # Models sometimes wrap the fields in the lens key anyway
+    if isinstance(result.get(lens), dict) and len(result) == 1:
+        result = result[lens]
+    error = lens_error(lens, result)
+    if error:
+        return {"error": f"Invalid {lens} analysis: {error}"}
+    return result
+
+
+async def analyze_lenses_async(content: str, lenses=LENSES, models: Optional[set] = None) -> dict:
+    """
+    Run lenses as concurrent requests and merge them.
+
+    Wall-clock time is roughly that of the slowest lens. Lenses that fail
+    are sent again (up to LENS_ATTEMPTS in total) while the good ones are
+    kept.
+    """
+    analysis = {}
+    pending = list(lenses)
+    for _ in range(LENS_ATTEMPTS):
+        results = await asyncio.gather(*(analyze_lens_async(lens, content, models) for lens in pending))
+        analysis.update(zip(pending, results))
+        pending = [lens for lens in pending if not _lens_ok(analysis, lens)]
+        if not pending:
+            break
+        print(f"LLM: retrying failed lens(es): {', '.join(pending)}")
+    return analysis
+
+
+async def reanalyze_lens_async(video, lens: str) -> dict:
+    """Re-run a single lens for a stored video, bypassing the analysis cache."""
+    transcript = await condense_transcript_async(video.transcript)
+    content = build_content(transcript, video.title, video.description, video.hashtags, video.context)
+    if not content.strip():
+        return {"error": "No content to analyze"}
+    return (await analyze_lenses_async(content, [lens]))[lens]
+
+
+async def chat_async(messages: list[dict]) -> str:
+    """Answer a chat request (see chat_context.build_chat_messages)."""
     try:
-        return call_llm(prompt).strip()
+        return (await complete(messages, task="chat")).strip()
     except Exception as e:
         return f"Error generating response: {e}"
+
+
+async def stream_chat(messages: list[dict]):
+    """Yield a chat answer as it is generated (raises LLMError on failure)."""
+    async for text in stream(messages, task="chat"):
+        yield text
@@ -0,0 +1,255 @@
+"""Async OpenRouter client with retries, backoff, hedging and a concurrency limit."""
+import asyncio
+import json
+import random
+import threading
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from config import get_settings
+from http_client import get_async_client
+import rate_limiter
+
+settings = get_settings()
+
+OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+DEFAULT_MODEL = "google/gemini-2.0-flash-001"  # Fast and cheap via OpenRouter
+
+REQUEST_TIMEOUT = 60.0
+# Full-jitter exponential backoff: sleep uniform(0, min(MAX, BASE * 2**attempt))
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 30.0
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+_lock = threading.Lock()
+_semaphores: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+
+class LLMError(Exception):
+    """An LLM request that failed for good (after retries, or not retryable)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """In-flight request limit for the running loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        for stale in [k for k in _semaphores if k.is_closed()]:
+            del _semaphores[stale]
+        semaphore = _semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.llm_max_in_flight)
+            _semaphores[loop] = semaphore
+        return semaphore
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Seconds to wait before retry number `attempt` (0-based)."""
+    delay = random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt))
+    if retry_after is not None:
+        # The server's hint is a floor; jitter on top keeps retries from syncing up
+        delay += retry_after
+    return delay
+
+
+async def _post(payload: dict, timeout: float) -> httpx.Response:
+    """Send one request inside the in-flight limit and the provider rate limit."""
+    async with _get_semaphore():
+        await rate_limiter.acquire("openrouter")
+        return await get_async_client("openrouter").post(
+            OPENROUTER_API_URL,
+            headers={
+                "Authorization": f"Bearer {settings.openrouter_api_key}",
+                "Content-Type": "application/json",
+            },
+            json=payload,
+            timeout=timeout,
+        )
+
+
+async def _hedged_post(payload: dict, timeout: float) -> httpx.Response:
+    """
+    Send a request, duplicating it if the first copy is slow.
+
+    If no answer arrives within settings.llm_hedge_after seconds a second
+    copy is sent, and whichever finishes first wins; the other is cancelled.
+    A copy that fails outright is ignored while the other is still running.
+    """
+    hedge_after = settings.llm_hedge_after
+    first = asyncio.create_task(_post(payload, timeout))
+    if not hedge_after or hedge_after <= 0 or hedge_after >= timeout:
+        return await first
+
+    tasks = {first}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            tasks.add(asyncio.create_task(_post(payload, timeout)))
+
+        while True:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None or not pending:
+                    return task.result()
+            tasks = pending
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def complete(
+    messages: list[dict],
+    model: str = DEFAULT_MODEL,
+    timeout: float = REQUEST_TIMEOUT,
+    max_attempts: Optional[int] = None,
+    usage: Optional[dict] = None,
+) -> str:
+    """
+    Run a chat completion and return the message text.
+
+    429, 5xx and transport errors are retried with jittered exponential
+    backoff; a 429's Retry-After also pauses every other caller through the
+    rate limiter. Raises LLMError once the attempts are used up. If a usage
+    dict is passed it is filled with the provider's token and cost counts.
+    """
+    payload = _payload(model, messages, usage)
+    attempts = max_attempts or settings.llm_max_attempts
+    error: Optional[LLMError] = None
+
+    for attempt in range(attempts):
+        retry_after = None
+        try:
+            response = await _hedged_post(payload, timeout)
+        except httpx.TransportError as e:
+            error = LLMError(f"OpenRouter request failed: {e!r}")
+        else:
+            if response.status_code == 200:
+                try:
+                    body = response.json()
+                    text = body["choices"][0]["message"]["content"]
+                    if usage is not None:
+                        usage.update(body.get("usage") or {})
+                    return text
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    raise LLMError(f"Malformed OpenRouter response: {e!r}", 200) from e
+
+            error = LLMError(
+                f"OpenRouter error {response.status_code}: {response.text[:200]}",
+                response.status_code,
+            )
+            if response.status_code not in RETRYABLE_STATUS:
+                raise error
+            if response.status_code == 429 or "retry-after" in response.headers:
+                retry_after = rate_limiter.retry_after_seconds(response.headers)
+                if response.status_code == 429:
+                    rate_limiter.penalize("openrouter", retry_after)
+
+        if attempt + 1 < attempts:
+            delay = backoff_delay(attempt, retry_after)
+            print(f"LLM: {error} - retrying in {delay:.1f}s ({attempt + 1}/{attempts})")
+            await asyncio.sleep(delay)
+
+    raise error
+
+
+async def stream(
+    messages: list[dict],
+    model: str = DEFAULT_MODEL,
+    timeout: float = REQUEST_TIMEOUT,
+    max_attempts: Optional[int] = None,
+    usage: Optional[dict] = None,
+) -> AsyncIterator[str]:
+    """
+    Run a chat completion and yield the text as it is generated.
+
+    Failures before the first token are retried like complete(); once text
+    has been yielded a failure raises LLMError, since the caller has
+    already relayed part of the answer. Streams are not hedged. A usage
+    dict is filled from the final chunk, as in complete().
+    """
+    payload = {**_payload(model, messages, usage), "stream": True}
+    attempts = max_attempts or settings.llm_max_attempts
+    error: Optional[LLMError] = None
+
+    for attempt in range(attempts):
+        retry_after = None
+        started = False
+        try:
+            async with _get_semaphore():
+                await rate_limiter.acquire("openrouter")
+                async with get_async_client("openrouter").stream(
+                    "POST",
+                    OPENROUTER_API_URL,
+                    headers={
+                        "Authorization": f"Bearer {settings.openrouter_api_key}",
+                        "Content-Type": "application/json",
+                    },
+                    json=payload,
+                    timeout=timeout,
+                ) as response:
+                    if response.status_code == 200:
+                        async for text in _iter_sse_text(response, usage):
+                            started = True
+                            yield text
+                        return
+
+                    body = (await response.aread()).decode("utf-8", "replace")
+                    error = LLMError(f"OpenRouter error {response.status_code}: {body[:200]}", response.status_code)
+                    if response.status_code not in RETRYABLE_STATUS:
+                        raise error
+                    if response.status_code == 429 or "retry-after" in response.headers:
+                        retry_after = rate_limiter.retry_after_seconds(response.headers)
+                        if response.status_code == 429:
+                            rate_limiter.penalize("openrouter", retry_after)
+        except httpx.TransportError as e:
+            if started:
+                raise LLMError(f"OpenRouter stream interrupted: {e!r}") from e
+            error = LLMError(f"OpenRouter request failed: {e!r}")
+
+        if attempt + 1 < attempts:
+            delay = backoff_delay(attempt, retry_after)
+            print(f"LLM: {error} - retrying in {delay:.1f}s ({attempt + 1}/{attempts})")
+            await asyncio.sleep(delay)
+
+    raise error
+
+
+def _payload(model: str, messages: list[dict], usage: Optional[dict]) -> dict:
+    payload = {"model": model, "messages": messages}
+    if usage is not None:
+        # Ask OpenRouter to include the billed cost alongside the token counts
+        payload["usage"] = {"include": True}
+    return payload
+
+
+async def _iter_sse_text(response: httpx.Response, usage: Optional[dict] = None) -> AsyncIterator[str]:
+    """Yield the content deltas of an OpenRouter SSE stream."""
+    async for line in response.aiter_lines():
+        # Blank lines separate events; ":" lines are keep-alive comments
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            continue
+        if "error" in chunk:
+            raise LLMError(f"OpenRouter stream error: {chunk['error']}")
+        if usage is not None and chunk.get("usage"):
+            usage.update(chunk["usage"])
+        for choice in chunk.get("choices") or []:
+            text = (choice.get("delta") or {}).get("content")
+            if text:
+                yield text
+
+
+async def complete_prompt(prompt: str, model: str = DEFAULT_MODEL, **kwargs) -> str:
+    """complete() for a single user prompt."""
+    return await complete([{"role": "user", "content": prompt}], model=model, **kwargs)
@@ -0,0 +1,67 @@
+"""Migration script to add chat context columns to the videos table.
+
+Run this once to add the stored chat context and rolling chat summary
+columns to an existing database. Contexts are built lazily on the next
+chat message, so no backfill is needed.
+Usage: python migrations/add_chat_context_columns.py
+"""
+import sqlite3
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations.add_discord_columns import get_db_path
+
+COLUMNS = {
+    "chat_context": "TEXT",
+    "chat_context_key": "VARCHAR(64)",
+    "chat_summary": "TEXT",
+    "chat_summary_through_id": "INTEGER",
+}
+
+
+def migrate():
+    """Add chat context columns to the videos table."""
+    db_path = get_db_path()
+
+    if not os.path.exists(db_path):
+        print(f"Database not found at {db_path}. No migration needed.")
+        return
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        # Check if columns already exist
+        cursor.execute("PRAGMA table_info(videos)")
+        columns = [col[1] for col in cursor.fetchall()]
+
+        migrations_applied = 0
+
+        for name, column_type in COLUMNS.items():
+            if name not in columns:
+                cursor.execute(f"ALTER TABLE videos ADD COLUMN {name} {column_type}")
+                print(f"Added {name} column")
+                migrations_applied += 1
+            else:
+                print(f"{name} column already exists")
+
+        conn.commit()
+
+        if migrations_applied > 0:
+            print(f"Migration complete. {migrations_applied} column(s) added.")
+        else:
+            print("No migrations needed. All columns already exist.")
+
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,80 @@
+"""Migration script to add job coalescing columns to the videos table.
+
+Run this once to add tiktok_video_id and coalesced_into_id to an existing
+database. Existing rows with a standard TikTok URL get their video ID
+backfilled so new submissions can attach to them.
+Usage: python migrations/add_coalescing_columns.py
+"""
+import sqlite3
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations.add_discord_columns import get_db_path
+from tiktok_url import parse_tiktok_url
+
+
+def migrate():
+    """Add coalescing columns to the videos table."""
+    db_path = get_db_path()
+
+    if not os.path.exists(db_path):
+        print(f"Database not found at {db_path}. No migration needed.")
+        return
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        # Check if columns already exist
+        cursor.execute("PRAGMA table_info(videos)")
+        columns = [col[1] for col in cursor.fetchall()]
+
+        migrations_applied = 0
+
+        if "tiktok_video_id" not in columns:
+            cursor.execute("ALTER TABLE videos ADD COLUMN tiktok_video_id VARCHAR(50)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS ix_videos_tiktok_video_id ON videos (tiktok_video_id)")
+            print("Added tiktok_video_id column")
+            migrations_applied += 1
+        else:
+            print("tiktok_video_id column already exists")
+
+        if "coalesced_into_id" not in columns:
+            cursor.execute("ALTER TABLE videos ADD COLUMN coalesced_into_id INTEGER")
+            cursor.execute("CREATE INDEX IF NOT EXISTS ix_videos_coalesced_into_id ON videos (coalesced_into_id)")
+            print("Added coalesced_into_id column")
+            migrations_applied += 1
+        else:
+            print("coalesced_into_id column already exists")
+
+        # Backfill video IDs for standard URLs (short links resolve on next submission)
+        cursor.execute("SELECT id, tiktok_url FROM videos WHERE tiktok_video_id IS NULL")
+        backfilled = 0
+        for row_id, url in cursor.fetchall():
+            parsed = parse_tiktok_url(url)
+            if parsed and parsed.video_id:
+                cursor.execute("UPDATE videos SET tiktok_video_id = ? WHERE id = ?", (parsed.video_id, row_id))
+                backfilled += 1
+        if backfilled:
+            print(f"Backfilled tiktok_video_id for {backfilled} video(s)")
+
+        conn.commit()
+
+        if migrations_applied > 0:
+            print(f"Migration complete. {migrations_applied} column(s) added.")
+        else:
+            print("No migrations needed. All columns already exist.")
+
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrate()
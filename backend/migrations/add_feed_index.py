@@ -0,0 +1,42 @@
+"""Migration script to add the feed pagination index.
+
+Run this once to add the (created_at, id) index that cursor pagination of
+/api/videos walks. New databases get it from init_db.
+Usage: python migrations/add_feed_index.py
+"""
+import sqlite3
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations.add_discord_columns import get_db_path
+
+
+def migrate():
+    """Create the composite created_at/id index on the videos table."""
+    db_path = get_db_path()
+
+    if not os.path.exists(db_path):
+        print(f"Database not found at {db_path}. No migration needed.")
+        return
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_videos_created_at_id ON videos (created_at, id)")
+        conn.commit()
+        print("Migration complete. ix_videos_created_at_id is in place.")
+
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrate()
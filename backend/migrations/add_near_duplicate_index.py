@@ -0,0 +1,94 @@
+"""Migration script to add near-duplicate transcript detection.
+
+Run this once to add the transcript signature and near-duplicate link
+columns to the videos table, create the LSH band table and index every
+completed video that already has a transcript.
+Usage: python migrations/add_near_duplicate_index.py
+"""
+import sqlite3
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations.add_discord_columns import get_db_path
+
+COLUMNS = {
+    "transcript_minhash": "BLOB",
+    "near_duplicate_of_id": "INTEGER",
+}
+
+
+def migrate():
+    """Add near-duplicate columns and build the transcript index."""
+    db_path = get_db_path()
+
+    if not os.path.exists(db_path):
+        print(f"Database not found at {db_path}. No migration needed.")
+        return
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        # Check if columns already exist
+        cursor.execute("PRAGMA table_info(videos)")
+        columns = [col[1] for col in cursor.fetchall()]
+
+        migrations_applied = 0
+
+        for name, column_type in COLUMNS.items():
+            if name not in columns:
+                cursor.execute(f"ALTER TABLE videos ADD COLUMN {name} {column_type}")
+                print(f"Added {name} column")
+                migrations_applied += 1
+            else:
+                print(f"{name} column already exists")
+
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_videos_near_duplicate_of_id ON videos (near_duplicate_of_id)")
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS transcript_lsh ("
+            "id INTEGER PRIMARY KEY, band_hash INTEGER NOT NULL, video_id INTEGER NOT NULL)"
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_transcript_lsh_band_hash ON transcript_lsh (band_hash)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_transcript_lsh_video_id ON transcript_lsh (video_id)")
+
+        # Index existing analysed videos that are not in the index yet
+        from near_duplicates import band_hashes, pack, signature
+
+        cursor.execute(
+            "SELECT id, transcript FROM videos "
+            "WHERE status = 'completed' AND transcript IS NOT NULL AND near_duplicate_of_id IS NULL "
+            "AND id NOT IN (SELECT video_id FROM transcript_lsh)"
+        )
+        indexed = 0
+        for video_id, transcript in cursor.fetchall():
+            sig = signature(transcript)
+            if sig is None:
+                continue
+            cursor.execute("UPDATE videos SET transcript_minhash = ? WHERE id = ?", (pack(sig), video_id))
+            cursor.executemany(
+                "INSERT INTO transcript_lsh (band_hash, video_id) VALUES (?, ?)",
+                [(key, video_id) for key in band_hashes(sig)],
+            )
+            indexed += 1
+
+        conn.commit()
+
+        if migrations_applied > 0:
+            print(f"Migration complete. {migrations_applied} column(s) added.")
+        else:
+            print("No migrations needed. All columns already exist.")
+        print(f"Indexed {indexed} existing transcript(s).")
+
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,292 @@
+"""Per-call model choice by task, input size, latency SLO and observed health."""
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+
+from config import get_settings
+from http_client import run_sync
+import llm_client
+from llm_client import LLMError
+import provider_health
+from text_budget import estimate_tokens
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """An OpenRouter model with its list price in USD per million tokens."""
+
+    name: str
+    input_price: float
+    output_price: float
+    context_tokens: int
+
+
+MODELS = {
+    spec.name: spec
+    for spec in (
+        ModelSpec("google/gemini-2.0-flash-001", 0.10, 0.40, 1_000_000),
+        ModelSpec("openai/gpt-4o-mini", 0.15, 0.60, 128_000),
+        ModelSpec("google/gemini-2.5-flash", 0.30, 2.50, 1_000_000),
+    )
+}
+
+# Candidates per task, preferred first; later ones are the fallbacks.
+# "analysis_long" replaces "analysis" once the input reaches
+# settings.llm_strong_model_min_tokens.
+ROUTES = {
+    "analysis": ("google/gemini-2.0-flash-001", "openai/gpt-4o-mini"),
+    "analysis_long": ("google/gemini-2.5-flash", "google/gemini-2.0-flash-001"),
+    "summary": ("google/gemini-2.0-flash-001", "openai/gpt-4o-mini"),
+    "chat": ("google/gemini-2.0-flash-001", "openai/gpt-4o-mini"),
+}
+
+# Attempts on a model before moving to the next candidate; the last
+# candidate gets the client's full retry budget
+FALLBACK_ATTEMPTS = 2
+
+# Statuses that say the model is unhealthy; other 4xx mean the request was
+# at fault and don't count against the model's circuit
+MODEL_FAILURE_STATUS = {408, 429}
+
+
+def _health_key(model: str) -> str:
+    """provider_health name for a model (kept apart from the scrape providers)."""
+    return f"llm:{model}"
+
+
+def route_models(task: str) -> list[str]:
+    """Every model that may answer a task (any input size), in preference order."""
+    routes = [ROUTES[name] for name in (task, f"{task}_long") if name in ROUTES]
+    return list(dict.fromkeys(model for route in routes for model in route))
+
+
+def latency_slo(task: str) -> float:
+    return settings.llm_latency_slo_chat if task == "chat" else settings.llm_latency_slo_analysis
+
+
+def choose_models(task: str, input_tokens: int) -> list[str]:
+    """
+    Order the candidate models for a call.
+
+    The route is picked by task and input size, models whose context is too
+    small are dropped, models with an open circuit are skipped, and models
+    whose p95 latency breaks the task's SLO move behind the ones that meet
+    it. If every circuit is open the route is returned as-is so there is
+    always something to try. No half-open probe slot is taken here; see
+    _attempts.
+    """
+    route = ROUTES[task]
+    if task == "analysis" and input_tokens >= settings.llm_strong_model_min_tokens:
+        route = ROUTES["analysis_long"]
+    route = [m for m in route if MODELS[m].context_tokens > input_tokens] or list(route)
+
+    fast, slow = [], []
+    for model in route:
+        if provider_health.is_open(_health_key(model)):
+            continue
+        stats = provider_health.get_stats(_health_key(model))
+        if stats["samples"] >= provider_health.MIN_SAMPLES and stats["p95_latency"] > latency_slo(task):
+            slow.append(model)
+        else:
+            fast.append(model)
+    return fast + slow or list(route)
+
+
+def _attempts(models: list[str]):
+    """
+    Yield (index, model) for each candidate whose circuit lets a call through.
+
+    The circuit is checked just before the call, so fallbacks that are never
+    reached don't use up a half-open probe slot. If nothing has been tried by
+    the last candidate it is tried anyway.
+    """
+    tried = False
+    for index, model in enumerate(models):
+        last = index == len(models) - 1
+        if provider_health.allow_request(_health_key(model)) or (last and not tried):
+            tried = True
+            yield index, model
+
+
+def _is_model_failure(error: Optional[LLMError]) -> bool:
+    """Timeouts and transport errors, 408, 429 and 5xx count against a model; bad requests don't."""
+    if error is None:
+        return False
+    status = error.status_code
+    return status is None or status in MODEL_FAILURE_STATUS or status >= 500
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """List-price cost in USD, for when the provider doesn't report one."""
+    spec = MODELS.get(model)
+    if spec is None:
+        return 0.0
+    return (prompt_tokens * spec.input_price + completion_tokens * spec.output_price) / 1_000_000
+
+
+def _save_call(model: str, healthy: bool, latency: float, **fields) -> None:
+    """Update the model's health and store the call (blocking: Redis and SQLite round trips)."""
+    from database import LLMCall, SessionLocal
+
+    provider_health.record_result(_health_key(model), healthy, latency)
+    db = SessionLocal()
+    try:
+        db.add(LLMCall(model=model, **fields))
+        db.commit()
+    except Exception as e:
+        print(f"LLM router: failed to record usage: {e}")
+    finally:
+        db.close()
+
+
+async def _record(task, model, started, input_tokens, usage, text="", error=None) -> None:
+    """Feed the model's health stats and store the call's token and cost accounting."""
+    latency = time.monotonic() - started
+
+    # Estimates stand in when the provider didn't report counts (e.g. failed calls)
+    prompt_tokens = usage.get("prompt_tokens", input_tokens)
+    completion_tokens = usage.get("completion_tokens", estimate_tokens(text))
+    cost = usage.get("cost")
+    if cost is None:
+        cost = estimate_cost(model, prompt_tokens, completion_tokens) if error is None else 0.0
+    # Off the event loop, so other requests and streams aren't held up by the bookkeeping
+    await asyncio.to_thread(
+        _save_call,
+        model,
+        not _is_model_failure(error),
+        latency,
+        task=task,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cost_usd=cost,
+        latency_ms=int(latency * 1000),
+        ok=error is None,
+        error=str(error)[:500] if error else None,
+    )
+
+
+def _input_tokens(messages: list[dict]) -> int:
+    return sum(estimate_tokens(m.get("content") or "") for m in messages)
+
+
+def _call_options(models: list[str], index: int, task: str) -> dict:
+    """Timeout and attempts: earlier candidates are cut off at the SLO so the fallback gets a turn."""
+    if index == len(models) - 1:
+        return {}
+    return {"timeout": min(latency_slo(task), llm_client.REQUEST_TIMEOUT), "max_attempts": FALLBACK_ATTEMPTS}
+
+
+async def complete(messages: list[dict], task: str, answered_by: Optional[set] = None) -> str:
+    """
+    Run a chat completion on the best model for the task, falling back on failure.
+
+    If an answered_by set is passed, the model that answered is added to it.
+    """
+    input_tokens = _input_tokens(messages)
+    models = choose_models(task, input_tokens)
+    error: Optional[LLMError] = None
+
+    for index, model in _attempts(models):
+        usage: dict = {}
+        started = time.monotonic()
+        try:
+            text = await llm_client.complete(messages, model=model, usage=usage, **_call_options(models, index, task))
+        except LLMError as e:
+            await _record(task, model, started, input_tokens, usage, error=e)
+            error = e
+            if index + 1 < len(models):
+                print(f"LLM router: {model} failed for {task} ({e}) - falling back to {models[index + 1]}")
+            continue
+        await _record(task, model, started, input_tokens, usage, text)
+        if answered_by is not None:
+            answered_by.add(model)
+        return text
+
+    raise error
+
+
+async def stream(messages: list[dict], task: str) -> AsyncIterator[str]:
+    """
+    stream() on the best model for the task.
+
+    Falls back to the next model only if nothing has been yielded yet.
+    """
+    input_tokens = _input_tokens(messages)
+    models = choose_models(task, input_tokens)
+    error: Optional[LLMError] = None
+
+    for index, model in _attempts(models):
+        usage: dict = {}
+        parts: list[str] = []
+        started = time.monotonic()
+        try:
+            async for text in llm_client.stream(messages, model=model, usage=usage, **_call_options(models, index, task)):
+                parts.append(text)
+                yield text
+        except LLMError as e:
+            await _record(task, model, started, input_tokens, usage, "".join(parts), error=e)
+            if parts:
+                raise
+            error = e
+            if index + 1 < len(models):
+                print(f"LLM router: {model} failed for {task} ({e}) - falling back to {models[index + 1]}")
+            continue
+        await _record(task, model, started, input_tokens, usage, "".join(parts))
+        return
+
+    raise error
+
+
+async def complete_prompt(prompt: str, task: str, answered_by: Optional[set] = None) -> str:
+    """complete() for a single user prompt."""
+    return await complete([{"role": "user", "content": prompt}], task, answered_by)
+
+
+def complete_sync(prompt: str, task: str, answered_by: Optional[set] = None) -> str:
+    """Blocking wrapper around complete_prompt for sync callers."""
+    return run_sync(complete_prompt(prompt, task, answered_by))
+
+
+def get_usage(db, hours: int = 24) -> dict:
+    """Per task and model call counts, tokens, cost and latency, plus model health."""
+    from sqlalchemy import case, func
+
+    from database import LLMCall
+
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    rows = (
+        db.query(
+            LLMCall.task,
+            LLMCall.model,
+            func.count(LLMCall.id),
+            func.sum(case((LLMCall.ok.is_(False), 1), else_=0)),
+            func.sum(LLMCall.prompt_tokens),
+            func.sum(LLMCall.completion_tokens),
+            func.sum(LLMCall.cost_usd),
+            func.avg(LLMCall.latency_ms),
+        )
+        .filter(LLMCall.created_at >= since)
+        .group_by(LLMCall.task, LLMCall.model)
+        .all()
+    )
+    return {
+        "hours": hours,
+        "calls": [
+            {
+                "task": task,
+                "model": model,
+                "calls": calls,
+                "failures": failures or 0,
+                "prompt_tokens": prompt_tokens or 0,
+                "completion_tokens": completion_tokens or 0,
+                "cost_usd": round(cost or 0.0, 6),
+                "avg_latency_ms": round(latency or 0),
+            }
+            for task, model, calls, failures, prompt_tokens, completion_tokens, cost, latency in rows
+        ],
+        "models": {model: provider_health.get_stats(_health_key(model)) for model in MODELS},
+    }
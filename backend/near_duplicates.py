@@ -0,0 +1,123 @@
+"""MinHash/LSH index for spotting reposts with near-identical transcripts."""
+import hashlib
+import random
+import re
+import zlib
+from array import array
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import get_settings
+from database import TranscriptBand, Video
+
+settings = get_settings()
+
+# Words per shingle
+SHINGLE_WORDS = 5
+# Signature length; BANDS * ROWS must equal it. 16 bands of 4 rows make
+# pairs with Jaccard ~0.5 and up likely to share a band, and the estimated
+# similarity is then checked against settings.near_duplicate_threshold.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Candidate videos compared per lookup, so a very common band can't slow it
+# down; the ones sharing the most bands (the likeliest matches) are kept
+MAX_CANDIDATES = 50
+
+_PRIME = (1 << 61) - 1
+_MASK = 0xFFFFFFFF
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _words(transcript: Optional[str]) -> list[str]:
+    return _WORD_RE.findall((transcript or "").lower())
+
+
+def signature(transcript: Optional[str]) -> Optional[list[int]]:
+    """MinHash signature of a transcript, or None if it is too short to compare."""
+    words = _words(transcript)
+    if len(words) < settings.near_duplicate_min_words:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles]
+    return [min(((a * h + b) % _PRIME) & _MASK for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def pack(sig: list[int]) -> bytes:
+    return array("I", sig).tobytes()
+
+
+def unpack(data: bytes) -> list[int]:
+    return array("I", data).tolist()
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """Estimated Jaccard similarity of the two transcripts' shingle sets."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def band_hashes(sig: list[int]) -> list[int]:
+    """One signed 64-bit key per LSH band (SQLite INTEGER range)."""
+    keys = []
+    for band in range(BANDS):
+        data = pack([band, *sig[band * ROWS:(band + 1) * ROWS]])
+        keys.append(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big", signed=True))
+    return keys
+
+
+def index_video(db: Session, video: Video) -> None:
+    """Add a video with its own analysis to the index (caller commits)."""
+    if not video.transcript_minhash:
+        return
+    db.query(TranscriptBand).filter(TranscriptBand.video_id == video.id).delete()
+    db.add_all(
+        TranscriptBand(band_hash=key, video_id=video.id)
+        for key in band_hashes(unpack(video.transcript_minhash))
+    )
+
+
+def find_match(db: Session, video: Video) -> Optional[tuple[Video, float]]:
+    """
+    Find an analysed video whose transcript nearly matches this one.
+
+    Computes and stores the video's signature, looks up videos sharing an
+    LSH band (an indexed equality lookup, so cost doesn't grow with the
+    corpus) and returns the most similar completed one at or above
+    settings.near_duplicate_threshold, with its similarity.
+    """
+    sig = signature(video.transcript)
+    video.transcript_minhash = pack(sig) if sig else None
+    if sig is None:
+        return None
+
+    shared = func.count(TranscriptBand.band_hash)
+    candidate_ids = [
+        video_id
+        for video_id, in db.query(TranscriptBand.video_id)
+        .filter(TranscriptBand.band_hash.in_(band_hashes(sig)), TranscriptBand.video_id != video.id)
+        .group_by(TranscriptBand.video_id)
+        .order_by(shared.desc(), TranscriptBand.video_id)
+        .limit(MAX_CANDIDATES)
+    ]
+    if not candidate_ids:
+        return None
+    candidates = (
+        db.query(Video.id, Video.transcript_minhash)
+        .filter(Video.id.in_(candidate_ids), Video.status == "completed")
+        .all()
+    )
+
+    best_id, best = None, 0.0
+    for candidate_id, data in candidates:
+        score = similarity(sig, unpack(data)) if data else 0.0
+        if score > best:
+            best_id, best = candidate_id, score
+    if best_id is None or best < settings.near_duplicate_threshold:
+        return None
+    return db.query(Video).filter(Video.id == best_id).first(), best
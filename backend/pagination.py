@@ -0,0 +1,74 @@
+"""Opaque keyset cursors and cached totals for paginated lists."""
+import base64
+import binascii
+import json
+import threading
+import time
+from typing import Callable, Hashable, Optional
+
+# How long a per-filter total is reused in cursor mode
+TOTAL_CACHE_SECONDS = 30
+TOTAL_CACHE_MAX_ENTRIES = 1000
+
+
+class InvalidCursor(ValueError):
+    """A cursor that wasn't issued by encode_cursor for this kind of list."""
+
+
+def encode_cursor(kind: str, *values) -> str:
+    """Pack the sort key of the last row on a page into an opaque token."""
+    payload = json.dumps([kind, *values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str) -> list:
+    """Unpack a cursor's sort key values, checking it belongs to this kind of list."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error) as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if not isinstance(payload, list) or not payload or payload[0] != kind:
+        raise InvalidCursor("Cursor does not match this query")
+    return payload[1:]
+
+
+class TotalCache:
+    """Short-lived per-filter row counts, so repeated page loads don't each count."""
+
+    def __init__(self, ttl: float = TOTAL_CACHE_SECONDS, max_entries: int = TOTAL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: dict[Hashable, tuple[float, int]] = {}
+
+    def get(self, key: Hashable, count: Callable[[], int]) -> int:
+        """Return the cached total for key, running count() if missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        total = count()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (now + self.ttl, total)
+        return total
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_totals: Optional[TotalCache] = None
+
+
+def get_total_cache() -> TotalCache:
+    """Get the process-wide total cache."""
+    global _totals
+    if _totals is None:
+        _totals = TotalCache()
+    return _totals
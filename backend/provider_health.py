@@ -0,0 +1,238 @@
+"""Per-provider health tracking and circuit breakers for the scrape chain."""
+import math
+import threading
+import time
+from collections import deque
+from typing import Iterable, Optional
+
+# Rolling window of outcomes per provider
+WINDOW_SIZE = 50
+# Minimum samples before stats override the static priority or trip a circuit
+MIN_SAMPLES = 5
+# Failure rate over the window that opens the circuit
+FAILURE_THRESHOLD = 0.6
+# How long an open circuit stays open before a half-open probe is allowed
+OPEN_SECONDS = 300
+# A half-open probe that never reports back frees its slot after this long
+PROBE_TIMEOUT = 120
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_REDIS_PREFIX = "provider_health"
+
+
+class MemoryBackend:
+    """In-process health store, used when Redis is unavailable."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque] = {}
+        self._states: dict[str, tuple[str, float]] = {}
+        self._probes: dict[str, float] = {}
+
+    def add_sample(self, provider: str, ok: bool, latency: float) -> None:
+        with self._lock:
+            self._samples.setdefault(provider, deque(maxlen=WINDOW_SIZE)).append((ok, latency))
+
+    def get_samples(self, provider: str) -> list[tuple[bool, float]]:
+        with self._lock:
+            return list(self._samples.get(provider, ()))
+
+    def get_state(self, provider: str) -> tuple[str, float]:
+        with self._lock:
+            return self._states.get(provider, (CLOSED, 0.0))
+
+    def set_state(self, provider: str, state: str, since: float) -> None:
+        with self._lock:
+            self._states[provider] = (state, since)
+            self._probes.pop(provider, None)
+
+    def try_probe(self, provider: str) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._probes.get(provider, 0) > now:
+                return False
+            self._probes[provider] = now + PROBE_TIMEOUT
+            return True
+
+    def release_probe(self, provider: str) -> None:
+        with self._lock:
+            self._probes.pop(provider, None)
+
+
+class RedisBackend:
+    """Redis health store, shared by every worker process."""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def _key(self, provider: str, kind: str) -> str:
+        return f"{_REDIS_PREFIX}:{provider}:{kind}"
+
+    def add_sample(self, provider: str, ok: bool, latency: float) -> None:
+        key = self._key(provider, "samples")
+        pipe = self.redis.pipeline()
+        pipe.lpush(key, f"{int(ok)}:{latency:.3f}")
+        pipe.ltrim(key, 0, WINDOW_SIZE - 1)
+        pipe.execute()
+
+    def get_samples(self, provider: str) -> list[tuple[bool, float]]:
+        samples = []
+        for raw in self.redis.lrange(self._key(provider, "samples"), 0, -1):
+            ok, latency = raw.decode().split(":")
+            samples.append((ok == "1", float(latency)))
+        return samples
+
+    def get_state(self, provider: str) -> tuple[str, float]:
+        data = self.redis.hgetall(self._key(provider, "state"))
+        if not data:
+            return CLOSED, 0.0
+        return data[b"state"].decode(), float(data[b"since"])
+
+    def set_state(self, provider: str, state: str, since: float) -> None:
+        pipe = self.redis.pipeline()
+        pipe.hset(self._key(provider, "state"), mapping={"state": state, "since": since})
+        pipe.delete(self._key(provider, "probe"))
+        pipe.execute()
+
+    def try_probe(self, provider: str) -> bool:
+        return bool(self.redis.set(self._key(provider, "probe"), 1, nx=True, ex=PROBE_TIMEOUT))
+
+    def release_probe(self, provider: str) -> None:
+        self.redis.delete(self._key(provider, "probe"))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Use Redis when reachable so all workers share health; otherwise stay in-process."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            from queue_manager import get_redis_if_available
+            redis = get_redis_if_available()
+            if redis is not None:
+                _backend = RedisBackend(redis)
+            else:
+                print("Provider health: tracking in-process")
+                _backend = MemoryBackend()
+        return _backend
+
+
+def _percentile(values: list[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def get_stats(provider: str) -> dict:
+    """Rolling success rate, latency percentiles and circuit state for a provider."""
+    backend = get_backend()
+    samples = backend.get_samples(provider)
+    state, since = backend.get_state(provider)
+    latencies = [latency for _, latency in samples]
+    successes = sum(1 for ok, _ in samples if ok)
+
+    return {
+        "provider": provider,
+        "state": state,
+        "state_since": since,
+        "samples": len(samples),
+        "success_rate": round(successes / len(samples), 3) if samples else None,
+        "p50_latency": _percentile(latencies, 50),
+        "p95_latency": _percentile(latencies, 95),
+    }
+
+
+def allow_request(provider: str) -> bool:
+    """
+    Check whether the chain may call a provider right now.
+
+    Open circuits reject calls until OPEN_SECONDS pass, then let a single
+    half-open probe through (across all workers) to test recovery.
+    """
+    backend = get_backend()
+    state, since = backend.get_state(provider)
+
+    if state == CLOSED:
+        return True
+    if state == OPEN:
+        if time.time() - since < OPEN_SECONDS:
+            return False
+        backend.set_state(provider, HALF_OPEN, time.time())
+    return backend.try_probe(provider)
+
+
+def is_open(provider: str) -> bool:
+    """True while a circuit is open and cooling down; unlike allow_request, takes no probe slot."""
+    state, since = get_backend().get_state(provider)
+    return state == OPEN and time.time() - since < OPEN_SECONDS
+
+
+def release_probe(provider: str) -> None:
+    """Free a half-open probe slot whose call was cancelled before it reported back."""
+    state, _ = get_backend().get_state(provider)
+    if state == HALF_OPEN:
+        get_backend().release_probe(provider)
+
+
+def record_result(provider: str, ok: bool, latency: float) -> None:
+    """Record a call outcome and move the circuit between states."""
+    backend = get_backend()
+    backend.add_sample(provider, ok, latency)
+    state, _ = backend.get_state(provider)
+
+    if state == HALF_OPEN:
+        backend.set_state(provider, CLOSED if ok else OPEN, time.time())
+        print(f"Provider health: {provider} circuit {'closed' if ok else 're-opened'} after probe")
+        return
+
+    if state == CLOSED and not ok:
+        samples = backend.get_samples(provider)
+        failures = sum(1 for sample_ok, _ in samples if not sample_ok)
+        if len(samples) >= MIN_SAMPLES and failures / len(samples) >= FAILURE_THRESHOLD:
+            backend.set_state(provider, OPEN, time.time())
+            print(f"⚠️  Provider health: {provider} circuit opened ({failures}/{len(samples)} failures)")
+
+
+def expected_yield_per_second(provider: str, field_value: float) -> Optional[float]:
+    """Expected useful fields per second of waiting, or None without enough data."""
+    stats = get_stats(provider)
+    if stats["samples"] < MIN_SAMPLES:
+        return None
+    return field_value * stats["success_rate"] / max(stats["p50_latency"], 0.05)
+
+
+def order_providers(field_values: dict[str, float], skip: Iterable[str] = ()) -> list[str]:
+    """
+    Order providers for the fallback chain.
+
+    field_values maps provider name to how much a successful answer is worth,
+    in the static priority order. Providers in `skip` are left out, and so
+    are providers whose circuit is open and cooling down. No probe slot is
+    taken here: the chain calls allow_request just before it starts each
+    provider, so fallbacks it never reaches leave a half-open slot free.
+    Richer providers always come first: values form fixed tiers, and only
+    within a tier are providers with enough samples re-sorted by expected
+    yield per second in the slots they occupy. If every circuit is open the
+    static order is returned so the chain is never empty.
+    """
+    candidates = [name for name in field_values if name not in skip]
+    allowed = [name for name in candidates if not is_open(name)]
+    if not allowed:
+        return candidates
+
+    ordered = []
+    for value in sorted({field_values[name] for name in allowed}, reverse=True):
+        tier = [name for name in allowed if field_values[name] == value]
+        scores = {name: expected_yield_per_second(name, value) for name in tier}
+        measured = iter(sorted((n for n in tier if scores[n] is not None), key=lambda n: -scores[n]))
+        ordered += [next(measured) if scores[name] is not None else name for name in tier]
+    return ordered
@@ -1,4 +1,5 @@
 """Redis queue management for async job processing."""
+from typing import Optional
 from redis import Redis
 from rq import Queue
 from config import get_settings
@@ -20,15 +21,35 @@ def get_redis_connection() -> Redis:
     return Redis.from_url(f"redis://{url}" if not url.startswith("redis://") else url)
 
 
+def get_redis_if_available() -> Optional[Redis]:
+    """Get a Redis connection if the server answers, otherwise None."""
+    try:
+        redis = get_redis_connection()
+        redis.ping()
+        return redis
+    except Exception as e:
+        print(f"Redis unavailable ({e})")
+        return None
+
+
 def get_queue(name: str = "default") -> Queue:
     """Get RQ queue instance."""
     return Queue(name, connection=get_redis_connection())
 
 
-def enqueue_video_processing(video_id: int) -> str:
-    """Queue a video for processing."""
+def enqueue_video_processing(video_id: int, priority: str = "interactive") -> str:
+    """Queue a video for processing ("backfill" priority for bulk re-runs)."""
     from worker import process_video  # Import here to avoid circular imports
 
     queue = get_queue("video_processing")
-    job = queue.enqueue(process_video, video_id, job_timeout="10m")
+    job = queue.enqueue(process_video, video_id, priority, job_timeout="10m")
+    return job.id
+
+
+def enqueue_video_batch(video_ids: list[int], priority: str = "backfill") -> str:
+    """Queue several videos to be scraped and analysed together."""
+    from worker import process_video_batch
+
+    queue = get_queue("video_processing")
+    job = queue.enqueue(process_video_batch, video_ids, priority, job_timeout=f"{5 + 2 * len(video_ids)}m")
     return job.id
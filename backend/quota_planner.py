@@ -0,0 +1,90 @@
+"""Pace scarce provider quotas across the month."""
+import calendar
+import math
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from quota_tracker import PROVIDER_LIMITS, get_store
+
+# Submissions from the bots are interactive; bulk backfills are not
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKFILL = "backfill"
+
+# Share of each monthly allowance held back for interactive submissions
+INTERACTIVE_RESERVE = 0.3
+
+
+def _month_bounds(today: date) -> tuple[int, int]:
+    """(day of month, days in month) for a date."""
+    return today.day, calendar.monthrange(today.year, today.month)[1]
+
+
+def get_budget_status(service: str, today: Optional[date] = None) -> dict:
+    """
+    Budget and pacing figures for one provider this month.
+
+    Backfill may only spend the non-reserved part of the allowance, spread
+    evenly over the days left: today's backfill budget is what remained of
+    that share at the start of today divided by the days left (including
+    today). Interactive submissions may use everything up to the hard limit.
+    """
+    today = today or datetime.now().date()
+    limit = PROVIDER_LIMITS[service]
+    store = get_store()
+    used = store.get_used(service, today.strftime("%Y-%m"))
+    used_today = store.get_used_on(service, today.strftime("%Y-%m-%d"))
+
+    day, days_in_month = _month_bounds(today)
+    days_left = days_in_month - day + 1
+    backfill_limit = math.floor(limit * (1 - INTERACTIVE_RESERVE))
+    used_before_today = max(0, used - used_today)
+    daily_backfill_budget = max(0, backfill_limit - used_before_today) / days_left
+
+    # Projected exhaustion at the month-to-date average pace
+    daily_rate = used / day if day else 0
+    exhaustion_date = None
+    if used >= limit:
+        exhaustion_date = today
+    elif daily_rate > 0:
+        projected = today + timedelta(days=math.ceil((limit - used) / daily_rate))
+        if projected.month == today.month and projected.year == today.year:
+            exhaustion_date = projected
+
+    return {
+        "service": service,
+        "limit": limit,
+        "used": used,
+        "used_today": used_today,
+        "remaining": max(0, limit - used),
+        "backfill_limit": backfill_limit,
+        "daily_backfill_budget": round(daily_backfill_budget, 2),
+        "days_left": days_left,
+        "daily_rate": round(daily_rate, 2),
+        "projected_exhaustion": exhaustion_date.isoformat() if exhaustion_date else None,
+    }
+
+
+def should_spend(service: str, priority: str = PRIORITY_INTERACTIVE, today: Optional[date] = None) -> bool:
+    """
+    Decide whether a scrape of this priority may call a quota-limited provider.
+
+    The actual unit is still taken with reserve_quota; this only decides
+    whether to try, so backfill falls back to free providers once it is
+    ahead of pace.
+    """
+    if service not in PROVIDER_LIMITS:
+        return True
+
+    try:
+        status = get_budget_status(service, today)
+    except Exception as e:
+        print(f"Quota planner error ({service}): {e}")
+        return True
+
+    if priority == PRIORITY_INTERACTIVE:
+        return status["used"] < status["limit"]
+
+    return (
+        status["used"] < status["backfill_limit"]
+        and status["used_today"] < math.ceil(status["daily_backfill_budget"])
+    )
@@ -1,11 +1,32 @@
 """Track API quota usage for rate-limited services."""
 import json
+import sqlite3
+import threading
+import time
+import uuid
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
+from config import get_settings
 
+settings = get_settings()
+
+# Legacy JSON store, imported once into the active backend
 QUOTA_FILE = Path(__file__).parent / "api_quota.json"
+QUOTA_DB = Path(__file__).parent / "api_quota.db"
+
+# Monthly allowances of the scarce providers (free tiers)
+PROVIDER_LIMITS = {
+    "supadata": 100,
+    "scraptik": 50,
+}
+
+# A reservation that is never committed or released (e.g. worker crash) expires
+RESERVATION_TTL = 300
+# Month counters outlive their month long enough for reporting
+MONTH_KEY_TTL = 62 * 24 * 3600
+DAY_KEY_TTL = 3 * 24 * 3600
 
 
 def get_current_month() -> str:
@@ -13,22 +34,261 @@ def get_current_month() -> str:
     return datetime.now().strftime("%Y-%m")
 
 
-def load_quota() -> dict:
-    """Load quota data from file."""
-    if not QUOTA_FILE.exists():
-        return {}
+def get_current_day() -> str:
+    """Get current day as YYYY-MM-DD string."""
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+class Reservation:
+    """
+    A held unit of quota.
+
+    Call commit() once the paid request has been sent (the provider bills it
+    whatever the outcome), or release() to hand the unit back if it never
+    was. Releasing after a commit is a no-op, so release() fits in finally.
+    """
+
+    def __init__(self, store, service: str, month: str, token: str, used: int, limit: int):
+        self.store = store
+        self.service = service
+        self.month = month
+        self.token = token
+        self.used = used
+        self.limit = limit
+        self.done = False
+
+    def commit(self) -> tuple[int, int]:
+        """Count the reserved unit as used. Returns (used, limit)."""
+        if not self.done:
+            self.done = True
+            self.used = self.store.commit(self.service, self.month, self.token)
+        return self.used, self.limit
+
+    def release(self) -> None:
+        """Give the unit back without using it."""
+        if not self.done:
+            self.done = True
+            self.store.release(self.service, self.month, self.token)
+
+
+class RedisQuotaStore:
+    """Quota counters in Redis, shared by every worker process."""
+
+    # used + live reservations < limit → hold a reservation
+    _RESERVE = """
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+    local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+    if used + redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[2]) then
+        return -1
+    end
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[4])
+    redis.call('EXPIRE', KEYS[2], ARGV[5])
+    return used
+    """
+    _COMMIT = """
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    local used = redis.call('INCR', KEYS[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    redis.call('INCR', KEYS[3])
+    redis.call('EXPIRE', KEYS[3], ARGV[3])
+    return used
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._reserve = redis.register_script(self._RESERVE)
+        self._commit = redis.register_script(self._COMMIT)
+
+    @staticmethod
+    def _keys(service: str, month: str) -> list[str]:
+        return [f"quota:{service}:{month}:used", f"quota:{service}:{month}:reserved"]
+
+    @staticmethod
+    def _day_key(service: str, day: str) -> str:
+        return f"quota:{service}:day:{day}:used"
+
+    def get_used(self, service: str, month: str) -> int:
+        return int(self.redis.get(self._keys(service, month)[0]) or 0)
+
+    def get_used_on(self, service: str, day: str) -> int:
+        return int(self.redis.get(self._day_key(service, day)) or 0)
+
+    def increment(self, service: str, month: str) -> int:
+        key = self._keys(service, month)[0]
+        day_key = self._day_key(service, get_current_day())
+        pipe = self.redis.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, MONTH_KEY_TTL)
+        pipe.incr(day_key)
+        pipe.expire(day_key, DAY_KEY_TTL)
+        return pipe.execute()[0]
+
+    def reserve(self, service: str, month: str, limit: int, token: str) -> Optional[int]:
+        now = time.time()
+        used = self._reserve(
+            keys=self._keys(service, month),
+            args=[now, limit, now + RESERVATION_TTL, token, RESERVATION_TTL],
+        )
+        return None if used < 0 else used
 
+    def commit(self, service: str, month: str, token: str) -> int:
+        keys = [*self._keys(service, month), self._day_key(service, get_current_day())]
+        return self._commit(keys=keys, args=[token, MONTH_KEY_TTL, DAY_KEY_TTL])
+
+    def release(self, service: str, month: str, token: str) -> None:
+        self.redis.zrem(self._keys(service, month)[1], token)
+
+    def seed(self, service: str, month: str, used: int) -> None:
+        self.redis.set(self._keys(service, month)[0], used, nx=True, ex=MONTH_KEY_TTL)
+
+
+class SQLiteQuotaStore:
+    """Quota counters in a local SQLite file, for installs without Redis."""
+
+    def __init__(self, path: Path = QUOTA_DB):
+        self.path = str(path)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS quota_usage ("
+            "service TEXT NOT NULL, month TEXT NOT NULL, used INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (service, month))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS quota_daily_usage ("
+            "service TEXT NOT NULL, day TEXT NOT NULL, used INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (service, day))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS quota_reservations ("
+            "token TEXT PRIMARY KEY, service TEXT NOT NULL, month TEXT NOT NULL, "
+            "expires_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get_used(self, service: str, month: str) -> int:
+        row = self._connect().execute(
+            "SELECT used FROM quota_usage WHERE service = ? AND month = ?", (service, month)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_used_on(self, service: str, day: str) -> int:
+        row = self._connect().execute(
+            "SELECT used FROM quota_daily_usage WHERE service = ? AND day = ?", (service, day)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _add_used(self, conn: sqlite3.Connection, service: str, month: str) -> int:
+        conn.execute(
+            "INSERT INTO quota_usage (service, month, used) VALUES (?, ?, 1) "
+            "ON CONFLICT (service, month) DO UPDATE SET used = used + 1",
+            (service, month),
+        )
+        conn.execute(
+            "INSERT INTO quota_daily_usage (service, day, used) VALUES (?, ?, 1) "
+            "ON CONFLICT (service, day) DO UPDATE SET used = used + 1",
+            (service, get_current_day()),
+        )
+        return self.get_used(service, month)
+
+    def increment(self, service: str, month: str) -> int:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return self._add_used(conn, service, month)
+
+    def reserve(self, service: str, month: str, limit: int, token: str) -> Optional[int]:
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            # Write lock up front so concurrent workers serialise on the check
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM quota_reservations WHERE expires_at < ?", (now,))
+            held = conn.execute(
+                "SELECT COUNT(*) FROM quota_reservations WHERE service = ? AND month = ?",
+                (service, month),
+            ).fetchone()[0]
+            used = self.get_used(service, month)
+            if used + held >= limit:
+                return None
+            conn.execute(
+                "INSERT INTO quota_reservations (token, service, month, expires_at) VALUES (?, ?, ?, ?)",
+                (token, service, month, now + RESERVATION_TTL),
+            )
+            return used
+
+    def commit(self, service: str, month: str, token: str) -> int:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM quota_reservations WHERE token = ?", (token,))
+            return self._add_used(conn, service, month)
+
+    def release(self, service: str, month: str, token: str) -> None:
+        self._connect().execute("DELETE FROM quota_reservations WHERE token = ?", (token,))
+
+    def seed(self, service: str, month: str, used: int) -> None:
+        self._connect().execute(
+            "INSERT OR IGNORE INTO quota_usage (service, month, used) VALUES (?, ?, ?)",
+            (service, month, used),
+        )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Get the quota backend: Redis when configured/reachable, SQLite otherwise."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            redis = None
+            if settings.quota_backend in ("auto", "redis"):
+                from queue_manager import get_redis_if_available
+                redis = get_redis_if_available()
+                if redis is None and settings.quota_backend == "redis":
+                    raise RuntimeError("QUOTA_BACKEND=redis but Redis is unavailable")
+            _store = RedisQuotaStore(redis) if redis is not None else SQLiteQuotaStore()
+            import_legacy_quota(_store)
+        return _store
+
+
+def import_legacy_quota(store) -> None:
+    """Seed the store with the current month's counts from api_quota.json, if present."""
+    if not QUOTA_FILE.exists():
+        return
     try:
         with open(QUOTA_FILE, "r") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+            data = json.load(f)
+        for service, entry in data.items():
+            if entry.get("used"):
+                store.seed(service, entry["month"], entry["used"])
+    except Exception as e:
+        print(f"Legacy quota import failed: {e}")
 
 
-def save_quota(data: dict) -> None:
-    """Save quota data to file."""
-    with open(QUOTA_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+def reserve_quota(service: str, limit: int) -> Optional[Reservation]:
+    """
+    Atomically hold one unit of this month's quota.
+
+    Returns None when used + outstanding reservations already reach the
+    limit, so concurrent workers can never overshoot it.
+    """
+    store = get_store()
+    month = get_current_month()
+    token = uuid.uuid4().hex
+    used = store.reserve(service, month, limit, token)
+    if used is None:
+        return None
+    return Reservation(store, service, month, token, used, limit)
 
 
 def check_quota(service: str, limit: int) -> tuple[bool, int, int]:
@@ -38,19 +298,7 @@ def check_quota(service: str, limit: int) -> tuple[bool, int, int]:
     Returns:
         (has_quota, used, limit)
     """
-    data = load_quota()
-    current_month = get_current_month()
-
-    # Reset if new month
-    if service not in data or data[service].get("month") != current_month:
-        data[service] = {
-            "month": current_month,
-            "used": 0,
-            "limit": limit
-        }
-        save_quota(data)
-
-    used = data[service]["used"]
+    used = get_store().get_used(service, get_current_month())
     has_quota = used < limit
 
     return has_quota, used, limit
@@ -63,22 +311,8 @@ def increment_quota(service: str, limit: int) -> tuple[int, int]:
     Returns:
         (used, limit)
     """
-    data = load_quota()
-    current_month = get_current_month()
-
-    # Initialize if needed
-    if service not in data or data[service].get("month") != current_month:
-        data[service] = {
-            "month": current_month,
-            "used": 0,
-            "limit": limit
-        }
-
-    # Increment
-    data[service]["used"] += 1
-    save_quota(data)
-
-    return data[service]["used"], data[service]["limit"]
+    used = get_store().increment(service, get_current_month())
+    return used, limit
 
 
 def get_quota_status(service: str, limit: int) -> dict:
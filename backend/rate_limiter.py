@@ -0,0 +1,212 @@
+"""Cross-process token-bucket rate limiting for external providers."""
+import asyncio
+import math
+import threading
+import time
+from typing import Optional
+
+# (tokens per second, burst size) per provider; unlisted providers are unlimited
+RATE_LIMITS = {
+    "supadata": (1.0, 2),
+    "scraptik": (1.0, 2),
+    "openrouter": (2.0, 5),
+}
+
+# Fallback back-off when a 429 carries no usable Retry-After header
+DEFAULT_RETRY_AFTER = 5.0
+
+_REDIS_PREFIX = "rate_limit"
+
+
+class MemoryBucketStore:
+    """In-process token buckets, used when Redis is unavailable."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: dict[str, list[float]] = {}  # provider -> [tokens, updated_at, blocked_until]
+        self._metrics: dict[str, dict] = {}
+
+    def take(self, provider: str, rate: float, burst: int) -> float:
+        """Take a token if available. Returns 0, or seconds to wait before retrying."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, blocked_until = self._buckets.get(provider, [burst, now, 0.0])
+            if blocked_until > now:
+                return blocked_until - now
+            tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+            if tokens >= 1:
+                self._buckets[provider] = [tokens - 1, now, 0.0]
+                return 0.0
+            self._buckets[provider] = [tokens, now, 0.0]
+            return (1 - tokens) / rate
+
+    def block(self, provider: str, seconds: float) -> None:
+        """Empty the bucket and refuse tokens for the given time."""
+        now = time.monotonic()
+        with self._lock:
+            self._buckets[provider] = [0.0, now + seconds, now + seconds]
+
+    def record_wait(self, provider: str, waited: float) -> None:
+        with self._lock:
+            m = self._metrics.setdefault(provider, {"acquired": 0, "waited": 0, "total_wait": 0.0, "max_wait": 0.0})
+            m["acquired"] += 1
+            if waited > 0:
+                m["waited"] += 1
+                m["total_wait"] += waited
+                m["max_wait"] = max(m["max_wait"], waited)
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {provider: dict(m) for provider, m in self._metrics.items()}
+
+
+class RedisBucketStore:
+    """Token buckets in Redis, shared by every process that calls a provider."""
+
+    # Uses Redis server time so all hosts agree on the clock
+    _TAKE = """
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at', 'blocked_until')
+    local tokens = tonumber(state[1]) or burst
+    local updated_at = tonumber(state[2]) or now
+    local blocked_until = tonumber(state[3]) or 0
+    if blocked_until > now then
+        return tostring(blocked_until - now)
+    end
+    tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now, 'blocked_until', 0)
+    redis.call('EXPIRE', KEYS[1], 3600)
+    return tostring(wait)
+    """
+    _BLOCK = """
+    local t = redis.call('TIME')
+    local until_ts = tonumber(t[1]) + tonumber(t[2]) / 1000000 + tonumber(ARGV[1])
+    redis.call('HSET', KEYS[1], 'tokens', 0, 'updated_at', until_ts, 'blocked_until', until_ts)
+    redis.call('EXPIRE', KEYS[1], 3600)
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._take = redis.register_script(self._TAKE)
+        self._block = redis.register_script(self._BLOCK)
+
+    def take(self, provider: str, rate: float, burst: int) -> float:
+        return float(self._take(keys=[f"{_REDIS_PREFIX}:{provider}"], args=[rate, burst]))
+
+    def block(self, provider: str, seconds: float) -> None:
+        self._block(keys=[f"{_REDIS_PREFIX}:{provider}"], args=[seconds])
+
+    def record_wait(self, provider: str, waited: float) -> None:
+        key = f"{_REDIS_PREFIX}:{provider}:metrics"
+        pipe = self.redis.pipeline()
+        pipe.hincrby(key, "acquired", 1)
+        if waited > 0:
+            pipe.hincrby(key, "waited", 1)
+            pipe.hincrbyfloat(key, "total_wait", waited)
+        pipe.execute()
+        if waited > float(self.redis.hget(key, "max_wait") or 0):
+            self.redis.hset(key, "max_wait", waited)
+
+    def get_metrics(self) -> dict:
+        metrics = {}
+        for provider in RATE_LIMITS:
+            raw = self.redis.hgetall(f"{_REDIS_PREFIX}:{provider}:metrics")
+            if raw:
+                data = {k.decode(): float(v) for k, v in raw.items()}
+                metrics[provider] = {
+                    "acquired": int(data.get("acquired", 0)),
+                    "waited": int(data.get("waited", 0)),
+                    "total_wait": data.get("total_wait", 0.0),
+                    "max_wait": data.get("max_wait", 0.0),
+                }
+        return metrics
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Use Redis when reachable so every process shares the buckets."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            from queue_manager import get_redis_if_available
+            redis = get_redis_if_available()
+            if redis is not None:
+                _store = RedisBucketStore(redis)
+            else:
+                print("Rate limiter: using in-process buckets")
+                _store = MemoryBucketStore()
+        return _store
+
+
+def _try_take(provider: str) -> Optional[float]:
+    """Seconds to wait for a token, 0 if taken, None if the provider is unlimited."""
+    limit = RATE_LIMITS.get(provider)
+    if limit is None:
+        return None
+    try:
+        return get_store().take(provider, *limit)
+    except Exception as e:
+        # A broken limiter must never stop the pipeline
+        print(f"Rate limiter error ({provider}): {e}")
+        return None
+
+
+async def acquire(provider: str) -> float:
+    """Wait for a token from the provider's bucket. Returns seconds waited."""
+    started = time.monotonic()
+    while True:
+        wait = _try_take(provider)
+        if not wait:
+            break
+        await asyncio.sleep(wait)
+    waited = time.monotonic() - started
+    _record_wait(provider, waited)
+    return waited
+
+
+def _record_wait(provider: str, waited: float) -> None:
+    """Record wait-time metrics for a rate-limited provider."""
+    if provider not in RATE_LIMITS:
+        return
+    try:
+        # Ignore timer noise from an immediate grant
+        get_store().record_wait(provider, waited if waited >= 0.001 else 0.0)
+    except Exception as e:
+        print(f"Rate limiter error ({provider}): {e}")
+
+
+def retry_after_seconds(headers) -> float:
+    """Parse a Retry-After header (seconds form), falling back to a default."""
+    value = headers.get("retry-after") if headers is not None else None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+def penalize(provider: str, seconds: float) -> None:
+    """Hold back every caller of a provider after it answered 429."""
+    if provider not in RATE_LIMITS:
+        return
+    print(f"Rate limiter: {provider} returned 429, pausing for {seconds:.1f}s")
+    try:
+        get_store().block(provider, math.ceil(seconds * 10) / 10)
+    except Exception as e:
+        print(f"Rate limiter error ({provider}): {e}")
+
+
+def get_metrics() -> dict:
+    """Per-provider acquisition counts and wait times."""
+    return get_store().get_metrics()
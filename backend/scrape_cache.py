@@ -0,0 +1,68 @@
+"""Persistent cache of scrape results keyed by TikTok video ID."""
+from typing import Optional
+
+from cache_store import SQLiteCache
+from config import get_settings
+
+settings = get_settings()
+
+# Fields that never change once a video is posted
+IMMUTABLE_FIELDS = ("title", "description", "creator", "hashtags", "transcript")
+# Fields that drift over time (CDN thumbnail URLs expire too)
+VOLATILE_FIELDS = ("view_count", "like_count", "thumbnail_url")
+
+_cache: Optional[SQLiteCache] = None
+
+
+def get_cache() -> SQLiteCache:
+    """Get the process-wide scrape cache, opening it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = SQLiteCache(
+            settings.scrape_cache_path,
+            table="scrape_cache",
+            max_entries=settings.scrape_cache_max_entries,
+        )
+    return _cache
+
+
+def lookup(video_id: str) -> tuple[Optional[dict], Optional[dict]]:
+    """
+    Look up cached fields for a video.
+
+    Returns:
+        (immutable_fields, volatile_fields) - either may be None when missing or expired
+    """
+    cache = get_cache()
+    immutable = cache.get(f"immutable:{video_id}", settings.scrape_cache_immutable_ttl)
+    volatile = cache.get(f"volatile:{video_id}", settings.scrape_cache_volatile_ttl)
+    return immutable, volatile
+
+
+def lookup_many(video_ids: list[str]) -> dict[str, dict]:
+    """Return {video_id: full cached result} for every video whose fields are all cached and fresh."""
+    cache = get_cache()
+    immutable = cache.get_many([f"immutable:{v}" for v in video_ids], settings.scrape_cache_immutable_ttl)
+    volatile = cache.get_many([f"volatile:{v}" for v in video_ids], settings.scrape_cache_volatile_ttl)
+    return {
+        video_id: {**immutable[f"immutable:{video_id}"], **volatile[f"volatile:{video_id}"]}
+        for video_id in video_ids
+        if f"immutable:{video_id}" in immutable
+        and set(IMMUTABLE_FIELDS) <= immutable[f"immutable:{video_id}"].keys()
+        and f"volatile:{video_id}" in volatile
+    }
+
+
+def store(video_id: str, result: dict, immutable: bool = True, volatile: bool = True) -> None:
+    """
+    Cache the immutable and/or volatile fields of a scrape result.
+
+    Immutable fields missing from result (a transcript that was never
+    fetched) are left out rather than cached as None, so a later scrape
+    can tell them apart from a known-empty value and fetch them again.
+    """
+    cache = get_cache()
+    if immutable:
+        cache.set(f"immutable:{video_id}", {k: result[k] for k in IMMUTABLE_FIELDS if k in result})
+    if volatile:
+        cache.set(f"volatile:{video_id}", {k: result.get(k) for k in VOLATILE_FIELDS})
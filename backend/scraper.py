@@ -1,35 +1,88 @@
 """TikTok video scraping - Phase 3 implementation."""
+import asyncio
+import contextvars
+import queue
 import re
-from typing import Optional
-import httpx
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Iterator, Optional
 from config import get_settings
-from quota_tracker import check_quota, increment_quota, get_quota_status
+from http_client import get_async_client, run_in_background, run_sync
+from tiktok_url import parse_tiktok_url, resolve_tiktok_url
+import provider_health
+import quota_planner
+import rate_limiter
+import scrape_cache
+import ytdlp_pool
+from quota_planner import PRIORITY_BACKFILL, PRIORITY_INTERACTIVE
+from quota_tracker import PROVIDER_LIMITS, Reservation, reserve_quota
 
 settings = get_settings()
 
-# ScrapTik free tier limit
-SCRAPTIK_MONTHLY_LIMIT = 50
+# Free tier limits
+SCRAPTIK_MONTHLY_LIMIT = PROVIDER_LIMITS["scraptik"]
+SUPADATA_MONTHLY_LIMIT = PROVIDER_LIMITS["supadata"]
+
+HASHTAG_RE = re.compile(r"#(\w+)")
+
+# Static metadata priority and the value of a successful answer from each
+# provider; oEmbed has no engagement stats and repeats the title as description.
+# Values are fixed tiers: health data only reorders providers of equal value.
+METADATA_PROVIDER_VALUE = {
+    "scraptik": 1.0,
+    "ytdlp": 1.0,
+    "oembed": 0.4,
+}
+
+# Per-provider concurrency for bulk scrapes (yt-dlp matches the extractor pool)
+DEFAULT_PROVIDER_CONCURRENCY = {
+    "supadata": 3,
+    "scraptik": 2,
+    "ytdlp": settings.ytdlp_pool_size,
+    "oembed": 5,
+}
+
+
+class ProviderSkipped(Exception):
+    """A provider that was not called (not configured or out of quota); not a health failure."""
+
+
+class ProviderError(Exception):
+    """A provider call that got no usable answer (e.g. a 5xx); worth retrying later."""
+
+
+# Semaphores set by scrape_many_async; None means unlimited (single scrapes)
+_provider_limits: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("provider_limits", default=None)
 
 
 def is_photo_url(url: str) -> bool:
     """Check if URL is a TikTok photo/carousel post."""
-    return bool(re.match(r"https?://(?:www\.)?tiktok\.com/@[\w.-]+/photo/\d+", url))
+    parsed = parse_tiktok_url(url)
+    return bool(parsed and parsed.kind == "photo")
 
 
 def validate_tiktok_url(url: str) -> bool:
-    """Validate that URL is a TikTok video URL."""
-    patterns = [
-        r"https?://(?:www\.)?tiktok\.com/@[\w.-]+/video/\d+",
-        r"https?://(?:vm|vt)\.tiktok\.com/[\w]+",
-        r"https?://(?:www\.)?tiktok\.com/t/[\w]+",
-    ]
-    return any(re.match(pattern, url) for pattern in patterns)
+    """Validate that URL is a TikTok video URL (standard or short link)."""
+    parsed = parse_tiktok_url(url)
+    return bool(parsed and parsed.kind in ("video", "short"))
 
 
-def scrape_tiktok(url: str) -> dict:
+def scrape_tiktok(url: str, priority: str = PRIORITY_INTERACTIVE) -> dict:
+    """Blocking wrapper around scrape_tiktok_async for sync callers (RQ worker)."""
+    return run_sync(scrape_tiktok_async(url, priority))
+
+
+async def scrape_tiktok_async(url: str, priority: str = PRIORITY_INTERACTIVE) -> dict:
     """
     Scrape TikTok video data using multiple fallback methods.
 
+    The transcript and metadata paths run concurrently; metadata providers
+    are tried in priority order, with a fallback started early as a hedge
+    when the current provider is slow.
+    Quota-limited providers are only called when quota_planner allows it
+    for this priority; backfill scrapes over the daily pace use the free
+    fallbacks instead.
+
     Returns dict with:
     - title, description, creator
     - hashtags (list)
@@ -37,31 +90,315 @@ def scrape_tiktok(url: str) -> dict:
     - thumbnail_url
     - transcript
     """
-    if is_photo_url(url):
+    if not parse_tiktok_url(url):
+        raise ValueError(f"Invalid TikTok URL: {url}")
+
+    # Resolve short links once so every provider sees the canonical URL
+    parsed = await resolve_tiktok_url(url)
+    if parsed.kind == "photo":
         raise ValueError("Photo/carousel posts are not supported. Please submit a video URL instead.")
+    url = parsed.canonical_url or url
+    video_id = parsed.video_id
+    cached, cached_volatile = _cache_lookup(video_id)
 
-    if not validate_tiktok_url(url):
-        raise ValueError(f"Invalid TikTok URL: {url}")
+    if cached and cached_volatile and "transcript" in cached:
+        print(f"✓ Scrape cache: hit for video {video_id}")
+        return {**cached, **cached_volatile}
+
+    if cached:
+        return await _refresh_cached(url, video_id, cached, cached_volatile, priority)
+
+    # 1. Supadata transcript runs alongside the metadata chain
+    transcript_task = None
+    if not _over_budget(("supadata",), priority):
+        transcript_task = asyncio.create_task(_fetch_transcript(url))
+    try:
+        metadata = await get_metadata_async(url, _over_budget(("scraptik",), priority))
+        transcript, answered = await transcript_task if transcript_task else (None, False)
+    finally:
+        if transcript_task:
+            transcript_task.cancel()
+
+    result = build_scrape_result(url, metadata, transcript)
+    # Don't pin URL-parsing fallbacks in the cache; a later run may do better.
+    # A transcript Supadata never answered for is left out so it gets retried.
+    if metadata.get("title"):
+        _cache_store(video_id, result if answered else {k: v for k, v in result.items() if k != "transcript"})
+    return result
+
+
+async def _refresh_cached(
+    url: str, video_id: str, cached: dict, cached_volatile: Optional[dict], priority: str
+) -> dict:
+    """
+    Fill in what a partial cache hit is missing.
+
+    Expired engagement stats are refreshed from the free providers only:
+    the content is already cached, so it isn't worth ScrapTik quota. A
+    transcript Supadata never answered for is fetched again.
+    """
+    transcript_task = None
+    if "transcript" not in cached and not _over_budget(("supadata",), priority):
+        transcript_task = asyncio.create_task(_fetch_transcript(url))
+    try:
+        metadata = cached_volatile or await get_metadata_async(url, {"scraptik"})
+        transcript, answered = await transcript_task if transcript_task else (None, False)
+    finally:
+        if transcript_task:
+            transcript_task.cancel()
+
+    if answered:
+        cached = {**cached, "transcript": transcript}
+    result = {**build_scrape_result(url, metadata, cached.get("transcript")), **cached}
+    refreshed = cached_volatile is None and bool(metadata.get("title"))
+    if answered or refreshed:
+        _cache_store(video_id, result, immutable=answered, volatile=refreshed)
+    return result
+
+
+async def _fetch_transcript(url: str) -> tuple[Optional[str], bool]:
+    """Fetch the Supadata transcript; the flag says whether Supadata actually answered."""
+    try:
+        return await _limited("supadata", get_transcript_supadata, url), True
+    except ProviderSkipped as e:
+        print(e)
+    except Exception as e:
+        print(f"Supadata transcript error: {e}")
+    return None, False
+
+
+def _over_budget(providers: Iterable[str], priority: str) -> set[str]:
+    """Quota-limited providers this scrape should not spend on."""
+    skip = {name for name in providers if not quota_planner.should_spend(name, priority)}
+    for name in skip:
+        print(f"Quota planner: skipping {name} for {priority} scrape - using fallback")
+    return skip
+
+
+def _cache_lookup(video_id: Optional[str]) -> tuple[Optional[dict], Optional[dict]]:
+    """Read cached scrape fields, treating cache errors as a miss."""
+    if not video_id:
+        return None, None
+    try:
+        return scrape_cache.lookup(video_id)
+    except Exception as e:
+        print(f"Scrape cache error: {e}")
+        return None, None
+
+
+def _cache_store(video_id: Optional[str], result: dict, immutable: bool = True, volatile: bool = True) -> None:
+    """Write a scrape result to the cache, ignoring cache errors."""
+    if not video_id:
+        return
+    try:
+        scrape_cache.store(video_id, result, immutable=immutable, volatile=volatile)
+    except Exception as e:
+        print(f"Scrape cache error: {e}")
+
+
+async def get_metadata_async(url: str, skip: Iterable[str] = ()) -> dict:
+    """
+    Run the metadata chain, returning the highest-priority answer.
+
+    The order comes from provider_health: providers with an open circuit are
+    skipped, and oEmbed (no engagement stats) always ranks behind ScrapTik
+    and yt-dlp, which are ordered by expected yield per second once there
+    is data. Fallbacks are staggered rather than raced: the next provider
+    starts only when the ones ahead of it have failed, or as a single hedge
+    once the current one has run for settings.metadata_hedge_after seconds.
+    Results are still consumed in priority order, and providers still in
+    flight are cancelled once one returns a title. yt-dlp is blocking, so it
+    runs in a worker thread and is only abandoned, not interrupted, when
+    cancelled. Each circuit is checked just before its provider starts, and
+    providers in `skip` are not called at all.
+    """
+    runners = {
+        "scraptik": lambda: get_metadata_scraptik(url),
+        "ytdlp": lambda: asyncio.to_thread(get_metadata_ytdlp, url),
+        "oembed": lambda: get_metadata_oembed(url),
+    }
+    order = provider_health.order_providers(METADATA_PROVIDER_VALUE, skip)
+    hedge_after = settings.metadata_hedge_after or None
+    waiting = iter(order)
+    tasks: list[asyncio.Task] = []
+    tried = False
+
+    def start_next() -> bool:
+        nonlocal tried
+        for name in waiting:
+            last = name == order[-1]
+            if provider_health.allow_request(name) or (last and not tried):
+                tried = True
+                tasks.append(asyncio.create_task(_tracked(name, runners[name])))
+                return True
+        return False
 
-    # Try methods in order of reliability
-    transcript = None
     metadata = {}
+    try:
+        start_next()
+        while tasks:
+            head = tasks[0]
+            if not head.done():
+                # At most one hedge runs alongside the provider being waited on
+                await asyncio.wait({head}, timeout=hedge_after if len(tasks) == 1 else None)
+                if not head.done():
+                    start_next()
+                    continue
+            tasks.pop(0)
+            result = head.result()
+            if result and result.get("title"):
+                return result
+            metadata = result or metadata
+            if not tasks:
+                start_next()
+        return metadata
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _tracked(provider: str, call) -> dict:
+    """Await a provider call and record its outcome and latency (skips aren't recorded)."""
+    async with provider_slot(provider):
+        started = time.monotonic()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            # Abandoned by the chain: don't hold a half-open probe slot until it times out
+            provider_health.release_probe(provider)
+            raise
+        except ProviderSkipped as e:
+            print(e)
+            return {}
+        except Exception as e:
+            print(f"{provider} metadata error: {e}")
+            result = None
+    provider_health.record_result(provider, bool(result and result.get("title")), time.monotonic() - started)
+    return result or {}
+
+
+@asynccontextmanager
+async def provider_slot(provider: str):
+    """Hold one of the provider's bulk-scrape concurrency slots, if limits are set."""
+    limits = _provider_limits.get()
+    semaphore = limits.get(provider) if limits else None
+    if semaphore is None:
+        yield
+        return
+    async with semaphore:
+        yield
+
+
+async def _limited(provider: str, func, *args):
+    """Call an async provider function inside its concurrency slot."""
+    async with provider_slot(provider):
+        return await func(*args)
+
+
+def scrape_many(
+    urls: Iterable[str],
+    concurrency: Optional[int] = None,
+    provider_concurrency: Optional[dict] = None,
+    priority: str = PRIORITY_BACKFILL,
+) -> Iterator[tuple[str, Optional[dict], Optional[str]]]:
+    """Blocking generator around scrape_many_async for sync callers."""
+    results: queue.Queue = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in scrape_many_async(urls, concurrency, provider_concurrency, priority):
+                results.put(item)
+        finally:
+            results.put(done)
+
+    future = run_in_background(pump())
+    try:
+        while (item := results.get()) is not done:
+            yield item
+        future.result()
+    finally:
+        future.cancel()
+
+
+async def scrape_many_async(
+    urls: Iterable[str],
+    concurrency: Optional[int] = None,
+    provider_concurrency: Optional[dict] = None,
+    priority: str = PRIORITY_BACKFILL,
+) -> AsyncIterator[tuple[str, Optional[dict], Optional[str]]]:
+    """
+    Scrape many URLs, yielding (url, result, error) as each one finishes.
+
+    URLs are resolved up front and collapsed by TikTok video ID, so
+    duplicates (including short links to the same video) cost one scrape.
+    Fully cached videos are served from one bulk cache query before any
+    provider is called. At most `concurrency` videos are in flight, and
+    each provider has its own limit on top of that. Bulk scrapes default to
+    backfill priority, so they stay within the planner's daily pace.
+    """
+    urls = list(urls)
+    limit = concurrency or settings.scrape_concurrency
 
-    # 1. Try Supadata for transcript
-    transcript = get_transcript_supadata(url)
+    # Resolve every URL once; invalid ones are reported immediately
+    resolve_slots = asyncio.Semaphore(limit)
 
-    # 2. Try ScrapTik for metadata (most reliable)
-    metadata = get_metadata_scraptik(url)
+    async def resolve(url: str):
+        async with resolve_slots:
+            return await resolve_tiktok_url(url)
 
-    # 3. If ScrapTik failed, try yt-dlp for metadata (with proxy if configured)
-    if not metadata.get("title"):
-        metadata = get_metadata_ytdlp(url)
+    parsed_urls = await asyncio.gather(*(resolve(url) for url in urls))
 
-    # 4. If yt-dlp failed, try oEmbed API
-    if not metadata.get("title"):
-        metadata = get_metadata_oembed(url) or metadata
+    groups: dict[str, list[str]] = {}
+    targets: dict[str, str] = {}
+    for url, parsed in zip(urls, parsed_urls):
+        if parsed is None or parsed.kind == "photo":
+            yield url, None, "Photo/carousel posts are not supported." if parsed else f"Invalid TikTok URL: {url}"
+            continue
+        key = parsed.video_id or url
+        groups.setdefault(key, []).append(url)
+        targets.setdefault(key, parsed.canonical_url or url)
 
-    # 5. Always have fallback from URL parsing
+    try:
+        cached = scrape_cache.lookup_many([key for key in groups if key.isdigit()])
+    except Exception as e:
+        print(f"Scrape cache error: {e}")
+        cached = {}
+
+    for key in list(groups):
+        if key in cached:
+            for url in groups.pop(key):
+                yield url, dict(cached[key]), None
+
+    # Scrape tasks run in a context carrying the per-provider semaphores
+    context = contextvars.copy_context()
+    context.run(_provider_limits.set, {
+        name: asyncio.Semaphore(n)
+        for name, n in {**DEFAULT_PROVIDER_CONCURRENCY, **(provider_concurrency or {})}.items()
+    })
+    video_slots = asyncio.Semaphore(limit)
+
+    async def scrape_group(key: str):
+        async with video_slots:
+            try:
+                return key, await scrape_tiktok_async(targets[key], priority), None
+            except Exception as e:
+                return key, None, str(e)
+
+    tasks = [asyncio.create_task(scrape_group(key), context=context) for key in groups]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            key, result, error = await next_done
+            for url in groups[key]:
+                yield url, dict(result) if result else None, error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def build_scrape_result(url: str, metadata: dict, transcript: Optional[str]) -> dict:
+    """Merge provider metadata with the URL fallback into the scrape result shape."""
+    # Always have fallback from URL parsing
     if not metadata.get("creator"):
         url_data = extract_from_url(url)
         metadata = {**url_data, **{k: v for k, v in metadata.items() if v}}
@@ -78,14 +415,59 @@ def scrape_tiktok(url: str) -> dict:
     }
 
 
-def get_transcript_supadata(url: str) -> Optional[str]:
-    """Get transcript from Supadata API."""
+async def rate_limited_get(provider: str, url: str, reservation: Optional[Reservation] = None, **kwargs):
+    """
+    GET through the provider's pooled client after taking a rate-limit token.
+
+    A 429 pauses the provider's bucket for every process (honouring
+    Retry-After) and the request is retried once instead of falling
+    straight through to a weaker fallback.
+
+    A quota reservation is committed as soon as the request starts going
+    out: the provider bills a call it received even if this task is then
+    cancelled (e.g. when a hedged fallback loses). If the request is never sent the
+    reservation is left for the caller to release.
+    """
+    if reservation is not None:
+        async def trace(event: str, info: dict) -> None:
+            if event.endswith("send_request_headers.started"):
+                reservation.commit()
+
+        kwargs["extensions"] = {**kwargs.get("extensions", {}), "trace": trace}
+    client = get_async_client(provider)
+    for attempt in range(2):
+        await rate_limiter.acquire(provider)
+        response = await client.get(url, **kwargs)
+        if response.status_code != 429 or attempt:
+            return response
+        rate_limiter.penalize(provider, rate_limiter.retry_after_seconds(response.headers))
+    return response
+
+
+async def get_transcript_supadata(url: str) -> Optional[str]:
+    """
+    Get transcript from Supadata API.
+
+    Returns None when Supadata reports the video has no transcript (404).
+    Raises ProviderSkipped when no call is made (no key or no quota left)
+    and ProviderError or the transport error when the call fails, so the
+    caller can tell a missing transcript from a failed lookup.
+    """
     if not settings.supadata_api_key:
-        return None
+        raise ProviderSkipped("Supadata: No API key configured")
+
+    # Hold one unit of quota until the request is sent
+    reservation = reserve_quota("supadata", SUPADATA_MONTHLY_LIMIT)
+    if reservation is None:
+        raise ProviderSkipped(
+            f"Supadata: Monthly quota exceeded ({SUPADATA_MONTHLY_LIMIT}/{SUPADATA_MONTHLY_LIMIT}) - skipping transcript"
+        )
 
     try:
-        response = httpx.get(
+        response = await rate_limited_get(
+            "supadata",
             "https://api.supadata.ai/v1/transcript",
+            reservation=reservation,
             headers={"x-api-key": settings.supadata_api_key},
             params={"url": url, "text": "true", "lang": "en"},
             timeout=60.0,
@@ -95,47 +477,46 @@ def get_transcript_supadata(url: str) -> Optional[str]:
             return data.get("content", "")
         elif response.status_code == 404:
             print(f"Supadata: Video not found or no transcript available")
-        else:
-            print(f"Supadata error: {response.status_code}")
-        return None
-    except Exception as e:
-        print(f"Supadata transcript error: {e}")
-        return None
+            return None
+        raise ProviderError(f"Supadata error: {response.status_code}")
+    finally:
+        reservation.release()
+
 
+async def get_metadata_scraptik(url: str) -> dict:
+    """
+    Get video metadata from ScrapTik API via RapidAPI.
 
-def get_metadata_scraptik(url: str) -> dict:
-    """Get video metadata from ScrapTik API via RapidAPI."""
+    Raises ProviderSkipped when no call is made (no key, no video ID or no
+    quota left), so the chain doesn't count it against ScrapTik's health.
+    """
     if not settings.rapidapi_key:
-        print("ScrapTik: No RapidAPI key configured")
-        return {}
+        raise ProviderSkipped("ScrapTik: No RapidAPI key configured")
 
-    # Check quota before making request
-    has_quota, used, limit = check_quota("scraptik", SCRAPTIK_MONTHLY_LIMIT)
+    # Extract video ID from URL for ScrapTik
+    parsed = parse_tiktok_url(url)
+    if not parsed or not parsed.video_id:
+        raise ProviderSkipped("ScrapTik: Could not extract video ID from URL")
 
-    if not has_quota:
-        print(f"ScrapTik: Monthly quota exceeded ({used}/{limit}) - using fallback")
-        return {}
+    # Hold one unit of quota until the request is sent
+    reservation = reserve_quota("scraptik", SCRAPTIK_MONTHLY_LIMIT)
+
+    if reservation is None:
+        raise ProviderSkipped(
+            f"ScrapTik: Monthly quota exceeded ({SCRAPTIK_MONTHLY_LIMIT}/{SCRAPTIK_MONTHLY_LIMIT}) - using fallback"
+        )
 
     # Warn when approaching limit
+    used, limit = reservation.used, reservation.limit
     if used >= limit * 0.8:  # 80% threshold
         print(f"⚠️  ScrapTik quota warning: {used}/{limit} used ({limit - used} remaining)")
 
     try:
-        # Extract video ID from URL for ScrapTik
-        video_id = None
-
-        # Standard URL: https://www.tiktok.com/@username/video/1234567890
-        match = re.search(r"tiktok\.com/@[^/]+/video/(\d+)", url)
-        if match:
-            video_id = match.group(1)
-
-        if not video_id:
-            print("ScrapTik: Could not extract video ID from URL")
-            return {}
-
         # Try with URL parameter (some APIs prefer full URL over ID)
-        response = httpx.get(
+        response = await rate_limited_get(
+            "scraptik",
             "https://scraptik.p.rapidapi.com/video",
+            reservation=reservation,
             headers={
                 "x-rapidapi-host": "scraptik.p.rapidapi.com",
                 "x-rapidapi-key": settings.rapidapi_key,
@@ -166,10 +547,10 @@ def get_metadata_scraptik(url: str) -> dict:
 
             # Extract description and hashtags
             description = video.get("desc", "")
-            hashtags = re.findall(r"#(\w+)", description)
+            hashtags = HASHTAG_RE.findall(description)
 
-            # Increment quota on successful call
-            used, limit = increment_quota("scraptik", SCRAPTIK_MONTHLY_LIMIT)
+            # The reserved unit was counted when the request went out
+            used, limit = reservation.commit()
             print(f"✓ ScrapTik: Success ({used}/{limit} used this month)")
 
             return {
@@ -187,25 +568,26 @@ def get_metadata_scraptik(url: str) -> dict:
     except Exception as e:
         print(f"ScrapTik metadata error: {e}")
         return {}
+    finally:
+        # No-op once the request was sent; frees the unit if it never was
+        reservation.release()
 
 
-def get_metadata_oembed(url: str) -> Optional[dict]:
+async def get_metadata_oembed(url: str) -> Optional[dict]:
     """Get metadata from TikTok oEmbed API."""
     try:
         import urllib.parse
         encoded_url = urllib.parse.quote(url, safe='')
         oembed_url = f'https://www.tiktok.com/oembed?url={encoded_url}'
 
-        # Use proxy if configured
-        proxy = settings.proxy_url if settings.proxy_url else None
-
-        response = httpx.get(oembed_url, proxy=proxy, timeout=30, follow_redirects=True)
+        # Pooled TikTok client follows redirects and uses the proxy if configured
+        response = await get_async_client("tiktok").get(oembed_url, timeout=30)
         if response.status_code == 200:
             data = response.json()
             title = data.get("title", "")
 
             # Extract hashtags from title/description
-            hashtags = re.findall(r"#(\w+)", title)
+            hashtags = HASHTAG_RE.findall(title)
 
             print(f"✓ oEmbed: Success (title, creator, thumbnail)")
 
@@ -225,40 +607,33 @@ def get_metadata_oembed(url: str) -> Optional[dict]:
 
 
 def get_metadata_ytdlp(url: str) -> dict:
-    """Get video metadata using yt-dlp."""
-    try:
-        import yt_dlp
-
-        ydl_opts = {
-            "quiet": True,
-            "no_warnings": True,
-            "extract_flat": False,
-            "skip_download": True,
-            "http_headers": {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            },
-        }
-
-        # Add proxy if configured
-        if settings.proxy_url:
-            ydl_opts["proxy"] = settings.proxy_url
+    """
+    Get video metadata using a pooled yt-dlp instance.
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+    Waits at most settings.ytdlp_checkout_timeout for a free instance:
+    extractions abandoned by a cancelled hedge keep their slot until they
+    finish, so an unbounded wait could hang this thread.
+    """
+    try:
+        with ytdlp_pool.get_pool().checkout(timeout=settings.ytdlp_checkout_timeout) as ydl:
             info = ydl.extract_info(url, download=False)
 
-            # Extract hashtags from description
-            description = info.get("description", "") or ""
-            hashtags = re.findall(r"#(\w+)", description)
-
-            return {
-                "title": info.get("title"),
-                "description": description,
-                "creator": info.get("uploader") or info.get("channel"),
-                "hashtags": hashtags,
-                "view_count": info.get("view_count"),
-                "like_count": info.get("like_count"),
-                "thumbnail_url": info.get("thumbnail"),
-            }
+        # Extract hashtags from description
+        description = info.get("description", "") or ""
+        hashtags = HASHTAG_RE.findall(description)
+
+        return {
+            "title": info.get("title"),
+            "description": description,
+            "creator": info.get("uploader") or info.get("channel"),
+            "hashtags": hashtags,
+            "view_count": info.get("view_count"),
+            "like_count": info.get("like_count"),
+            "thumbnail_url": info.get("thumbnail"),
+        }
+    except queue.Empty:
+        print(f"yt-dlp: no free extractor after {settings.ytdlp_checkout_timeout:g}s - using fallback methods")
+        return {}
     except Exception as e:
         error_msg = str(e)
         if "blocked" in error_msg.lower():
@@ -270,14 +645,8 @@ def get_metadata_ytdlp(url: str) -> dict:
 
 def extract_from_url(url: str) -> dict:
     """Extract minimal metadata from URL when APIs fail."""
-    video_id = None
-    username = None
-
-    # Standard URL: https://www.tiktok.com/@username/video/1234567890
-    match = re.search(r"tiktok\.com/@([^/]+)/video/(\d+)", url)
-    if match:
-        username = match.group(1)
-        video_id = match.group(2)
+    parsed = parse_tiktok_url(url)
+    username = parsed.username if parsed else None
 
     return {
         "title": f"TikTok by @{username}" if username else "TikTok video",
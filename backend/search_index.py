@@ -0,0 +1,118 @@
+"""SQLite FTS5 index over video text, kept in sync by triggers."""
+import re
+from typing import Optional
+
+from sqlalchemy import DDL, Float, Integer, String, event, text
+from sqlalchemy.exc import OperationalError
+
+FTS_TABLE = "videos_fts"
+
+# bm25() weights per indexed column: a hit in the title counts most
+COLUMN_WEIGHTS = {"title": 10.0, "description": 3.0, "transcript": 1.0, "summaries": 5.0}
+
+SNIPPET_OPEN = "<mark>"
+SNIPPET_CLOSE = "</mark>"
+SNIPPET_TOKENS = 16
+
+LENSES = ("investment", "product", "content", "knowledge")
+
+_COLUMNS = ", ".join(COLUMN_WEIGHTS)
+
+
+def _row_values(row: str) -> str:
+    """SQL for the indexed values of a videos row (e.g. NEW in a trigger)."""
+    summaries = " || ' ' || ".join(
+        f"coalesce(json_extract({row}.{lens}_analysis, '$.summary'), '')" for lens in LENSES
+    )
+    return f"{row}.id, {row}.title, {row}.description, {row}.transcript, {summaries}"
+
+
+CREATE_STATEMENTS = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{_COLUMNS}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON videos BEGIN "
+    f"INSERT INTO {FTS_TABLE} (rowid, {_COLUMNS}) VALUES ({_row_values('new')}); END",
+    # Only edits to indexed columns touch the index (not status updates etc.)
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF title, description, transcript, "
+    f"{', '.join(f'{lens}_analysis' for lens in LENSES)} ON videos BEGIN "
+    f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; "
+    f"INSERT INTO {FTS_TABLE} (rowid, {_COLUMNS}) VALUES ({_row_values('new')}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON videos BEGIN "
+    f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END",
+)
+
+REBUILD_STATEMENTS = (
+    f"DELETE FROM {FTS_TABLE}",
+    f"INSERT INTO {FTS_TABLE} (rowid, {_COLUMNS}) SELECT {_row_values('videos')} FROM videos",
+)
+
+
+def attach(videos_table) -> None:
+    """Create and drop the index together with the videos table (create_all/drop_all)."""
+    for statement in CREATE_STATEMENTS:
+        event.listen(videos_table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    event.listen(
+        videos_table, "before_drop", DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite")
+    )
+
+
+def _index_exists(conn) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first() is not None
+
+
+def ensure_index(engine) -> None:
+    """Add the index to an existing database, filling it from the stored videos."""
+    if engine.dialect.name != "sqlite":
+        return
+    try:
+        with engine.begin() as conn:
+            if _index_exists(conn):
+                return
+            for statement in CREATE_STATEMENTS + REBUILD_STATEMENTS:
+                conn.execute(text(statement))
+        print("Search index: built")
+    except OperationalError as e:
+        # e.g. SQLite built without FTS5; list_videos falls back to LIKE
+        print(f"Search index unavailable: {e}")
+
+
+def fts_query(search: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query.
+
+    Every word must match; the last one also matches as a prefix, so results
+    show up while the user is still typing. Punctuation is dropped, so user
+    input can't produce FTS5 syntax errors.
+    """
+    words = re.findall(r"\w+", search.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_matches(db, search: str):
+    """
+    Subquery of (rowid, rank, snippet) for videos matching a search.
+
+    rank is the weighted BM25 score (lower is better). Returns None when
+    the text has no searchable words or the index doesn't exist.
+    """
+    query = fts_query(search)
+    if query is None or not _index_exists(db):
+        return None
+
+    weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS.values())
+    return (
+        text(
+            f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank, "
+            f"snippet({FTS_TABLE}, -1, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :query"
+        )
+        .bindparams(query=query, open=SNIPPET_OPEN, close=SNIPPET_CLOSE)
+        .columns(rowid=Integer, rank=Float, snippet=String)
+        .subquery("matches")
+    )
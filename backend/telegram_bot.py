@@ -7,6 +7,8 @@ from aiogram.types import Message
 
 from config import get_settings
 from database import SessionLocal, Video, init_db
+from http_client import aclose_clients
+from ingest import submit_video, confirmation_message
 from scraper import validate_tiktok_url
 
 logging.basicConfig(level=logging.INFO)
@@ -90,41 +92,18 @@ async def save_video(message: Message, url: str, context: str = None):
         )
         return
 
-    db = SessionLocal()
     try:
-        # Create video record
-        video = Video(
-            tiktok_url=url,
-            context=context,
-            status="pending",
+        result = await submit_video(
+            url,
+            context,
             telegram_chat_id=str(message.chat.id),
             telegram_message_id=message.message_id,
         )
-        db.add(video)
-        db.commit()
-        db.refresh(video)
-
-        # Queue for processing
-        try:
-            from queue_manager import enqueue_video_processing
-            job_id = enqueue_video_processing(video.id)
-            logger.info(f"Queued video {video.id} as job {job_id}")
-        except Exception as e:
-            logger.warning(f"Queue not available, will process synchronously: {e}")
-
-        # Confirm to user
-        response = f"✅ Video saved! (ID: {video.id})\n"
-        if context:
-            response += f"📝 Context: {context}\n"
-        response += "\n🔄 Processing will start shortly..."
-
-        await message.answer(response)
+        await message.answer(confirmation_message(result, context))
 
     except Exception as e:
         logger.error(f"Error saving video: {e}")
         await message.answer(f"❌ Error saving video: {e}")
-    finally:
-        db.close()
 
 
 @dp.message(Command("status"))
@@ -152,7 +131,10 @@ async def main():
     """Start the bot."""
     init_db()
     logger.info("Starting Tikodea Telegram bot...")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await aclose_clients()
 
 
 if __name__ == "__main__":
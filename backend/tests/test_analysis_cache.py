@@ -0,0 +1,82 @@
+"""Tests for the content-addressed LLM analysis cache."""
+import json
+
+import pytest
+
+import analysis_cache
+import llm_analyzer
+from cache_store import SQLiteCache
+
+ANALYSIS = {
+    lens: {**dict.fromkeys(llm_analyzer.LENS_REQUIRED_FIELDS[lens], "n/a"), "summary": f"{lens} summary"}
+    for lens in llm_analyzer.LENSES
+}
+ANALYSIS["investment"]["opportunity_score"] = 6
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    """Give every test its own empty analysis cache."""
+    cache = SQLiteCache(str(tmp_path / "analysis_cache.db"), table="analysis_cache")
+    monkeypatch.setattr(analysis_cache, "_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """Answer LLM calls with a fixed analysis and record them."""
+    calls = []
+
+    def call_llm(prompt, models=None):
+        calls.append(prompt)
+        models.add(llm_analyzer.route_models("analysis")[0])
+        return json.dumps(ANALYSIS)
+
+    monkeypatch.setattr(llm_analyzer, "call_llm", call_llm)
+    return calls
+
+
+class TestCacheKey:
+    """Test key normalisation."""
+
+    def test_formatting_differences_share_a_key(self):
+        """Whitespace and hashtag order/case should not change the key."""
+        a = analysis_cache.cache_key("m", "1", title="Hello  world", hashtags=["AI", "tech"])
+        b = analysis_cache.cache_key("m", "1", title=" Hello world\n", hashtags=["#tech", "ai"])
+        assert a == b
+
+    def test_model_and_prompt_version_change_the_key(self):
+        """A new model or prompt template must not reuse old analyses."""
+        base = analysis_cache.cache_key("m", "1", title="t")
+        assert analysis_cache.cache_key("other", "1", title="t") != base
+        assert analysis_cache.cache_key("m", "2", title="t") != base
+
+
+class TestAnalyzeVideo:
+    """Test the cache in front of analyze_video."""
+
+    def test_identical_inputs_hit_the_cache(self, llm_calls):
+        """The second analysis of the same content should not call the LLM."""
+        first = llm_analyzer.analyze_video("transcript", "Title", None, ["ai"])
+        second = llm_analyzer.analyze_video("transcript ", "Title", None, ["AI"])
+
+        assert len(llm_calls) == 1
+        assert second == first
+        stats = analysis_cache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    def test_failed_lenses_are_not_cached(self, monkeypatch, llm_calls):
+        """An analysis with an errored lens should be retried next time."""
+        broken = {**ANALYSIS, "product": {"error": "boom"}}
+        monkeypatch.setattr(llm_analyzer, "call_llm", lambda prompt, models=None: llm_calls.append(prompt) or json.dumps(broken))
+
+        async def analyze_lens_async(lens, content, models=None):
+            return {"error": "still broken"}
+
+        monkeypatch.setattr(llm_analyzer, "analyze_lens_async", analyze_lens_async)
+
+        llm_analyzer.analyze_video("transcript", "Title", None, None)
+        llm_analyzer.analyze_video("transcript", "Title", None, None)
+
+        assert len(llm_calls) == 2
+
@@ -56,7 +56,7 @@ class TestVideoEndpoints:
 
     def test_list_videos_empty(self):
         """Should return empty list when no videos."""
-        response = client.get("/api/videos")
+        response = client.get("/api/videos", params={"include_total": "true"})
         assert response.status_code == 200
         assert response.json()["videos"] == []
         assert response.json()["total"] == 0
@@ -98,6 +98,165 @@ class TestVideoEndpoints:
         assert response.json()["manual_tags"] == ["new", "tags"]
 
 
+class TestPagination:
+    """Test cursor pagination of the video list."""
+
+    @staticmethod
+    def _add_videos(count, **fields):
+        from datetime import datetime
+
+        db = SessionLocal()
+        # Pairs share a timestamp so the id tie-breaker is exercised
+        videos = [
+            Video(tiktok_url=f"https://tiktok.com/@t/video/{i}", created_at=datetime(2026, 1, 1 + i // 2), **fields)
+            for i in range(count)
+        ]
+        db.add_all(videos)
+        db.commit()
+        ids = [v.id for v in videos]
+        db.close()
+        return ids
+
+    def test_cursor_walks_every_video_once(self):
+        """Following next_cursor should return the same order as offset paging."""
+        self._add_videos(7, title="Clip")
+        expected = [v["id"] for v in client.get("/api/videos", params={"limit": 100}).json()["videos"]]
+
+        seen, params = [], {"limit": 3}
+        while True:
+            page = client.get("/api/videos", params=params).json()
+            assert "total" not in page
+            seen += [v["id"] for v in page["videos"]]
+            if not page["next_cursor"]:
+                break
+            params = {"limit": 3, "cursor": page["next_cursor"]}
+
+        assert seen == expected
+        assert len(seen) == 7
+
+    def test_cursor_total_on_request(self):
+        """Pages should only count when asked."""
+        self._add_videos(3)
+        assert "total" not in client.get("/api/videos", params={"limit": 1}).json()
+        first = client.get("/api/videos", params={"limit": 1, "include_total": "true"}).json()
+        assert first["total"] == 3
+
+        page = client.get("/api/videos", params={"limit": 1, "cursor": first["next_cursor"], "include_total": "true"})
+
+        assert page.json()["total"] == 3
+
+    def test_search_results_page_by_rank(self):
+        """Search pages should continue in relevance order."""
+        self._add_videos(4, title="Espresso")
+        first = client.get("/api/videos", params={"search": "espresso", "limit": 2}).json()
+        second = client.get("/api/videos", params={"search": "espresso", "limit": 2, "cursor": first["next_cursor"]})
+
+        ids = [v["id"] for v in first["videos"] + second.json()["videos"]]
+        assert len(set(ids)) == 4
+        assert second.json()["next_cursor"] is None
+
+    def test_invalid_cursor(self):
+        """A garbled or mismatched cursor should be rejected."""
+        self._add_videos(2, title="Espresso")
+        feed_cursor = client.get("/api/videos", params={"limit": 1}).json()["next_cursor"]
+
+        assert client.get("/api/videos", params={"cursor": "not-a-cursor"}).status_code == 400
+        assert client.get("/api/videos", params={"search": "espresso", "cursor": feed_cursor}).status_code == 400
+
+
+class TestListProjection:
+    """Test the fields= projection of the video list."""
+
+    @staticmethod
+    def _add_analysed_video():
+        db = SessionLocal()
+        video = Video(
+            tiktok_url="https://tiktok.com/@test/video/9",
+            title="Analysed",
+            transcript="a long transcript " * 100,
+            investment_analysis={"summary": "Worth watching", "opportunity_score": 7},
+            status="completed",
+        )
+        db.add(video)
+        db.commit()
+        video_id = video.id
+        db.close()
+        return video_id
+
+    def test_summary_projection_skips_heavy_columns(self):
+        """The default list should neither return nor select transcripts and analyses."""
+        from sqlalchemy import event
+
+        self._add_analysed_video()
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            video = client.get("/api/videos").json()["videos"][0]
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert video["title"] == "Analysed"
+        assert video["summaries"]["investment"] == "Worth watching"
+        assert video["summaries"]["product"] is None
+        assert "transcript" not in video and "investment_analysis" not in video
+        assert not any("videos.transcript" in s for s in statements)
+
+    def test_full_and_custom_fields(self):
+        """fields=full should match the detail view; a list should return just those keys."""
+        video_id = self._add_analysed_video()
+
+        full = client.get("/api/videos", params={"fields": "full"}).json()["videos"][0]
+        custom = client.get("/api/videos", params={"fields": "title,summaries"}).json()["videos"][0]
+
+        assert full == client.get(f"/api/videos/{video_id}").json()
+        assert set(custom) == {"title", "summaries"}
+        assert client.get("/api/videos", params={"fields": "title,secret"}).status_code == 400
+
+
+class TestSearch:
+    """Test full-text search on the video list."""
+
+    @staticmethod
+    def _add(**fields):
+        db = SessionLocal()
+        video = Video(tiktok_url="https://tiktok.com/@test/video/1", status="completed", **fields)
+        db.add(video)
+        db.commit()
+        video_id = video.id
+        db.close()
+        return video_id
+
+    def test_ranked_matches_with_snippets(self):
+        """Title hits should outrank transcript hits, with the match highlighted."""
+        in_transcript = self._add(title="Morning routine", transcript="my favourite espresso machine review")
+        in_title = self._add(title="Espresso at home", transcript="grinding beans")
+        self._add(title="Unrelated", transcript="nothing to see")
+
+        results = client.get("/api/videos", params={"search": "espresso", "include_total": "true"}).json()
+
+        assert [v["id"] for v in results["videos"]] == [in_title, in_transcript]
+        assert results["total"] == 2
+        assert "<mark>espresso</mark>" in results["videos"][1]["snippet"].lower()
+
+    def test_prefix_and_analysis_summaries(self):
+        """Partial words should match, and so should analysis summaries."""
+        video_id = self._add(title="Clip", product_analysis={"summary": "A subscription box for gardeners"})
+
+        assert [v["id"] for v in client.get("/api/videos", params={"search": "garden"}).json()["videos"]] == [video_id]
+
+    def test_index_follows_updates(self):
+        """Edits to indexed columns should be searchable right away."""
+        video_id = self._add(title="Old title")
+        db = SessionLocal()
+        db.get(Video, video_id).transcript = "now about sourdough"
+        db.commit()
+        db.close()
+
+        assert len(client.get("/api/videos", params={"search": "sourdough"}).json()["videos"]) == 1
+        assert client.get("/api/videos", params={"search": "\"(*"}).status_code == 200
+
+
 class TestChatEndpoints:
     """Test chat API endpoints."""
 
@@ -106,3 +265,67 @@ class TestChatEndpoints:
         response = client.get(f"/api/videos/{create_video}/chat")
         assert response.status_code == 200
         assert response.json()["messages"] == []
+
+    def test_stream_chat_message(self, create_video, monkeypatch):
+        """Streamed deltas should arrive as SSE and the full answer be saved."""
+        import llm_analyzer
+
+        async def stream_chat(messages):
+            for text in ["Hel", "lo"]:
+                yield text
+
+        monkeypatch.setattr(llm_analyzer, "stream_chat", stream_chat)
+
+        with client.stream("POST", f"/api/videos/{create_video}/chat/stream", json={"message": "Hi"}) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            body = response.read().decode()
+
+        assert 'event: delta\ndata: {"content": "Hel"}' in body
+        assert "event: done" in body
+        history = client.get(f"/api/videos/{create_video}/chat").json()["messages"]
+        assert [(m["role"], m["content"]) for m in history] == [("user", "Hi"), ("assistant", "Hello")]
+
+    def test_stream_failing_before_output_saves_nothing(self, create_video, monkeypatch):
+        """A stream that fails before the first token should not leave an unanswered user turn."""
+        import llm_analyzer
+        from llm_client import LLMError
+
+        async def stream_chat(messages):
+            raise LLMError("OpenRouter error 503", 503)
+            yield
+
+        monkeypatch.setattr(llm_analyzer, "stream_chat", stream_chat)
+
+        with client.stream("POST", f"/api/videos/{create_video}/chat/stream", json={"message": "Hi"}) as response:
+            body = response.read().decode()
+
+        assert "event: error" in body
+        assert "event: done" not in body
+        assert client.get(f"/api/videos/{create_video}/chat").json()["messages"] == []
+
+
+class TestLensRerun:
+    """Test re-running a single analysis lens."""
+
+    def test_rerun_lens_saves_result(self, create_video, monkeypatch):
+        """Only the requested lens should be re-analysed and stored."""
+        import llm_analyzer
+
+        async def analyze_lens(lens, content, models=None):
+            return {"summary": f"fresh {lens}"}
+
+        monkeypatch.setattr(llm_analyzer, "analyze_lens_async", analyze_lens)
+
+        response = client.post(f"/api/videos/{create_video}/analysis/product")
+        assert response.status_code == 200
+        assert response.json()["analysis"] == {"summary": "fresh product"}
+
+        video = client.get(f"/api/videos/{create_video}").json()
+        assert video["product_analysis"] == {"summary": "fresh product"}
+        assert video["investment_analysis"] is None
+
+    def test_unknown_lens(self, create_video):
+        """Unknown lens names should 404."""
+        response = client.post(f"/api/videos/{create_video}/analysis/astrology")
+        assert response.status_code == 404
@@ -0,0 +1,53 @@
+"""Tests for the SQLite-backed cache."""
+import time
+
+from cache_store import SQLiteCache
+
+
+class TestSQLiteCache:
+    """Test TTL and LRU behaviour."""
+
+    def test_set_and_get(self, tmp_path):
+        """Stored values should round-trip as JSON."""
+        cache = SQLiteCache(str(tmp_path / "cache.db"))
+        cache.set("a", {"x": 1, "tags": ["one"]})
+
+        assert cache.get("a") == {"x": 1, "tags": ["one"]}
+        assert cache.get("missing") is None
+
+    def test_expired_entries_are_misses(self, tmp_path):
+        """Entries older than max_age should not be returned."""
+        cache = SQLiteCache(str(tmp_path / "cache.db"))
+        cache.set("a", {"x": 1})
+
+        assert cache.get("a", max_age=60) == {"x": 1}
+        assert cache.get("a", max_age=-1) is None
+
+    def test_lru_eviction(self, tmp_path):
+        """Least recently used entries should be evicted past max_entries."""
+        cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=2)
+        cache.set("a", {"v": "a"})
+        cache.set("b", {"v": "b"})
+        time.sleep(0.01)
+        cache.get("a")
+        cache.set("c", {"v": "c"})
+
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == {"v": "a"}
+
+    def test_get_many(self, tmp_path):
+        """get_many should return only the keys that exist."""
+        cache = SQLiteCache(str(tmp_path / "cache.db"))
+        cache.set("a", {"v": 1})
+        cache.set("b", {"v": 2})
+
+        assert cache.get_many(["a", "b", "c"]) == {"a": {"v": 1}, "b": {"v": 2}}
+
+    def test_stats_are_shared_between_instances(self, tmp_path):
+        """Counters should be stored in the file, not the instance."""
+        path = str(tmp_path / "cache.db")
+        SQLiteCache(path).incr_stat("hits")
+        SQLiteCache(path).incr_stat("hits", 2)
+
+        assert SQLiteCache(path).get_stats() == {"hits": 3}
@@ -0,0 +1,115 @@
+"""Tests for the chat prompt builder."""
+import asyncio
+
+import pytest
+
+import chat_context
+from database import ChatMessage, Video
+from text_budget import estimate_tokens
+
+
+@pytest.fixture
+def video(test_db):
+    """A completed video with a long transcript."""
+    video = Video(
+        tiktok_url="https://www.tiktok.com/@test/video/1",
+        title="Test Video",
+        creator="tester",
+        transcript="word " * 5000,
+        investment_analysis={"summary": "Strong thesis", "opportunity_score": 7},
+        product_analysis={"error": "boom"},
+        status="completed",
+    )
+    test_db.add(video)
+    test_db.commit()
+    return video
+
+
+def add_turns(db, video, count):
+    for i in range(count):
+        db.add(ChatMessage(video_id=video.id, role="user" if i % 2 == 0 else "assistant", content=f"turn {i}"))
+    db.commit()
+
+
+class TestVideoContext:
+    """Test the stored compact context."""
+
+    def test_context_fits_budget_by_priority(self, video):
+        """Summaries survive; the transcript is truncated; errored lenses are skipped."""
+        context = chat_context.build_video_context(video, max_tokens=300)
+
+        assert estimate_tokens(context) <= 300
+        assert "Investment: Strong thesis" in context
+        assert "[truncated]" in context
+        assert "boom" not in context
+
+    def test_context_is_stored_and_rebuilt_on_change(self, video):
+        """The stored context should only change when its inputs do."""
+        first = chat_context.get_video_context(video)
+        assert chat_context.get_video_context(video) is first
+
+        video.title = "Renamed"
+        assert "Renamed" in chat_context.get_video_context(video)
+
+
+class TestChatMessages:
+    """Test history handling."""
+
+    def test_prefix_is_stable_between_turns(self, test_db, video):
+        """The system prefix should be byte-identical as the chat grows."""
+        first = chat_context.build_chat_messages(test_db, video, "q1")
+        add_turns(test_db, video, 2)
+        second = chat_context.build_chat_messages(test_db, video, "q2")
+
+        assert second[0] == first[0]
+        assert [m["content"] for m in second[1:]] == ["turn 0", "turn 1", "q2"]
+
+    def test_older_turns_are_folded_into_summary(self, test_db, video, monkeypatch):
+        """Turns beyond the recent window should be summarised in the background, not sent verbatim."""
+        folded = []
+
+        async def summarize(previous, messages):
+            folded.extend(m.content for m in messages)
+            return "summary of earlier turns"
+
+        monkeypatch.setattr(chat_context, "_summarize", summarize)
+        monkeypatch.setattr(chat_context.settings, "chat_recent_messages", 4)
+        add_turns(test_db, video, 10)
+
+        asyncio.run(chat_context.fold_summary(video.id))
+        test_db.refresh(video)
+        messages = chat_context.build_chat_messages(test_db, video, "next")
+
+        assert folded == [f"turn {i}" for i in range(6)]
+        assert messages[1]["content"].endswith("summary of earlier turns")
+        assert [m["content"] for m in messages[2:]] == ["turn 6", "turn 7", "turn 8", "turn 9", "next"]
+        assert video.chat_summary_through_id is not None
+
+    def test_building_messages_makes_no_llm_call(self, test_db, video, monkeypatch):
+        """Unfolded older turns should be sent verbatim instead of waiting for a summary."""
+        async def summarize(previous, messages):
+            raise AssertionError("summary requested while building the prompt")
+
+        monkeypatch.setattr(chat_context, "_summarize", summarize)
+        monkeypatch.setattr(chat_context.settings, "chat_recent_messages", 4)
+        add_turns(test_db, video, 10)
+
+        messages = chat_context.build_chat_messages(test_db, video, "next")
+
+        assert [m["content"] for m in messages[1:]] == [*(f"turn {i}" for i in range(10)), "next"]
+
+    def test_failed_fold_keeps_older_turns(self, test_db, video, monkeypatch):
+        """If the summary call fails, older turns should stay in context."""
+        async def summarize(previous, messages):
+            raise RuntimeError("summary model down")
+
+        monkeypatch.setattr(chat_context, "_summarize", summarize)
+        monkeypatch.setattr(chat_context.settings, "chat_recent_messages", 4)
+        add_turns(test_db, video, 10)
+
+        asyncio.run(chat_context.fold_summary(video.id))
+        test_db.refresh(video)
+        messages = chat_context.build_chat_messages(test_db, video, "next")
+
+        assert video.chat_summary_through_id is None
+        assert [m["content"] for m in messages[1:]] == [*(f"turn {i}" for i in range(10)), "next"]
@@ -0,0 +1,41 @@
+"""Tests for the pooled HTTP client registry."""
+import asyncio
+
+from http_client import close_clients, get_async_client, run_sync
+
+
+class TestClientRegistry:
+    """Test client reuse and shutdown."""
+
+    def test_async_client_is_reused_across_run_sync_calls(self):
+        """Async clients should survive between run_sync calls."""
+
+        async def fetch_client():
+            return get_async_client("supadata")
+
+        first = run_sync(fetch_client())
+        second = run_sync(fetch_client())
+        assert first is second
+        close_clients()
+        assert first.is_closed
+
+    def test_close_clients_recreates_on_next_use(self):
+        """Closed clients should be replaced transparently."""
+
+        async def fetch_client():
+            return get_async_client("scraptik")
+
+        client = run_sync(fetch_client())
+        close_clients()
+        assert client.is_closed
+        assert not run_sync(fetch_client()).is_closed
+        close_clients()
+
+    def test_async_client_per_loop(self):
+        """Each event loop should get its own async client."""
+
+        async def fetch_client():
+            return get_async_client("tiktok")
+
+        assert asyncio.run(fetch_client()) is not run_sync(fetch_client())
+        close_clients()
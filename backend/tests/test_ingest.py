@@ -0,0 +1,165 @@
+"""Tests for video submission and job coalescing."""
+import asyncio
+
+import pytest
+
+import ingest
+import queue_manager
+from database import SessionLocal, Video
+from ingest import propagate_results, submit_video
+
+URL = "https://www.tiktok.com/@user/video/777"
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    """Record enqueued video IDs instead of talking to Redis."""
+    jobs = []
+
+    def enqueue(video_id):
+        jobs.append(video_id)
+        return f"job-{video_id}"
+
+    monkeypatch.setattr(queue_manager, "enqueue_video_processing", enqueue)
+    return jobs
+
+
+class TestSubmitVideo:
+    """Test single-flight submission."""
+
+    def test_first_submission_is_queued(self, test_db, enqueued):
+        """A new video should get its own job."""
+        result = asyncio.run(submit_video(URL, "ctx", telegram_chat_id="1"))
+
+        assert result.job_id == f"job-{result.video_id}"
+        assert result.coalesced_into_id is None
+        assert enqueued == [result.video_id]
+        assert test_db.get(Video, result.video_id).tiktok_video_id == "777"
+
+    def test_duplicate_submission_attaches_to_in_flight_job(self, test_db, enqueued):
+        """A second submission of the same video should not enqueue a job."""
+        first = asyncio.run(submit_video(URL, "first", telegram_chat_id="1"))
+        second = asyncio.run(submit_video(URL + "?lang=en", "second", discord_channel_id="2"))
+
+        assert enqueued == [first.video_id]
+        assert second.coalesced_into_id == first.video_id
+        assert second.job_id is None
+
+        video = test_db.get(Video, second.video_id)
+        assert video.context == "second"
+        assert video.discord_channel_id == "2"
+
+    def test_duplicate_of_completed_video_shares_results(self, test_db, enqueued):
+        """Submitting an already analyzed video should return its results immediately."""
+        first = asyncio.run(submit_video(URL))
+        primary = test_db.get(Video, first.video_id)
+        primary.status = "completed"
+        primary.title = "Done"
+        primary.investment_analysis = {"summary": "ok"}
+        test_db.commit()
+
+        second = asyncio.run(submit_video(URL, "mine"))
+
+        assert second.status == "completed"
+        video = test_db.get(Video, second.video_id)
+        assert video.title == "Done"
+        assert video.investment_analysis == {"summary": "ok"}
+        assert video.context == "mine"
+
+    def test_failed_video_is_not_reused(self, test_db, enqueued):
+        """A failed run should not absorb new submissions."""
+        first = asyncio.run(submit_video(URL))
+        test_db.get(Video, first.video_id).status = "failed"
+        test_db.commit()
+
+        second = asyncio.run(submit_video(URL))
+
+        assert second.coalesced_into_id is None
+        assert enqueued == [first.video_id, second.video_id]
+
+    def test_unqueued_primary_is_queued_again(self, test_db, enqueued, monkeypatch):
+        """A primary whose job was never queued should be queued by the next submission."""
+        real_enqueue = queue_manager.enqueue_video_processing
+        monkeypatch.setattr(queue_manager, "enqueue_video_processing", lambda video_id: 1 / 0)
+        first = asyncio.run(submit_video(URL))
+        assert first.job_id is None
+
+        monkeypatch.setattr(queue_manager, "enqueue_video_processing", real_enqueue)
+        second = asyncio.run(submit_video(URL))
+
+        assert second.coalesced_into_id == first.video_id
+        assert enqueued == [first.video_id]
+        assert test_db.get(Video, first.video_id).job_id == f"job-{first.video_id}"
+
+    def test_primary_with_dead_worker_is_queued_again(self, test_db, enqueued, monkeypatch):
+        """A primary stuck in processing past the lease should be re-queued, not waited on."""
+        first = asyncio.run(submit_video(URL))
+        primary = test_db.get(Video, first.video_id)
+        primary.status = "processing"
+        test_db.commit()
+        monkeypatch.setattr(ingest.settings, "coalesce_lease_seconds", -1)
+
+        second = asyncio.run(submit_video(URL))
+
+        assert second.coalesced_into_id == first.video_id
+        assert enqueued == [first.video_id, first.video_id]
+        test_db.refresh(primary)
+        assert primary.status == "pending"
+
+    def test_stuck_primary_is_replaced_when_queue_is_down(self, test_db, monkeypatch):
+        """If the stuck primary can't be re-queued, the new submission should stand on its own."""
+        monkeypatch.setattr(queue_manager, "enqueue_video_processing", lambda video_id: 1 / 0)
+        first = asyncio.run(submit_video(URL))
+
+        second = asyncio.run(submit_video(URL))
+
+        assert second.coalesced_into_id is None
+        assert test_db.get(Video, first.video_id).coalesced_into_id is None
+
+
+class TestPropagateResults:
+    """Test sharing results with coalesced submissions."""
+
+    def test_results_are_copied_to_followers(self, test_db, enqueued):
+        """Followers should get the primary's output but keep their context."""
+        first = asyncio.run(submit_video(URL, "a"))
+        second = asyncio.run(submit_video(URL, "b"))
+
+        primary = test_db.get(Video, first.video_id)
+        primary.status = "completed"
+        primary.transcript = "words"
+        test_db.commit()
+
+        assert propagate_results(test_db, primary) == 1
+        follower = test_db.get(Video, second.video_id)
+        test_db.refresh(follower)
+        assert follower.status == "completed"
+        assert follower.transcript == "words"
+        assert follower.context == "b"
+
+    def test_primary_finishing_while_follower_attaches(self, test_db, enqueued, monkeypatch):
+        """A primary that completes between the follower's read and commit should still share its result."""
+        first = asyncio.run(submit_video(URL))
+        real_find_primary = ingest.find_primary
+
+        def find_primary(db, tiktok_video_id, before_id=None):
+            primary = real_find_primary(db, tiktok_video_id, before_id)
+            # The primary finishes and propagates before the follower is committed
+            other = SessionLocal()
+            finished = other.get(Video, primary.id)
+            finished.status = "completed"
+            finished.title = "Done"
+            other.commit()
+            propagate_results(other, finished)
+            other.close()
+            return primary
+
+        monkeypatch.setattr(ingest, "find_primary", find_primary)
+
+        second = asyncio.run(submit_video(URL, "late"))
+
+        assert second.coalesced_into_id == first.video_id
+        assert second.status == "completed"
+        follower = test_db.get(Video, second.video_id)
+        assert follower.title == "Done"
+        assert follower.context == "late"
@@ -0,0 +1,50 @@
+"""Tests for tolerant JSON extraction from LLM output."""
+import pytest
+
+from json_extract import JSONExtractError, extract_json
+
+
+class TestExtractJson:
+    """Test recovering an object from mixed model output."""
+
+    def test_prose_and_code_fences(self):
+        """Text around a fenced object should be ignored."""
+        text = 'Sure! Here it is:\n```json\n{"a": {"b": "}"}}\n```\nHope that helps {not json}'
+        assert extract_json(text) == {"a": {"b": "}"}}
+
+    def test_common_defects_are_repaired(self):
+        """Trailing commas, smart quotes and Python literals should parse."""
+        assert extract_json('{"a": [1, 2,], "b": True, "c": None,}') == {"a": [1, 2], "b": True, "c": None}
+        assert extract_json("{“a”: 1}") == {"a": 1}
+
+    def test_truncated_output_keeps_finished_members(self):
+        """A cut-off answer should keep every member completed before the cut."""
+        text = '{"investment": {"summary": "ok"}, "product": {"summary": "half wri'
+        assert extract_json(text) == {"investment": {"summary": "ok"}, "product": {}}
+
+    def test_unescaped_quote_inside_one_lens(self):
+        """A stray inner quote should be repaired, not replaced by a nested object."""
+        text = (
+            '{"investment": {"summary": "s investment", "opportunity_score": 5}, '
+            '"content": {"summary": "He said "buy now" loudly"}, "knowledge": {"summary": "k"}}'
+        )
+        assert extract_json(text) == {
+            "investment": {"summary": "s investment", "opportunity_score": 5},
+            "content": {"summary": 'He said "buy now" loudly'},
+            "knowledge": {"summary": "k"},
+        }
+
+    def test_damaged_object_keeps_members_before_the_damage(self):
+        """An object that can't be repaired should be cut back, never swapped for a nested one."""
+        text = '{"investment": {"summary": "s"}, "product": {"summary": "p", "x": [1 2]}, "content": {"summary": "c"}}'
+        assert extract_json(text) == {"investment": {"summary": "s"}, "product": {"summary": "p", "x": []}}
+
+    def test_stray_braces_before_the_answer(self):
+        """Braces in prose before the object should not be taken as the answer."""
+        assert extract_json('Use {placeholders} like this: {"a": 1}') == {"a": 1}
+
+    def test_no_object_raises(self):
+        """Text without any object should raise JSONExtractError."""
+        with pytest.raises(JSONExtractError):
+            extract_json("I can't help with that.")
+
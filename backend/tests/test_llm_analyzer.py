@@ -0,0 +1,217 @@
+"""Tests for LLM video analysis."""
+import asyncio
+import json
+
+import pytest
+
+import analysis_cache
+import llm_analyzer
+from cache_store import SQLiteCache
+
+
+def lens_result(lens: str, summary: str = None) -> dict:
+    """A lens answer with every field its prompt asks for."""
+    result = dict.fromkeys(llm_analyzer.LENS_REQUIRED_FIELDS[lens], "n/a")
+    if "opportunity_score" in result:
+        result["opportunity_score"] = 7
+    result["summary"] = summary or lens
+    return result
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    """Keep analyses out of the real analysis cache."""
+    monkeypatch.setattr(analysis_cache, "_cache", SQLiteCache(str(tmp_path / "analysis_cache.db"), table="analysis_cache"))
+
+
+class TestLensValidation:
+    """Test per-lens schema checks."""
+
+    def test_complete_lens_passes(self):
+        """A lens with every prompted field and a score in range should be accepted."""
+        assert llm_analyzer.lens_error("investment", lens_result("investment")) is None
+        assert llm_analyzer.lens_error("investment", {**lens_result("investment"), "opportunity_score": "8/10"}) is None
+
+    def test_score_out_of_range(self):
+        """Scores outside 1-10, including 0, should be rejected."""
+        for score in (0, 11, -3, "n/a"):
+            assert llm_analyzer.lens_error("investment", {**lens_result("investment"), "opportunity_score": score})
+
+    def test_missing_fields_are_named(self):
+        """A lens missing prompted fields should say which ones."""
+        result = lens_result("product")
+        del result["market_size"], result["recreatability"]
+
+        assert llm_analyzer.lens_error("product", result) == "missing recreatability, market_size"
+
+
+class TestAnalysisCache:
+    """Test that cached analyses are keyed by the model that produced them."""
+
+    GOOD = {lens: lens_result(lens) for lens in llm_analyzer.LENSES}
+
+    def _answer_with(self, monkeypatch, model, calls):
+        def call_llm(prompt, models=None):
+            calls.append(model)
+            models.add(model)
+            return json.dumps(self.GOOD)
+
+        monkeypatch.setattr(llm_analyzer, "call_llm", call_llm)
+
+    def test_cached_under_answering_model(self, monkeypatch):
+        """A fallback model's analysis should be stored under that model, not the primary."""
+        primary, fallback = llm_analyzer.route_models("analysis")[:2]
+        calls = []
+        self._answer_with(monkeypatch, fallback, calls)
+
+        llm_analyzer.analyze_video("transcript", "Title", None, None, mode="combined")
+        assert llm_analyzer.analyze_video("transcript", "Title", None, None, mode="combined") == self.GOOD
+
+        fields = dict(transcript="transcript", title="Title", description=None, hashtags=None, context=None)
+        version = llm_analyzer.ANALYSIS_PROMPT_VERSION
+        assert analysis_cache.get(llm_analyzer._cache_key(version, fields, fallback)) == self.GOOD
+        assert analysis_cache.get(llm_analyzer._cache_key(version, fields, primary)) is None
+        assert calls == [fallback]
+
+    def test_models_outside_the_route_are_not_served(self, monkeypatch):
+        """Entries from a model the route no longer uses should not be reused."""
+        calls = []
+        self._answer_with(monkeypatch, "retired/model", calls)
+
+        llm_analyzer.analyze_video("transcript", "Title", None, None, mode="combined")
+        llm_analyzer.analyze_video("transcript", "Title", None, None, mode="combined")
+
+        assert calls == ["retired/model", "retired/model"]
+
+
+class TestPerLensMode:
+    """Test the concurrent per-lens analysis mode."""
+
+    def test_only_failed_lenses_are_retried(self, monkeypatch):
+        """A lens that fails once should be re-sent without repeating the others."""
+        calls = []
+
+        async def complete_prompt(prompt, task, answered_by=None):
+            lens = next(l for l in llm_analyzer.LENSES if f"through the {l} lens" in prompt)
+            calls.append(lens)
+            await asyncio.sleep(0)
+            if lens == "content" and calls.count("content") == 1:
+                return "not json"
+            return json.dumps(lens_result(lens))
+
+        monkeypatch.setattr(llm_analyzer, "complete_prompt", complete_prompt)
+
+        analysis = llm_analyzer.analyze_video("transcript", "Title", None, None, mode="per_lens")
+
+        assert analysis == {lens: lens_result(lens) for lens in llm_analyzer.LENSES}
+        assert sorted(calls) == sorted([*llm_analyzer.LENSES, "content"])
+
+
+class TestLongTranscripts:
+    """Test the map-reduce path for long transcripts."""
+
+    @staticmethod
+    def _fake_llm(monkeypatch):
+        prompts = {"summaries": [], "analysis": []}
+
+        async def complete_prompt(prompt, task, answered_by=None):
+            prompts["summaries"].append(prompt)
+            return "condensed part"
+
+        def call_llm(prompt, models=None):
+            prompts["analysis"].append(prompt)
+            return json.dumps({lens: lens_result(lens) for lens in llm_analyzer.LENSES})
+
+        monkeypatch.setattr(llm_analyzer, "complete_prompt", complete_prompt)
+        monkeypatch.setattr(llm_analyzer, "call_llm", call_llm)
+        return prompts
+
+    def test_short_transcript_single_call(self, monkeypatch):
+        """Short transcripts should go straight into one analysis call."""
+        prompts = self._fake_llm(monkeypatch)
+
+        llm_analyzer.analyze_video("a short transcript", "Title", None, None)
+
+        assert prompts["summaries"] == []
+        assert "a short transcript" in prompts["analysis"][0]
+
+    def test_long_transcript_is_condensed(self, monkeypatch):
+        """Oversized transcripts should be summarised in chunks before analysis."""
+        monkeypatch.setattr(llm_analyzer.settings, "analysis_max_transcript_tokens", 100)
+        monkeypatch.setattr(llm_analyzer.settings, "analysis_chunk_tokens", 60)
+        monkeypatch.setattr(llm_analyzer.settings, "analysis_chunk_overlap_tokens", 5)
+        prompts = self._fake_llm(monkeypatch)
+        transcript = " ".join(f"Fact {i} matters." for i in range(100))
+
+        llm_analyzer.analyze_video(transcript, "Title", None, None)
+
+        assert len(prompts["summaries"]) > 1
+        assert len(prompts["analysis"]) == 1
+        assert "condensed part" in prompts["analysis"][0]
+        assert "Fact 99 matters" not in prompts["analysis"][0]
+
+
+class TestBatchAnalysis:
+    """Test packing several videos into one request."""
+
+    def test_batch_split_and_individual_retry(self, monkeypatch):
+        """Valid items come from the batch answer; invalid ones are retried alone."""
+        prompts = []
+        good = {lens: lens_result(lens) for lens in llm_analyzer.LENSES}
+
+        def call_llm(prompt, models=None):
+            prompts.append(prompt)
+            if "[VIDEO video_1]" in prompt:
+                # video_2 comes back unusable
+                return json.dumps({"video_1": good, "video_2": "n/a", "video_3": good})
+            return json.dumps(good)
+
+        monkeypatch.setattr(llm_analyzer, "call_llm", call_llm)
+        videos = {
+            10: {"title": "one", "transcript": "a"},
+            11: {"title": "two", "transcript": "b"},
+            12: {"title": "three", "transcript": "c"},
+        }
+
+        results = llm_analyzer.analyze_videos_batch(videos)
+
+        assert set(results) == {10, 11, 12}
+        assert all(result == good for result in results.values())
+        assert len(prompts) == 2
+        assert "Title: two" in prompts[1] and "[VIDEO" not in prompts[1]
+
+    def test_partly_valid_item_rerequests_broken_lenses(self, monkeypatch):
+        """A batch item with some valid lenses should only re-request the rest."""
+        requested = []
+
+        async def analyze_lens_async(lens, content, models=None):
+            requested.append(lens)
+            return lens_result(lens)
+
+        monkeypatch.setattr(llm_analyzer, "call_llm", lambda prompt, models=None: json.dumps({
+            "video_1": {"investment": lens_result("investment", "kept"), "product": {"summary": ""}},
+            "video_2": {lens: lens_result(lens) for lens in llm_analyzer.LENSES},
+        }))
+        monkeypatch.setattr(llm_analyzer, "analyze_lens_async", analyze_lens_async)
+
+        results = llm_analyzer.analyze_videos_batch({1: {"title": "one"}, 2: {"title": "two"}})
+
+        assert results[1]["investment"] == lens_result("investment", "kept")
+        assert results[1]["product"] == lens_result("product")
+        assert sorted(requested) == ["content", "knowledge", "product"]
+
+    def test_large_videos_are_not_batched(self, monkeypatch):
+        """Videos over the per-item budget should get their own request."""
+        monkeypatch.setattr(llm_analyzer.settings, "analysis_batch_item_tokens", 10)
+        prompts = []
+
+        def call_llm(prompt, models=None):
+            prompts.append(prompt)
+            return json.dumps({lens: lens_result(lens) for lens in llm_analyzer.LENSES})
+
+        monkeypatch.setattr(llm_analyzer, "call_llm", call_llm)
+
+        llm_analyzer.analyze_videos_batch({1: {"transcript": "long " * 50}, 2: {"transcript": "also long " * 50}})
+
+        assert len(prompts) == 2
+        assert not any("[VIDEO" in prompt for prompt in prompts)
@@ -0,0 +1,129 @@
+"""Tests for the async OpenRouter client."""
+import asyncio
+
+import httpx
+import pytest
+
+import llm_client
+import rate_limiter
+from llm_client import LLMError
+
+
+def ok(text="hi"):
+    return httpx.Response(200, json={"choices": [{"message": {"content": text}}]})
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Route OpenRouter calls to a scripted handler with instant backoff."""
+    state = {"handler": lambda request: ok(), "calls": 0}
+
+    async def handler(request):
+        state["calls"] += 1
+        result = state["handler"](request)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    def client(name):
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    monkeypatch.setattr(llm_client, "get_async_client", client)
+    monkeypatch.setattr(llm_client, "backoff_delay", lambda attempt, retry_after=None: 0)
+    monkeypatch.setattr(rate_limiter, "_store", rate_limiter.MemoryBucketStore())
+    monkeypatch.setattr(llm_client.settings, "llm_hedge_after", 0)
+    return state
+
+
+class TestRetries:
+    """Test retry and error handling."""
+
+    def test_retries_server_errors(self, transport):
+        """5xx and 429 responses should be retried until one succeeds."""
+        responses = iter([httpx.Response(503), httpx.Response(429, headers={"retry-after": "0"}), ok("done")])
+        transport["handler"] = lambda request: next(responses)
+
+        assert asyncio.run(llm_client.complete_prompt("prompt")) == "done"
+        assert transport["calls"] == 3
+
+    def test_gives_up_after_max_attempts(self, transport):
+        """Persistent failures should raise LLMError with the last status."""
+        transport["handler"] = lambda request: httpx.Response(500)
+
+        with pytest.raises(LLMError) as exc:
+            asyncio.run(llm_client.complete_prompt("prompt", max_attempts=2))
+
+        assert exc.value.status_code == 500
+        assert transport["calls"] == 2
+
+    def test_client_errors_are_not_retried(self, transport):
+        """A 4xx other than 408/429 should fail immediately."""
+        transport["handler"] = lambda request: httpx.Response(401)
+
+        with pytest.raises(LLMError):
+            asyncio.run(llm_client.complete_prompt("prompt"))
+        assert transport["calls"] == 1
+
+    def test_backoff_honours_retry_after(self):
+        """Retry-After should be a floor under the jittered delay."""
+        assert llm_client.backoff_delay(0, retry_after=3.0) >= 3.0
+        assert llm_client.backoff_delay(10) <= llm_client.MAX_BACKOFF
+
+
+class TestHedging:
+    """Test request hedging."""
+
+    def test_slow_request_is_hedged(self, transport, monkeypatch):
+        """A duplicate request should win when the first one stalls."""
+        monkeypatch.setattr(llm_client.settings, "llm_hedge_after", 0.05)
+
+        async def handler(request):
+            if transport["calls"] == 1:
+                await asyncio.sleep(5)
+            return ok("hedged")
+
+        transport["handler"] = handler
+
+        assert asyncio.run(llm_client.complete_prompt("prompt", timeout=10)) == "hedged"
+        assert transport["calls"] == 2
+
+
+class TestAnalysisFailure:
+    """Test detection of fully failed analyses."""
+
+    def test_all_lenses_errored(self):
+        """Only an analysis where every lens errored counts as failed."""
+        from llm_analyzer import LENSES, analysis_failed
+
+        assert analysis_failed({lens: {"error": "boom"} for lens in LENSES})
+        assert not analysis_failed({**{lens: {"error": "boom"} for lens in LENSES}, "content": {"summary": "ok"}})
+
+
+class TestStreaming:
+    """Test relaying OpenRouter's token stream."""
+
+    def test_stream_yields_deltas(self, transport):
+        """Content deltas should be yielded in order, ignoring comments."""
+        body = (
+            ": OPENROUTER PROCESSING\n\n"
+            'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+            'data: {"choices": [{"delta": {"content": "lo"}}]}\n\n'
+            "data: [DONE]\n\n"
+        )
+        transport["handler"] = lambda request: httpx.Response(200, text=body)
+
+        async def collect():
+            return [text async for text in llm_client.stream([{"role": "user", "content": "prompt"}])]
+
+        assert asyncio.run(collect()) == ["Hel", "lo"]
+
+    def test_stream_retries_before_first_token(self, transport):
+        """A 503 before any text should be retried."""
+        responses = iter([httpx.Response(503), httpx.Response(200, text='data: {"choices": [{"delta": {"content": "ok"}}]}\n\n')])
+        transport["handler"] = lambda request: next(responses)
+
+        async def collect():
+            return [text async for text in llm_client.stream([{"role": "user", "content": "prompt"}])]
+
+        assert asyncio.run(collect()) == ["ok"]
+        assert transport["calls"] == 2
@@ -0,0 +1,131 @@
+"""Tests for per-call LLM model routing and usage accounting."""
+import pytest
+
+import llm_client
+import model_router
+import provider_health
+from llm_client import LLMError
+
+FAST, FALLBACK = model_router.ROUTES["analysis"]
+STRONG = model_router.ROUTES["analysis_long"][0]
+
+
+@pytest.fixture(autouse=True)
+def health_backend(monkeypatch):
+    """Track model health in-process and fresh for every test."""
+    backend = provider_health.MemoryBackend()
+    monkeypatch.setattr(provider_health, "_backend", backend)
+    return backend
+
+
+class TestChooseModels:
+    """Test candidate ordering."""
+
+    def test_input_size_picks_route(self):
+        """Short inputs should go to the cheap model, long ones to the stronger one."""
+        threshold = model_router.settings.llm_strong_model_min_tokens
+
+        assert model_router.choose_models("analysis", 200)[0] == FAST
+        assert model_router.choose_models("analysis", threshold)[0] == STRONG
+        assert model_router.choose_models("chat", threshold)[0] == model_router.ROUTES["chat"][0]
+
+    def test_tripped_model_is_skipped(self):
+        """A model with an open circuit should not be offered."""
+        for _ in range(provider_health.MIN_SAMPLES):
+            provider_health.record_result(f"llm:{FAST}", False, 1.0)
+
+        assert model_router.choose_models("analysis", 200) == [FALLBACK]
+
+    def test_fallback_probe_slot_not_taken_up_front(self, health_backend):
+        """Choosing models should leave a half-open fallback's probe slot free."""
+        health_backend.set_state(f"llm:{FALLBACK}", provider_health.OPEN, 0.0)
+
+        assert model_router.choose_models("analysis", 200) == [FAST, FALLBACK]
+        assert provider_health.allow_request(f"llm:{FALLBACK}")
+
+    def test_model_over_slo_moves_behind(self):
+        """A model whose p95 latency breaks the SLO should become the fallback."""
+        slow = model_router.settings.llm_latency_slo_analysis + 5
+        for _ in range(provider_health.MIN_SAMPLES):
+            provider_health.record_result(f"llm:{FAST}", True, slow)
+
+        assert model_router.choose_models("analysis", 200) == [FALLBACK, FAST]
+
+
+class TestRoutedCalls:
+    """Test fallback and accounting."""
+
+    def test_falls_back_and_records_usage(self, monkeypatch, test_db):
+        """A failing primary should fall back, and both calls should be recorded."""
+        from database import LLMCall
+
+        async def complete(messages, model, usage, **kwargs):
+            if model == FAST:
+                raise LLMError("OpenRouter error 503", 503)
+            usage.update({"prompt_tokens": 100, "completion_tokens": 20, "cost": 0.0042})
+            return "answer"
+
+        monkeypatch.setattr(llm_client, "complete", complete)
+
+        assert model_router.complete_sync("prompt", task="analysis") == "answer"
+
+        calls = {call.model: call for call in test_db.query(LLMCall).all()}
+        assert not calls[FAST].ok
+        assert calls[FALLBACK].ok and calls[FALLBACK].cost_usd == 0.0042
+        assert calls[FALLBACK].prompt_tokens == 100
+        assert provider_health.get_stats(f"llm:{FAST}")["success_rate"] == 0
+
+        usage = model_router.get_usage(test_db)
+        assert {row["model"]: row["failures"] for row in usage["calls"]} == {FAST: 1, FALLBACK: 0}
+
+    def test_bad_request_does_not_trip_the_model(self, monkeypatch, test_db):
+        """A 400 blames the request, not the model, so its circuit should stay closed."""
+        async def complete(messages, model, usage, **kwargs):
+            raise LLMError("OpenRouter error 400", 400)
+
+        monkeypatch.setattr(llm_client, "complete", complete)
+
+        for _ in range(provider_health.MIN_SAMPLES):
+            with pytest.raises(LLMError):
+                model_router.complete_sync("prompt", task="analysis")
+
+        assert provider_health.get_stats(f"llm:{FAST}")["state"] == provider_health.CLOSED
+        assert model_router.choose_models("analysis", 200)[0] == FAST
+
+    def test_cost_estimated_without_provider_cost(self, monkeypatch, test_db):
+        """List prices should be used when the provider reports tokens only."""
+        from database import LLMCall
+
+        async def complete(messages, model, usage, **kwargs):
+            usage.update({"prompt_tokens": 1_000_000, "completion_tokens": 0})
+            return "ok"
+
+        monkeypatch.setattr(llm_client, "complete", complete)
+
+        model_router.complete_sync("prompt", task="chat")
+
+        call = test_db.query(LLMCall).one()
+        assert call.cost_usd == pytest.approx(model_router.MODELS[call.model].input_price)
+
+    def test_accounting_runs_off_the_event_loop(self, monkeypatch, test_db):
+        """The health update and usage insert should not block the loop serving the call."""
+        import threading
+
+        threads = []
+        record_result = provider_health.record_result
+
+        def tracked(*args):
+            threads.append(threading.current_thread())
+            record_result(*args)
+
+        async def complete(messages, model, usage, **kwargs):
+            threads.append(threading.current_thread())
+            return "ok"
+
+        monkeypatch.setattr(llm_client, "complete", complete)
+        monkeypatch.setattr(provider_health, "record_result", tracked)
+
+        model_router.complete_sync("prompt", task="chat")
+
+        loop_thread, health_thread = threads
+        assert health_thread is not loop_thread
@@ -0,0 +1,82 @@
+"""Tests for near-duplicate transcript detection."""
+import near_duplicates
+from database import Video
+
+TRANSCRIPT = (
+    "so today I want to show you the three tools I use every single day to run my small online "
+    "business without hiring anyone, the first one is a scheduling app that posts for me, the second "
+    "one is an AI writing assistant and the third one is a simple spreadsheet that tracks every order"
+)
+
+
+def _video(db, transcript, status="completed"):
+    video = Video(tiktok_url="https://www.tiktok.com/@a/video/1", transcript=transcript, status=status)
+    db.add(video)
+    db.commit()
+    return video
+
+
+class TestSignatures:
+    """Test MinHash similarity estimates."""
+
+    def test_repost_is_similar(self):
+        """A re-upload with a reworded ending should score above the threshold."""
+        repost = TRANSCRIPT.replace("tracks every order", "tracks all of my orders")
+
+        score = near_duplicates.similarity(near_duplicates.signature(TRANSCRIPT), near_duplicates.signature(repost))
+
+        assert score >= near_duplicates.settings.near_duplicate_threshold
+
+    def test_unrelated_and_short_transcripts(self):
+        """Different text should score low, and very short text isn't compared."""
+        other = " ".join(reversed(TRANSCRIPT.split()))
+
+        score = near_duplicates.similarity(near_duplicates.signature(TRANSCRIPT), near_duplicates.signature(other))
+
+        assert score < 0.2
+        assert near_duplicates.signature("follow for part two") is None
+
+
+class TestIndex:
+    """Test LSH lookups against stored videos."""
+
+    def test_finds_indexed_original(self, test_db):
+        """A new video should match an indexed completed one, but not itself."""
+        original = _video(test_db, TRANSCRIPT)
+        assert near_duplicates.find_match(test_db, original) is None
+        near_duplicates.index_video(test_db, original)
+        test_db.commit()
+
+        repost = _video(test_db, TRANSCRIPT + " thanks for watching", status="processing")
+        match, score = near_duplicates.find_match(test_db, repost)
+
+        assert match.id == original.id
+        assert score >= near_duplicates.settings.near_duplicate_threshold
+        assert repost.transcript_minhash is not None
+
+    def test_unfinished_videos_are_not_matched(self, test_db):
+        """Only completed videos should be offered as a source."""
+        original = _video(test_db, TRANSCRIPT)
+        near_duplicates.find_match(test_db, original)
+        near_duplicates.index_video(test_db, original)
+        original.status = "failed"
+        test_db.commit()
+
+        assert near_duplicates.find_match(test_db, _video(test_db, TRANSCRIPT, status="processing")) is None
+
+    def test_closest_candidates_survive_the_limit(self, test_db, monkeypatch):
+        """When a common band brings in too many candidates, the ones sharing most bands are kept."""
+        from database import TranscriptBand
+
+        monkeypatch.setattr(near_duplicates, "MAX_CANDIDATES", 1)
+        keys = near_duplicates.band_hashes(near_duplicates.signature(TRANSCRIPT))
+        decoy = _video(test_db, "a different video")
+        test_db.add(TranscriptBand(band_hash=min(keys), video_id=decoy.id))
+        original = _video(test_db, TRANSCRIPT)
+        near_duplicates.find_match(test_db, original)
+        near_duplicates.index_video(test_db, original)
+        test_db.commit()
+
+        match, _ = near_duplicates.find_match(test_db, _video(test_db, TRANSCRIPT, status="processing"))
+
+        assert match.id == original.id
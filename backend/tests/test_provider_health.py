@@ -0,0 +1,115 @@
+"""Tests for provider health tracking and circuit breakers."""
+import pytest
+
+import provider_health
+from provider_health import CLOSED, HALF_OPEN, OPEN, MIN_SAMPLES
+
+
+@pytest.fixture(autouse=True)
+def backend(monkeypatch):
+    """Use a fresh in-process backend for every test."""
+    backend = provider_health.MemoryBackend()
+    monkeypatch.setattr(provider_health, "_backend", backend)
+    return backend
+
+
+class TestCircuitBreaker:
+    """Test circuit state transitions."""
+
+    def test_circuit_opens_after_repeated_failures(self):
+        """A mostly failing provider should be tripped."""
+        for _ in range(MIN_SAMPLES):
+            provider_health.record_result("ytdlp", False, 10.0)
+
+        assert provider_health.get_stats("ytdlp")["state"] == OPEN
+        assert not provider_health.allow_request("ytdlp")
+
+    def test_few_failures_do_not_trip(self):
+        """Circuits should stay closed until there are enough samples."""
+        provider_health.record_result("ytdlp", False, 10.0)
+
+        assert provider_health.get_stats("ytdlp")["state"] == CLOSED
+        assert provider_health.allow_request("ytdlp")
+
+    def test_half_open_allows_single_probe(self, backend, monkeypatch):
+        """After the cooldown exactly one probe should be let through."""
+        backend.set_state("ytdlp", OPEN, 0.0)
+
+        assert provider_health.allow_request("ytdlp")
+        assert provider_health.get_stats("ytdlp")["state"] == HALF_OPEN
+        assert not provider_health.allow_request("ytdlp")
+
+    def test_released_probe_frees_slot(self, backend):
+        """A cancelled probe should let the next caller probe straight away."""
+        backend.set_state("ytdlp", OPEN, 0.0)
+        assert provider_health.allow_request("ytdlp")
+
+        provider_health.release_probe("ytdlp")
+
+        assert provider_health.allow_request("ytdlp")
+
+    def test_successful_probe_closes_circuit(self, backend):
+        """A successful half-open probe should close the circuit."""
+        backend.set_state("ytdlp", HALF_OPEN, 0.0)
+        provider_health.record_result("ytdlp", True, 1.0)
+
+        assert provider_health.get_stats("ytdlp")["state"] == CLOSED
+
+    def test_failed_probe_reopens_circuit(self, backend):
+        """A failed half-open probe should re-open the circuit."""
+        backend.set_state("ytdlp", HALF_OPEN, 0.0)
+        provider_health.record_result("ytdlp", False, 1.0)
+
+        assert provider_health.get_stats("ytdlp")["state"] == OPEN
+
+
+class TestOrderProviders:
+    """Test adaptive provider ordering."""
+
+    VALUES = {"scraptik": 1.0, "ytdlp": 1.0, "oembed": 0.4}
+
+    def test_static_order_without_data(self):
+        """Without samples the static priority should be kept."""
+        assert provider_health.order_providers(self.VALUES) == ["scraptik", "ytdlp", "oembed"]
+
+    def test_measured_providers_sorted_by_yield(self):
+        """Faster, more reliable providers should move up within their tier."""
+        for _ in range(MIN_SAMPLES):
+            provider_health.record_result("scraptik", True, 20.0)
+            provider_health.record_result("ytdlp", True, 2.0)
+
+        assert provider_health.order_providers(self.VALUES) == ["ytdlp", "scraptik", "oembed"]
+
+    def test_fast_thin_provider_stays_behind_richer_ones(self):
+        """A fast low-value provider should never overtake healthy richer ones."""
+        for _ in range(MIN_SAMPLES + 1):
+            provider_health.record_result("scraptik", True, 1.5)
+            provider_health.record_result("oembed", True, 0.4)
+
+        assert provider_health.order_providers(self.VALUES) == ["scraptik", "ytdlp", "oembed"]
+
+    def test_skipped_providers_do_not_take_probe_slot(self, backend):
+        """Skipped providers should be left out without checking their circuit."""
+        backend.set_state("scraptik", OPEN, 0.0)
+
+        assert provider_health.order_providers(self.VALUES, skip={"scraptik"}) == ["ytdlp", "oembed"]
+        assert provider_health.get_stats("scraptik")["state"] == OPEN
+        assert provider_health.allow_request("scraptik")
+
+    def test_all_open_falls_back_to_static_order(self, backend):
+        """The chain should never be empty."""
+        for name in self.VALUES:
+            backend.set_state(name, OPEN, 9e18)
+
+        assert provider_health.order_providers(self.VALUES) == list(self.VALUES)
+
+    def test_stats(self):
+        """Stats should report success rate and latency percentiles."""
+        for latency in (1.0, 2.0, 3.0, 4.0):
+            provider_health.record_result("oembed", True, latency)
+        provider_health.record_result("oembed", False, 10.0)
+
+        stats = provider_health.get_stats("oembed")
+        assert stats["success_rate"] == 0.8
+        assert stats["p50_latency"] == 3.0
+        assert stats["p95_latency"] == 10.0
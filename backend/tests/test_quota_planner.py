@@ -0,0 +1,81 @@
+"""Tests for quota pacing."""
+from datetime import date
+
+import pytest
+
+import quota_planner
+import quota_tracker
+from quota_tracker import SQLiteQuotaStore
+
+# 31-day month; day 10 leaves 22 days including today
+TODAY = date(2026, 10, 10)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Fresh quota store with the clock pinned to TODAY."""
+    store = SQLiteQuotaStore(tmp_path / "quota.db")
+    monkeypatch.setattr(quota_tracker, "_store", store)
+    monkeypatch.setattr(quota_tracker, "get_current_day", lambda: TODAY.isoformat())
+    monkeypatch.setitem(quota_tracker.PROVIDER_LIMITS, "scraptik", 100)
+    return store
+
+
+def spend(store, n, day=TODAY):
+    """Record n used units on the given day."""
+    quota_tracker.get_current_day = lambda: day.isoformat()
+    for _ in range(n):
+        store.increment("scraptik", day.strftime("%Y-%m"))
+    quota_tracker.get_current_day = lambda: TODAY.isoformat()
+
+
+class TestBudgetStatus:
+    """Test the pacing figures."""
+
+    def test_daily_budget_spreads_backfill_share(self, store):
+        """Backfill gets the non-reserved share spread over the days left."""
+        spend(store, 26, date(2026, 10, 5))
+
+        status = quota_planner.get_budget_status("scraptik", TODAY)
+
+        assert status["backfill_limit"] == 70
+        assert status["days_left"] == 22
+        assert status["daily_backfill_budget"] == 2.0
+
+    def test_projected_exhaustion(self, store):
+        """Exhaustion is projected from the month-to-date pace."""
+        spend(store, 50, date(2026, 10, 3))
+
+        status = quota_planner.get_budget_status("scraptik", TODAY)
+
+        assert status["daily_rate"] == 5.0
+        assert status["projected_exhaustion"] == "2026-10-20"
+
+    def test_no_exhaustion_within_month(self, store):
+        """A slow pace should not report an exhaustion date."""
+        spend(store, 5, date(2026, 10, 3))
+
+        assert quota_planner.get_budget_status("scraptik", TODAY)["projected_exhaustion"] is None
+
+
+class TestShouldSpend:
+    """Test interactive vs backfill decisions."""
+
+    def test_backfill_stops_at_daily_pace(self, store):
+        """Backfill falls back once today's share is used; interactive does not."""
+        spend(store, 26, date(2026, 10, 5))
+        spend(store, 2)
+
+        assert not quota_planner.should_spend("scraptik", quota_planner.PRIORITY_BACKFILL, TODAY)
+        assert quota_planner.should_spend("scraptik", quota_planner.PRIORITY_INTERACTIVE, TODAY)
+
+    def test_reserve_is_kept_for_interactive(self, store):
+        """Backfill may not touch the interactive reserve."""
+        spend(store, 70, date(2026, 10, 5))
+
+        assert not quota_planner.should_spend("scraptik", quota_planner.PRIORITY_BACKFILL, TODAY)
+        assert quota_planner.should_spend("scraptik", quota_planner.PRIORITY_INTERACTIVE, TODAY)
+
+    def test_unlimited_provider(self, store):
+        """Providers without a monthly limit are always allowed."""
+        assert quota_planner.should_spend("oembed", quota_planner.PRIORITY_BACKFILL, TODAY)
@@ -0,0 +1,92 @@
+"""Tests for the quota store."""
+import json
+import threading
+
+import pytest
+
+import quota_tracker
+from quota_tracker import SQLiteQuotaStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Use a fresh SQLite quota store for every test."""
+    store = SQLiteQuotaStore(tmp_path / "quota.db")
+    monkeypatch.setattr(quota_tracker, "_store", store)
+    return store
+
+
+class TestQuotaStore:
+    """Test counters and reservations."""
+
+    def test_increment_and_check(self, store):
+        """Increments should be reflected in check_quota."""
+        assert quota_tracker.check_quota("scraptik", 2) == (True, 0, 2)
+        assert quota_tracker.increment_quota("scraptik", 2) == (1, 2)
+        assert quota_tracker.increment_quota("scraptik", 2) == (2, 2)
+        assert quota_tracker.check_quota("scraptik", 2) == (False, 2, 2)
+
+    def test_reservations_cannot_overshoot(self, store):
+        """Outstanding reservations should count against the limit."""
+        first = quota_tracker.reserve_quota("scraptik", 2)
+        second = quota_tracker.reserve_quota("scraptik", 2)
+
+        assert first and second
+        assert quota_tracker.reserve_quota("scraptik", 2) is None
+
+        first.release()
+        assert quota_tracker.reserve_quota("scraptik", 2) is not None
+
+    def test_commit_counts_usage_once(self, store):
+        """Committing should move the unit to used; release after commit is a no-op."""
+        reservation = quota_tracker.reserve_quota("scraptik", 5)
+
+        assert reservation.commit() == (1, 5)
+        reservation.release()
+        assert quota_tracker.check_quota("scraptik", 5) == (True, 1, 5)
+
+    def test_expired_reservations_are_reclaimed(self, store, monkeypatch):
+        """A reservation from a crashed worker should expire."""
+        monkeypatch.setattr(quota_tracker, "RESERVATION_TTL", -1)
+        quota_tracker.reserve_quota("scraptik", 1)
+
+        assert quota_tracker.reserve_quota("scraptik", 1) is not None
+
+    def test_months_are_separate(self, store, monkeypatch):
+        """A new month should start from zero."""
+        quota_tracker.increment_quota("scraptik", 5)
+        monkeypatch.setattr(quota_tracker, "get_current_month", lambda: "2099-01")
+
+        assert quota_tracker.check_quota("scraptik", 5) == (True, 0, 5)
+
+    def test_concurrent_reservations(self, store):
+        """Threads racing for quota should never exceed the limit."""
+        granted = []
+
+        def worker():
+            for _ in range(10):
+                reservation = quota_tracker.reserve_quota("scraptik", 7)
+                if reservation:
+                    reservation.commit()
+                    granted.append(1)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(granted) == 7
+        assert quota_tracker.check_quota("scraptik", 7) == (False, 7, 7)
+
+    def test_legacy_json_import(self, store, tmp_path, monkeypatch):
+        """Counts from api_quota.json should seed the store once."""
+        legacy = tmp_path / "api_quota.json"
+        month = quota_tracker.get_current_month()
+        legacy.write_text(json.dumps({"scraptik": {"month": month, "used": 12, "limit": 50}}))
+        monkeypatch.setattr(quota_tracker, "QUOTA_FILE", legacy)
+
+        quota_tracker.import_legacy_quota(store)
+        quota_tracker.import_legacy_quota(store)
+
+        assert quota_tracker.check_quota("scraptik", 50) == (True, 12, 50)
@@ -0,0 +1,120 @@
+"""Tests for the provider rate limiter."""
+import asyncio
+
+import httpx
+import pytest
+
+import rate_limiter
+from rate_limiter import MemoryBucketStore
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    """Use fresh in-process buckets with a fast test limit."""
+    store = MemoryBucketStore()
+    monkeypatch.setattr(rate_limiter, "_store", store)
+    monkeypatch.setitem(rate_limiter.RATE_LIMITS, "test", (50.0, 2))
+    return store
+
+
+class TestTokenBucket:
+    """Test token bucket behaviour."""
+
+    def test_burst_then_wait(self, store):
+        """The bucket should allow a burst and then ask callers to wait."""
+        assert store.take("test", 50.0, 2) == 0
+        assert store.take("test", 50.0, 2) == 0
+        assert store.take("test", 50.0, 2) > 0
+
+    def test_acquire_waits_for_token(self):
+        """acquire should sleep until a token is available instead of failing."""
+
+        async def run():
+            return [await rate_limiter.acquire("test") for _ in range(4)]
+
+        waits = asyncio.run(run())
+
+        assert waits[0] < 0.01
+        assert sum(waits) > 0.01
+
+    def test_unlimited_provider(self):
+        """Providers without a limit should never wait or record metrics."""
+        assert asyncio.run(rate_limiter.acquire("oembed")) < 0.01
+        assert "oembed" not in rate_limiter.get_metrics()
+
+    def test_penalize_blocks_provider(self, store):
+        """A 429 should block the bucket for the Retry-After period."""
+        rate_limiter.penalize("test", 0.05)
+
+        assert store.take("test", 50.0, 2) > 0
+        assert asyncio.run(rate_limiter.acquire("test")) >= 0.04
+
+    def test_metrics(self):
+        """Metrics should count acquisitions and waits."""
+        for _ in range(3):
+            asyncio.run(rate_limiter.acquire("test"))
+
+        metrics = rate_limiter.get_metrics()["test"]
+        assert metrics["acquired"] == 3
+        assert metrics["waited"] == 1
+        assert metrics["max_wait"] > 0
+
+    def test_retry_after_parsing(self):
+        """Retry-After seconds should be honoured, with a default otherwise."""
+        assert rate_limiter.retry_after_seconds(httpx.Headers({"retry-after": "3"})) == 3.0
+        assert rate_limiter.retry_after_seconds(httpx.Headers({})) == rate_limiter.DEFAULT_RETRY_AFTER
+
+
+class TestRateLimitedGet:
+    """Test 429 handling in the scraper."""
+
+    def test_429_is_retried(self, monkeypatch):
+        """A 429 should pause the provider and retry once."""
+        import scraper
+
+        responses = iter([httpx.Response(429, headers={"retry-after": "0.01"}), httpx.Response(200)])
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: next(responses)))
+        monkeypatch.setattr(scraper, "get_async_client", lambda name: client)
+
+        response = asyncio.run(scraper.rate_limited_get("test", "https://example.com"))
+
+        assert response.status_code == 200
+
+    @staticmethod
+    def _hanging_client(sends: bool) -> httpx.AsyncClient:
+        """A client whose request hangs, after (or before) reporting the headers as sent."""
+        class Transport(httpx.AsyncBaseTransport):
+            async def handle_async_request(self, request):
+                trace = request.extensions.get("trace")
+                if sends and trace:
+                    await trace("http11.send_request_headers.started", {})
+                await asyncio.sleep(10)
+
+        return httpx.AsyncClient(transport=Transport())
+
+    def _cancel_mid_request(self, monkeypatch, tmp_path, sends: bool):
+        import quota_tracker
+        import scraper
+
+        monkeypatch.setattr(quota_tracker, "_store", quota_tracker.SQLiteQuotaStore(tmp_path / "quota.db"))
+        monkeypatch.setattr(scraper, "get_async_client", lambda name: self._hanging_client(sends))
+        reservation = quota_tracker.reserve_quota("scraptik", 5)
+
+        async def race():
+            task = asyncio.create_task(scraper.rate_limited_get("test", "https://example.com", reservation=reservation))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            reservation.release()
+
+        asyncio.run(race())
+        return quota_tracker.check_quota("scraptik", 5)
+
+    def test_sent_request_keeps_its_quota_when_cancelled(self, monkeypatch, tmp_path):
+        """A request already on the wire is billed, so cancelling it should not release the unit."""
+        assert self._cancel_mid_request(monkeypatch, tmp_path, sends=True) == (True, 1, 5)
+
+    def test_unsent_request_releases_its_quota(self, monkeypatch, tmp_path):
+        """A request cancelled before it was sent should hand the unit back."""
+        assert self._cancel_mid_request(monkeypatch, tmp_path, sends=False) == (True, 0, 5)
@@ -1,8 +1,39 @@
-"""Tests for TikTok URL validation."""
+"""Tests for TikTok URL validation and scraping."""
 import pytest
 from scraper import validate_tiktok_url
 
 
+@pytest.fixture(autouse=True)
+def scrape_cache_db(tmp_path, monkeypatch):
+    """Give every test its own empty scrape cache."""
+    import scrape_cache
+    from cache_store import SQLiteCache
+
+    cache = SQLiteCache(str(tmp_path / "scrape_cache.db"), table="scrape_cache")
+    monkeypatch.setattr(scrape_cache, "_cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def provider_health_backend(monkeypatch):
+    """Track provider health in-process and fresh for every test."""
+    import provider_health
+
+    backend = provider_health.MemoryBackend()
+    monkeypatch.setattr(provider_health, "_backend", backend)
+    return backend
+
+
+@pytest.fixture(autouse=True)
+def quota_store(tmp_path, monkeypatch):
+    """Keep quota usage out of the real api_quota.db."""
+    import quota_tracker
+
+    store = quota_tracker.SQLiteQuotaStore(tmp_path / "quota.db")
+    monkeypatch.setattr(quota_tracker, "_store", store)
+    return store
+
+
 class TestUrlValidation:
     """Test TikTok URL validation."""
 
@@ -32,3 +63,381 @@ class TestUrlValidation:
         """TikTok non-video pages should be invalid."""
         assert not validate_tiktok_url("https://tiktok.com/@user")
         assert not validate_tiktok_url("https://tiktok.com/explore")
+
+
+class TestConcurrentScrape:
+    """Test the async scrape engine."""
+
+    def test_fallbacks_wait_for_higher_priority_failure(self, monkeypatch):
+        """ScrapTik answering quickly should leave yt-dlp and oEmbed uncalled."""
+        import scraper
+
+        calls = []
+
+        async def scraptik(url):
+            return {"title": "ScrapTik title", "creator": "user", "view_count": 10}
+
+        def ytdlp(url):
+            calls.append("ytdlp")
+            return {}
+
+        async def oembed(url):
+            calls.append("oembed")
+            return {}
+
+        async def transcript(url):
+            return "hello"
+
+        monkeypatch.setattr(scraper, "get_metadata_scraptik", scraptik)
+        monkeypatch.setattr(scraper, "get_metadata_ytdlp", ytdlp)
+        monkeypatch.setattr(scraper, "get_metadata_oembed", oembed)
+        monkeypatch.setattr(scraper, "get_transcript_supadata", transcript)
+
+        result = scraper.scrape_tiktok("https://www.tiktok.com/@user/video/123")
+
+        assert result["title"] == "ScrapTik title"
+        assert result["view_count"] == 10
+        assert result["transcript"] == "hello"
+        assert calls == []
+
+    def test_slow_provider_is_hedged(self, monkeypatch):
+        """A fallback should start once the current provider runs past the hedge delay."""
+        import asyncio
+        import scraper
+
+        events = []
+
+        async def scraptik(url):
+            await asyncio.sleep(0.2)
+            events.append("scraptik failed")
+            return {}
+
+        def ytdlp(url):
+            events.append("ytdlp started")
+            return {"title": "yt-dlp title", "creator": "user"}
+
+        async def oembed(url):
+            events.append("oembed started")
+            return {}
+
+        async def transcript(url):
+            return None
+
+        monkeypatch.setattr(scraper.settings, "metadata_hedge_after", 0.01)
+        monkeypatch.setattr(scraper, "get_metadata_scraptik", scraptik)
+        monkeypatch.setattr(scraper, "get_metadata_ytdlp", ytdlp)
+        monkeypatch.setattr(scraper, "get_metadata_oembed", oembed)
+        monkeypatch.setattr(scraper, "get_transcript_supadata", transcript)
+
+        result = scraper.scrape_tiktok("https://www.tiktok.com/@user/video/124")
+
+        assert result["title"] == "yt-dlp title"
+        assert events[:2] == ["ytdlp started", "scraptik failed"]
+        assert "oembed started" not in events
+
+    def test_falls_back_to_url_parsing(self, monkeypatch):
+        """Creator should come from the URL when every provider fails."""
+        import scraper
+
+        async def empty(url):
+            return {}
+
+        monkeypatch.setattr(scraper, "get_metadata_scraptik", empty)
+        monkeypatch.setattr(scraper, "get_metadata_ytdlp", lambda url: {})
+        monkeypatch.setattr(scraper, "get_metadata_oembed", empty)
+        monkeypatch.setattr(scraper, "get_transcript_supadata", empty)
+
+        result = scraper.scrape_tiktok("https://www.tiktok.com/@someone/video/123")
+
+        assert result["creator"] == "someone"
+        assert result["title"] == "TikTok by @someone"
+        assert result["hashtags"] == []
+
+
+class TestScrapeCache:
+    """Test the scrape result cache in front of the provider chain."""
+
+    @staticmethod
+    def _patch_providers(monkeypatch, calls):
+        import scraper
+
+        async def scraptik(url):
+            calls.append("scraptik")
+            return {"title": "Title", "creator": "user", "view_count": len(calls)}
+
+        async def transcript(url):
+            calls.append("supadata")
+            return "hello"
+
+        async def oembed(url):
+            calls.append("oembed")
+            return {"title": "Title", "creator": "user"}
+
+        monkeypatch.setattr(scraper, "get_metadata_scraptik", scraptik)
+        monkeypatch.setattr(scraper, "get_metadata_ytdlp", lambda url: {})
+        monkeypatch.setattr(scraper, "get_metadata_oembed", oembed)
+        monkeypatch.setattr(scraper, "get_transcript_supadata", transcript)
+
+    def test_repeat_scrape_is_served_from_cache(self, monkeypatch):
+        """A second scrape of the same video should not call any provider."""
+        import scraper
+
+        calls = []
+        self._patch_providers(monkeypatch, calls)
+        url = "https://www.tiktok.com/@user/video/42"
+
+        first = scraper.scrape_tiktok(url)
+        second = scraper.scrape_tiktok(url)
+
+        assert sorted(calls) == ["scraptik", "supadata"]
+        assert second == first
+
+    def test_stale_volatile_fields_skip_transcript(self, monkeypatch):
+        """Expired engagement stats should be refreshed without Supadata or ScrapTik quota."""
+        import scraper
+
+        calls = []
+        self._patch_providers(monkeypatch, calls)
+        url = "https://www.tiktok.com/@user/video/43"
+
+        scraper.scrape_tiktok(url)
+        monkeypatch.setattr(scraper.scrape_cache.settings, "scrape_cache_volatile_ttl", -1)
+        result = scraper.scrape_tiktok(url)
+
+        assert sorted(calls) == ["oembed", "scraptik", "supadata"]
+        assert result["transcript"] == "hello"
+
+    def test_failed_transcript_is_retried(self, monkeypatch):
+        """A transcript lookup that failed should not be cached, and is fetched again next time."""
+        import scraper
+
+        calls = []
+        self._patch_providers(monkeypatch, calls)
+        answers = iter([scraper.ProviderError("Supadata error: 503"), "hello"])
+
+        async def transcript(url):
+            calls.append("supadata")
+            answer = next(answers)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        monkeypatch.setattr(scraper, "get_transcript_supadata", transcript)
+        url = "https://www.tiktok.com/@user/video/47"
+
+        assert scraper.scrape_tiktok(url)["transcript"] is None
+        assert scraper.scrape_tiktok(url)["transcript"] == "hello"
+        assert scraper.scrape_tiktok(url)["transcript"] == "hello"
+
+        assert calls.count("supadata") == 2
+        assert calls.count("scraptik") == 1
+
+    def test_missing_transcript_is_cached(self, monkeypatch):
+        """Supadata answering that there is no transcript should be cached like any answer."""
+        import scraper
+
+        calls = []
+        self._patch_providers(monkeypatch, calls)
+
+        async def transcript(url):
+            calls.append("supadata")
+            return None
+
+        monkeypatch.setattr(scraper, "get_transcript_supadata", transcript)
+        url = "https://www.tiktok.com/@user/video/48"
+
+        scraper.scrape_tiktok(url)
+        scraper.scrape_tiktok(url)
+
+        assert calls.count("supadata") == 1
+
+    def test_backfill_over_budget_uses_free_providers(self, monkeypatch):
+        """Backfill scrapes should skip quota-limited providers the planner refuses."""
+        import quota_planner
+        import scraper
+
+        calls = []
+        self._patch_providers(monkeypatch, calls)
+        monkeypatch.setattr(quota_planner, "should_spend", lambda service, priority: priority != "backfill")
+
+        result = scraper.scrape_tiktok("https://www.tiktok.com/@user/video/45", priority="backfill")
+
+        assert calls == ["oembed"]
+        assert result["transcript"] is None
+
+
+class TestAdaptiveProviderOrder:
+    """Test circuit breakers in the metadata chain."""
+
+    def test_tripped_provider_is_skipped(self, monkeypatch):
+        """A provider with an open circuit should not be called."""
+        import provider_health
+        import scraper
+
+        calls = []
+
+        async def scraptik(url):
+            calls.append("scraptik")
+            return {}
+
+        def ytdlp(url):
+            calls.append("ytdlp")
+            return {}
+
+        async def oembed(url):
+            calls.append("oembed")
+            return {"title": "oEmbed title", "creator": "user"}
+
+        async def transcript(url):
+            return None
+
+        monkeypatch.setattr(scraper, "get_metadata_scraptik", scraptik)
+        monkeypatch.setattr(scraper, "get_metadata_ytdlp", ytdlp)
+        monkeypatch.setattr(scraper, "get_metadata_oembed", oembed)
+        monkeypatch.setattr(scraper, "get_transcript_supadata", transcript)
+
+        for _ in range(provider_health.MIN_SAMPLES):
+            provider_health.record_result("ytdlp", False, 30.0)
+
+        result = scraper.scrape_tiktok("https://www.tiktok.com/@user/video/44")
+
+        assert result["title"] == "oEmbed title"
+        assert "ytdlp" not in calls
+        assert provider_health.get_stats("scraptik")["samples"] == 1
+
+
+    def test_slower_scraptik_wins_over_fast_oembed(self, monkeypatch):
+        """A healthy but slower ScrapTik answer should beat a faster thin oEmbed one."""
+        import asyncio
+        import provider_health
+        import scraper
+
+        async def scraptik(url):
+            await asyncio.sleep(0.05)
+            return {"title": "ScrapTik title", "creator": "user", "view_count": 10}
+
+        async def oembed(url):
+            return {"title": "oEmbed title", "creator": "user"}
+
+        async def transcript(url):
+            return None
+
+        monkeypatch.setattr(scraper, "get_metadata_scraptik", scraptik)
+        monkeypatch.setattr(scraper, "get_metadata_ytdlp", lambda url: {})
+        monkeypatch.setattr(scraper, "get_metadata_oembed", oembed)
+        monkeypatch.setattr(scraper, "get_transcript_supadata", transcript)
+
+        for _ in range(provider_health.MIN_SAMPLES + 1):
+            provider_health.record_result("scraptik", True, 1.5)
+            provider_health.record_result("oembed", True, 0.4)
+
+        result = scraper.scrape_tiktok("https://www.tiktok.com/@user/video/46")
+
+        assert result["title"] == "ScrapTik title"
+        assert result["view_count"] == 10
+
+    def test_unconfigured_provider_is_not_a_failure(self, monkeypatch):
+        """A provider skipped for a missing key or quota should not hurt its health."""
+        import provider_health
+        import scraper
+
+        async def oembed(url):
+            return {"title": "oEmbed title", "creator": "user"}
+
+        async def transcript(url):
+            return None
+
+        monkeypatch.setattr(scraper.settings, "rapidapi_key", "")
+        monkeypatch.setattr(scraper, "get_metadata_ytdlp", lambda url: {})
+        monkeypatch.setattr(scraper, "get_metadata_oembed", oembed)
+        monkeypatch.setattr(scraper, "get_transcript_supadata", transcript)
+
+        for video_id in range(provider_health.MIN_SAMPLES + 1):
+            scraper.scrape_tiktok(f"https://www.tiktok.com/@user/video/5{video_id}")
+
+        stats = provider_health.get_stats("scraptik")
+        assert stats["samples"] == 0
+        assert stats["state"] == provider_health.CLOSED
+
+
+class TestScrapeMany:
+    """Test the bulk scrape API."""
+
+    def test_duplicates_share_one_scrape(self, monkeypatch):
+        """URLs for the same video should be scraped once and all reported."""
+        import scraper
+
+        calls = []
+
+        async def scraptik(url):
+            calls.append(url)
+            return {"title": f"Title {url[-1]}", "creator": "user"}
+
+        async def empty(url):
+            return {}
+
+        monkeypatch.setattr(scraper, "get_metadata_scraptik", scraptik)
+        monkeypatch.setattr(scraper, "get_metadata_ytdlp", lambda url: {})
+        monkeypatch.setattr(scraper, "get_metadata_oembed", empty)
+        monkeypatch.setattr(scraper, "get_transcript_supadata", empty)
+
+        urls = [
+            "https://www.tiktok.com/@user/video/1",
+            "https://tiktok.com/@user/video/1?lang=en",
+            "https://www.tiktok.com/@user/video/2",
+            "https://youtube.com/watch?v=1",
+        ]
+        results = {url: (result, error) for url, result, error in scraper.scrape_many(urls)}
+
+        assert set(results) == set(urls)
+        assert len(calls) == 2
+        assert results[urls[0]][0] == results[urls[1]][0]
+        assert results[urls[2]][0]["title"] == "Title 2"
+        assert results[urls[3]] == (None, "Invalid TikTok URL: https://youtube.com/watch?v=1")
+
+    def test_cached_videos_skip_providers(self, monkeypatch):
+        """Fully cached videos should be served without provider calls."""
+        import scrape_cache
+        import scraper
+
+        scrape_cache.store("5", {
+            "title": "Cached", "description": None, "creator": "c", "hashtags": [], "transcript": None, "view_count": 3,
+        })
+        monkeypatch.setattr(scraper, "scrape_tiktok_async", lambda url: pytest.fail("scraped"))
+
+        results = list(scraper.scrape_many(["https://www.tiktok.com/@c/video/5"]))
+
+        assert results[0][1]["title"] == "Cached"
+        assert results[0][1]["view_count"] == 3
+
+    def test_provider_concurrency_limit(self, monkeypatch):
+        """No more than the provider's limit should be in flight at once."""
+        import asyncio
+        import scraper
+
+        in_flight = []
+        peak = []
+
+        async def transcript(url):
+            in_flight.append(url)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(url)
+            return None
+
+        async def scraptik(url):
+            return {"title": "t", "creator": "u"}
+
+        async def empty(url):
+            return {}
+
+        monkeypatch.setattr(scraper, "get_metadata_scraptik", scraptik)
+        monkeypatch.setattr(scraper, "get_metadata_ytdlp", lambda url: {})
+        monkeypatch.setattr(scraper, "get_metadata_oembed", empty)
+        monkeypatch.setattr(scraper, "get_transcript_supadata", transcript)
+
+        urls = [f"https://www.tiktok.com/@u/video/{i}" for i in range(100, 110)]
+        results = list(scraper.scrape_many(urls, concurrency=10, provider_concurrency={"supadata": 2}))
+
+        assert len(results) == 10
+        assert max(peak) <= 2
@@ -0,0 +1,34 @@
+"""Tests for prompt token budgeting."""
+from text_budget import estimate_tokens, split_into_chunks, truncate_to_tokens
+
+
+class TestChunking:
+    """Test overlapping transcript chunks."""
+
+    def test_short_text_is_one_chunk(self):
+        """Text within the budget should not be split."""
+        assert split_into_chunks("hello world", 100, 10) == ["hello world"]
+
+    def test_chunks_fit_and_overlap(self):
+        """Chunks should respect the size and repeat the tail of the previous chunk."""
+        text = " ".join(f"Sentence number {i} is here." for i in range(200))
+        chunks = split_into_chunks(text, 50, 10)
+
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+        for previous, chunk in zip(chunks, chunks[1:]):
+            assert chunk.split()[0] in previous.split()[-12:]
+        # Nothing is lost at the end
+        assert chunks[-1].endswith("Sentence number 199 is here.")
+
+    def test_chunks_end_at_sentence_breaks(self):
+        """A sentence break in the window should be preferred over a space."""
+        text = " ".join(f"Sentence number {i} is here." for i in range(200))
+        assert all(chunk.endswith(".") for chunk in split_into_chunks(text, 50, 10))
+
+    def test_truncate_to_tokens(self):
+        """Truncation should cut at a word boundary within the budget."""
+        text = "word " * 100
+        truncated = truncate_to_tokens(text, 10)
+        assert estimate_tokens(truncated) <= 10
+        assert truncated.endswith("word")
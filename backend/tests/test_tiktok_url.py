@@ -0,0 +1,100 @@
+"""Tests for TikTok URL parsing and short-link resolution."""
+import asyncio
+
+import httpx
+import pytest
+
+import tiktok_url
+from cache_store import SQLiteCache
+from tiktok_url import parse_tiktok_url, resolve_tiktok_url
+
+
+@pytest.fixture(autouse=True)
+def resolution_cache(tmp_path, monkeypatch):
+    """Isolate the short-link caches per test."""
+    monkeypatch.setattr(
+        tiktok_url, "_resolution_cache", SQLiteCache(str(tmp_path / "links.db"), table="short_links")
+    )
+    monkeypatch.setattr(tiktok_url, "_memory_cache", tiktok_url.OrderedDict())
+
+
+def mock_client(handler):
+    """Build an async client backed by a mock transport."""
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestParseTikTokUrl:
+    """Test offline URL parsing."""
+
+    def test_standard_video_url(self):
+        """Standard URLs should expose video ID, username and canonical form."""
+        parsed = parse_tiktok_url("https://tiktok.com/@some.user/video/7596173772722277687?lang=en")
+
+        assert parsed.kind == "video"
+        assert parsed.video_id == "7596173772722277687"
+        assert parsed.username == "some.user"
+        assert parsed.canonical_url == "https://www.tiktok.com/@some.user/video/7596173772722277687"
+
+    def test_photo_url(self):
+        """Photo posts should be recognised as their own kind."""
+        parsed = parse_tiktok_url("https://www.tiktok.com/@user/photo/123")
+
+        assert parsed.kind == "photo"
+        assert parsed.video_id == "123"
+
+    def test_short_urls(self):
+        """Short links should parse without a video ID."""
+        for url in ("https://vm.tiktok.com/ZMabc123", "https://www.tiktok.com/t/ZTabc123"):
+            parsed = parse_tiktok_url(url)
+            assert parsed.is_short
+            assert parsed.video_id is None
+            assert parsed.canonical_url is None
+
+    def test_non_tiktok_urls(self):
+        """Non-TikTok URLs should not parse."""
+        assert parse_tiktok_url("https://youtube.com/watch?v=123") is None
+        assert parse_tiktok_url("https://tiktok.com/@user") is None
+        assert parse_tiktok_url("") is None
+
+
+class TestResolveTikTokUrl:
+    """Test short-link resolution."""
+
+    def test_resolves_redirect_once(self, monkeypatch):
+        """Short links should be followed once and then served from cache."""
+        requests = []
+
+        def handler(request):
+            requests.append(str(request.url))
+            return httpx.Response(
+                301, headers={"location": "https://www.tiktok.com/@user/video/999?_r=1"}
+            )
+
+        monkeypatch.setattr(tiktok_url, "get_async_client", lambda name: mock_client(handler))
+
+        first = asyncio.run(resolve_tiktok_url("https://vm.tiktok.com/ZMabc123"))
+        second = asyncio.run(resolve_tiktok_url("https://vm.tiktok.com/ZMabc123"))
+
+        assert first.video_id == "999"
+        assert first.canonical_url == "https://www.tiktok.com/@user/video/999"
+        assert second == first
+        assert len(requests) == 1
+
+    def test_unresolvable_short_link(self, monkeypatch):
+        """A short link that doesn't redirect should come back unresolved."""
+        monkeypatch.setattr(
+            tiktok_url, "get_async_client", lambda name: mock_client(lambda r: httpx.Response(404))
+        )
+
+        parsed = asyncio.run(resolve_tiktok_url("https://vt.tiktok.com/ZMabc123"))
+
+        assert parsed.is_short
+        assert parsed.video_id is None
+
+    def test_standard_url_needs_no_network(self, monkeypatch):
+        """Standard URLs should never hit the network."""
+        monkeypatch.setattr(tiktok_url, "get_async_client", lambda name: pytest.fail("network used"))
+
+        parsed = asyncio.run(resolve_tiktok_url("https://www.tiktok.com/@user/video/1"))
+
+        assert parsed.video_id == "1"
@@ -0,0 +1,87 @@
+"""Tests for the worker jobs."""
+import pytest
+
+import worker
+from database import Video
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Replace scraping and analysis with in-memory fakes."""
+    import llm_analyzer
+    import scraper
+
+    def scrape_many(urls, priority):
+        for url in urls:
+            if "broken" in url:
+                yield url, None, "Invalid TikTok URL"
+            else:
+                yield url, {"title": f"Title {url[-1]}", "transcript": "text"}, None
+
+    batches = []
+
+    def analyze_videos_batch(videos):
+        batches.append(sorted(videos))
+        return {
+            video_id: {lens: {"summary": fields["title"]} for lens in llm_analyzer.LENSES}
+            for video_id, fields in videos.items()
+        }
+
+    monkeypatch.setattr(scraper, "scrape_many", scrape_many)
+    monkeypatch.setattr(llm_analyzer, "analyze_videos_batch", analyze_videos_batch)
+    return batches
+
+
+class TestProcessVideoBatch:
+    """Test the batched backfill job."""
+
+    def test_batch_updates_each_video(self, test_db, pipeline, monkeypatch):
+        """Each video should get its own scrape fields, analysis and status."""
+        videos = [
+            Video(tiktok_url="https://www.tiktok.com/@a/video/1", tiktok_video_id="1"),
+            Video(tiktok_url="https://www.tiktok.com/@a/video/2", tiktok_video_id="2"),
+            Video(tiktok_url="https://broken.example/3"),
+        ]
+        test_db.add_all(videos)
+        test_db.commit()
+        monkeypatch.setattr(worker, "SessionLocal", lambda: test_db)
+        monkeypatch.setattr(test_db, "close", lambda: None)
+
+        results = worker.process_video_batch([v.id for v in videos])
+
+        assert [r.get("status") for r in results].count("completed") == 2
+        assert pipeline == [sorted([videos[0].id, videos[1].id])]
+        assert videos[0].status == "completed"
+        assert videos[0].content_analysis == {"summary": "Title 1"}
+        assert videos[1].investment_analysis == {"summary": "Title 2"}
+        assert videos[2].status == "failed"
+
+
+class TestNearDuplicates:
+    """Test analysis reuse for near-identical transcripts."""
+
+    def test_repost_reuses_analysis(self, test_db, monkeypatch):
+        """A repost should copy the original's analyses instead of calling the LLM."""
+        import llm_analyzer
+        import scraper
+        from tests.test_near_duplicates import TRANSCRIPT
+
+        analysis = {lens: {"summary": lens} for lens in llm_analyzer.LENSES}
+        calls = []
+        monkeypatch.setattr(scraper, "scrape_tiktok", lambda url, priority: {"title": url, "transcript": TRANSCRIPT})
+        monkeypatch.setattr(llm_analyzer, "analyze_video", lambda **fields: calls.append(fields) or analysis)
+        monkeypatch.setattr(worker, "SessionLocal", lambda: test_db)
+        monkeypatch.setattr(test_db, "close", lambda: None)
+
+        original = Video(tiktok_url="https://www.tiktok.com/@a/video/1", tiktok_video_id="1")
+        repost = Video(tiktok_url="https://www.tiktok.com/@b/video/2", tiktok_video_id="2")
+        test_db.add_all([original, repost])
+        test_db.commit()
+
+        worker.process_video(original.id)
+        result = worker.process_video(repost.id)
+
+        assert len(calls) == 1
+        assert result["status"] == "completed"
+        assert repost.near_duplicate_of_id == original.id
+        assert repost.knowledge_analysis == {"summary": "knowledge"}
@@ -0,0 +1,100 @@
+"""Tests for the yt-dlp extractor pool."""
+import threading
+
+import pytest
+
+from ytdlp_pool import YtdlpPool
+
+
+class FakeYtdlp:
+    """Stand-in for YoutubeDL that records closes."""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestYtdlpPool:
+    """Test checkout, reuse and recycling."""
+
+    def test_instances_are_reused(self):
+        """Sequential checkouts should get the same warm instance."""
+        pool = YtdlpPool(size=1, max_uses=10, factory=FakeYtdlp)
+
+        with pool.checkout() as first:
+            pass
+        with pool.checkout() as second:
+            pass
+
+        assert first is second
+        assert not first.closed
+
+    def test_warm_builds_all_instances(self):
+        """warm should pre-build every slot once."""
+        created = []
+        pool = YtdlpPool(size=3, max_uses=10, factory=lambda: created.append(1) or FakeYtdlp())
+
+        assert pool.warm() == 3
+        assert pool.warm() == 0
+        assert len(created) == 3
+
+    def test_recycled_after_max_uses(self):
+        """Instances should be closed and replaced after max_uses jobs."""
+        pool = YtdlpPool(size=1, max_uses=2, factory=FakeYtdlp)
+
+        with pool.checkout() as first:
+            pass
+        with pool.checkout() as again:
+            pass
+        with pool.checkout() as fresh:
+            pass
+
+        assert first is again
+        assert first.closed
+        assert fresh is not first
+
+    def test_recycled_on_error(self):
+        """An instance that raised should not be reused."""
+        pool = YtdlpPool(size=1, max_uses=10, factory=FakeYtdlp)
+
+        with pytest.raises(RuntimeError):
+            with pool.checkout() as broken:
+                raise RuntimeError("blocked")
+        with pool.checkout() as fresh:
+            pass
+
+        assert broken.closed
+        assert fresh is not broken
+
+    def test_concurrent_checkouts_get_distinct_instances(self):
+        """Two threads should never share an instance."""
+        pool = YtdlpPool(size=2, max_uses=10, factory=FakeYtdlp)
+        barrier = threading.Barrier(2)
+        seen = []
+
+        def job():
+            with pool.checkout() as ydl:
+                seen.append(ydl)
+                barrier.wait(timeout=5)
+
+        threads = [threading.Thread(target=job) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert seen[0] is not seen[1]
+
+    def test_busy_pool_is_a_provider_miss(self, monkeypatch):
+        """When every extractor is held, get_metadata_ytdlp should give up instead of hanging."""
+        import scraper
+        import ytdlp_pool
+
+        pool = YtdlpPool(size=1, max_uses=10, factory=FakeYtdlp)
+        monkeypatch.setattr(ytdlp_pool, "_pool", pool)
+        monkeypatch.setattr(scraper.settings, "ytdlp_checkout_timeout", 0.05)
+
+        with pool.checkout():
+            assert scraper.get_metadata_ytdlp("https://www.tiktok.com/@user/video/1") == {}
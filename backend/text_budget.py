@@ -0,0 +1,57 @@
+"""Rough token budgeting for LLM prompts."""
+import math
+
+# OpenRouter models use different tokenizers; ~4 characters per token is a
+# safe average for English text and needs no tokenizer dependency
+CHARS_PER_TOKEN = 4
+
+_BREAKS = ("\n", ". ", "? ", "! ")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens a piece of text costs."""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, at a word boundary when possible."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", limit // 2, limit)
+    return text[:cut if cut > 0 else limit].rstrip()
+
+
+def split_into_chunks(text: str, max_tokens: int, overlap_tokens: int = 0) -> list[str]:
+    """
+    Split text into chunks of about max_tokens that overlap by overlap_tokens.
+
+    Chunks end at a sentence or line break when one falls in the second half
+    of the window, otherwise at a space, so sentences are rarely cut.
+    """
+    size = max_tokens * CHARS_PER_TOKEN
+    overlap = min(overlap_tokens * CHARS_PER_TOKEN, size // 2)
+    if len(text) <= size:
+        return [text]
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            floor = start + size // 2
+            cut = max(text.rfind(mark, floor, end) for mark in _BREAKS)
+            if cut < 0:
+                cut = text.rfind(" ", floor, end)
+            if cut > 0:
+                end = cut + 1
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+
+        # Step back by the overlap, then forward to the start of a word
+        start = max(end - overlap, start + 1)
+        space = text.find(" ", start, end)
+        if overlap and space != -1:
+            start = space + 1
+    return [chunk for chunk in chunks if chunk]
@@ -0,0 +1,145 @@
+"""TikTok URL parsing, canonicalisation and short-link resolution."""
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from cache_store import SQLiteCache
+from config import get_settings
+from http_client import get_async_client
+
+settings = get_settings()
+
+# Every supported URL form in one pass; named groups tell them apart.
+_TIKTOK_URL_RE = re.compile(
+    r"""
+    ^https?://
+    (?:
+        (?:www\.|m\.)?tiktok\.com/
+        (?:
+            @(?P<username>[\w.-]+)/(?P<kind>video|photo)/(?P<video_id>\d+)
+            | t/(?P<t_code>\w+)
+        )
+        | (?:vm|vt)\.tiktok\.com/(?P<short_code>\w+)
+    )
+    """,
+    re.VERBOSE,
+)
+
+MAX_REDIRECTS = 5
+_MEMORY_CACHE_SIZE = 1024
+
+_memory_cache: "OrderedDict[str, TikTokUrl]" = OrderedDict()
+_resolution_cache: Optional[SQLiteCache] = None
+
+
+@dataclass(frozen=True)
+class TikTokUrl:
+    """Parsed TikTok URL."""
+
+    url: str
+    kind: str  # video, photo, short
+    video_id: Optional[str] = None
+    username: Optional[str] = None
+
+    @property
+    def is_short(self) -> bool:
+        """Short links need resolving before the video ID is known."""
+        return self.kind == "short"
+
+    @property
+    def canonical_url(self) -> Optional[str]:
+        """Canonical www.tiktok.com URL, or None for unresolved short links."""
+        if self.is_short:
+            return None
+        return f"https://www.tiktok.com/@{self.username}/{self.kind}/{self.video_id}"
+
+
+def parse_tiktok_url(url: str) -> Optional[TikTokUrl]:
+    """Parse a TikTok URL without any network access. Returns None if not TikTok."""
+    match = _TIKTOK_URL_RE.match(url.strip()) if url else None
+    if not match:
+        return None
+    if match.group("video_id"):
+        return TikTokUrl(
+            url=url,
+            kind=match.group("kind"),
+            video_id=match.group("video_id"),
+            username=match.group("username"),
+        )
+    return TikTokUrl(url=url, kind="short")
+
+
+def _get_resolution_cache() -> SQLiteCache:
+    """Get the shared short-link cache, stored next to the scrape cache."""
+    global _resolution_cache
+    if _resolution_cache is None:
+        _resolution_cache = SQLiteCache(settings.scrape_cache_path, table="short_links")
+    return _resolution_cache
+
+
+def _remember(url: str, parsed: "TikTokUrl") -> None:
+    """Keep a resolved link in the bounded in-process cache."""
+    _memory_cache[url] = parsed
+    _memory_cache.move_to_end(url)
+    while len(_memory_cache) > _MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+
+async def resolve_tiktok_url(url: str) -> Optional[TikTokUrl]:
+    """
+    Parse a TikTok URL, resolving short links to their canonical video URL.
+
+    Short links are resolved once by following redirects on the pooled TikTok
+    client; results are cached in-process and in SQLite so other workers
+    reuse them. Unresolvable short links come back unchanged (kind "short").
+    """
+    parsed = parse_tiktok_url(url)
+    if parsed is None or not parsed.is_short:
+        return parsed
+
+    key = url.strip()
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        return _memory_cache[key]
+
+    try:
+        cached = _get_resolution_cache().get(key)
+    except Exception as e:
+        print(f"Short link cache error: {e}")
+        cached = None
+    if cached:
+        resolved = parse_tiktok_url(cached["url"])
+        if resolved:
+            _remember(key, resolved)
+            return resolved
+
+    resolved = await _follow_redirects(key)
+    if resolved is None:
+        return parsed
+
+    _remember(key, resolved)
+    try:
+        _get_resolution_cache().set(key, {"url": resolved.canonical_url})
+    except Exception as e:
+        print(f"Short link cache error: {e}")
+    return resolved
+
+
+async def _follow_redirects(url: str) -> Optional[TikTokUrl]:
+    """Walk redirect hops until a URL with a video ID appears."""
+    client = get_async_client("tiktok")
+    current = url
+    try:
+        for _ in range(MAX_REDIRECTS):
+            response = await client.get(current, follow_redirects=False, timeout=15.0)
+            location = response.headers.get("location")
+            if not response.is_redirect or not location:
+                return None
+            current = str(response.url.join(location))
+            parsed = parse_tiktok_url(current)
+            if parsed and not parsed.is_short:
+                return parsed
+    except Exception as e:
+        print(f"Short link resolution error: {e}")
+    return None
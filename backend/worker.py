@@ -1,16 +1,120 @@
 """Background worker for video processing jobs."""
 from datetime import datetime
+from typing import Optional
 from database import SessionLocal, Video
+from ingest import catch_up, copy_results, find_primary, is_live, propagate_results
 
 
-def process_video(video_id: int) -> dict:
+def _coalesce(db, video: Video) -> Optional[dict]:
+    """Link a video to an older submission of the same TikTok, if one exists."""
+    # Two submissions can race past the ingest check; the older one wins
+    primary = find_primary(db, video.tiktok_video_id, before_id=video.id)
+    if not primary or not is_live(primary):
+        return None
+    video.coalesced_into_id = primary.id
+    if primary.status == "completed":
+        copy_results(primary, video)
+    db.commit()
+    catch_up(db, primary)
+    return {"status": "coalesced", "video_id": video.id, "coalesced_into_id": primary.id}
+
+
+def _apply_scrape(video: Video, scrape_result: dict) -> None:
+    """Copy scraped fields onto the video."""
+    video.title = scrape_result.get("title")
+    video.description = scrape_result.get("description")
+    video.creator = scrape_result.get("creator")
+    video.hashtags = scrape_result.get("hashtags", [])
+    video.view_count = scrape_result.get("view_count")
+    video.like_count = scrape_result.get("like_count")
+    video.thumbnail_url = scrape_result.get("thumbnail_url")
+    video.transcript = scrape_result.get("transcript")
+
+
+def _analysis_fields(video: Video) -> dict:
+    """analyze_video keyword arguments for a scraped video."""
+    return {
+        "transcript": video.transcript,
+        "title": video.title,
+        "description": video.description,
+        "hashtags": video.hashtags,
+        "context": video.context,
+    }
+
+
+def _near_duplicate(db, video: Video) -> Optional[dict]:
+    """Reuse the analyses of an analysed video whose transcript nearly matches."""
+    from llm_analyzer import LENSES
+    from near_duplicates import find_match
+    try:
+        match = find_match(db, video)
+    except Exception as e:
+        print(f"Near-duplicate lookup failed: {e}")
+        return None
+    if not match:
+        return None
+
+    original, score = match
+    if video.context and video.context != original.context:
+        # The user's context steers the analysis, so it gets its own run
+        return None
+    print(f"Video {video.id} matches video {original.id} ({score:.0%} similar) - reusing its analysis")
+    video.near_duplicate_of_id = original.id
+    return _complete(db, video, {lens: getattr(original, f"{lens}_analysis") for lens in LENSES})
+
+
+def _complete(db, video: Video, analysis: dict) -> dict:
+    """Store the analysis and mark the video completed (or failed if every lens errored)."""
+    from llm_analyzer import analysis_failed
+    if analysis_failed(analysis):
+        lens_error = next(iter(analysis.values()), {})
+        return _fail(db, video, f"LLM analysis failed: {lens_error.get('error', 'no result')}")
+
+    video.investment_analysis = analysis.get("investment")
+    video.product_analysis = analysis.get("product")
+    video.content_analysis = analysis.get("content")
+    video.knowledge_analysis = analysis.get("knowledge")
+
+    video.status = "completed"
+    video.processed_at = datetime.utcnow()
+    try:
+        # Precompute the chat context so the first chat message doesn't wait for it
+        from chat_context import get_video_context
+        get_video_context(video)
+    except Exception as e:
+        print(f"Chat context error: {e}")
+    if video.near_duplicate_of_id is None:
+        try:
+            from near_duplicates import index_video
+            index_video(db, video)
+        except Exception as e:
+            print(f"Near-duplicate index error: {e}")
+    db.commit()
+    propagate_results(db, video)
+    return {"status": "completed", "video_id": video.id}
+
+
+def _fail(db, video: Video, error: str) -> dict:
+    """Mark the video failed."""
+    video.status = "failed"
+    video.error_message = error
+    db.commit()
+    propagate_results(db, video)
+    return {"error": error, "video_id": video.id}
+
+
+def process_video(video_id: int, priority: str = "interactive") -> dict:
     """
     Process a TikTok video through the full pipeline.
 
     Steps:
     1. Scrape video metadata and transcript
-    2. Run 4-lens LLM analysis
+    2. Reuse the analysis of a near-duplicate transcript, or run the
+       4-lens LLM analysis
     3. Update database with results
+
+    priority is "interactive" for bot submissions and "backfill" for bulk
+    re-processing; it decides how much scarce provider quota may be spent.
     """
     db = SessionLocal()
     try:
@@ -18,50 +122,129 @@ def process_video(video_id: int) -> dict:
         if not video:
             return {"error": f"Video {video_id} not found"}
 
+        coalesced = _coalesce(db, video)
+        if coalesced:
+            return coalesced
+
         video.status = "processing"
         db.commit()
 
         try:
             # Step 1: Scrape TikTok data
             from scraper import scrape_tiktok
-            scrape_result = scrape_tiktok(video.tiktok_url)
-
-            video.title = scrape_result.get("title")
-            video.description = scrape_result.get("description")
-            video.creator = scrape_result.get("creator")
-            video.hashtags = scrape_result.get("hashtags", [])
-            video.view_count = scrape_result.get("view_count")
-            video.like_count = scrape_result.get("like_count")
-            video.thumbnail_url = scrape_result.get("thumbnail_url")
-            video.transcript = scrape_result.get("transcript")
+            _apply_scrape(video, scrape_tiktok(video.tiktok_url, priority))
             db.commit()
 
+            reused = _near_duplicate(db, video)
+            if reused:
+                return reused
+
             # Step 2: Run LLM analysis
             from llm_analyzer import analyze_video
-            analysis = analyze_video(
-                transcript=video.transcript,
-                title=video.title,
-                description=video.description,
-                hashtags=video.hashtags,
-                context=video.context,
-            )
-
-            video.investment_analysis = analysis.get("investment")
-            video.product_analysis = analysis.get("product")
-            video.content_analysis = analysis.get("content")
-            video.knowledge_analysis = analysis.get("knowledge")
-
-            video.status = "completed"
-            video.processed_at = datetime.utcnow()
+            return _complete(db, video, analyze_video(**_analysis_fields(video)))
+
+        except Exception as e:
+            return _fail(db, video, str(e))
+
+    finally:
+        db.close()
+
+
+def process_video_batch(video_ids: list[int], priority: str = "backfill") -> list[dict]:
+    """
+    Process several videos in one job (backfill path).
+
+    Videos are scraped together with scrape_many; near-duplicates of
+    analysed videos reuse their analysis, and the rest are analysed with
+    analyze_videos_batch so small videos share LLM requests. Each video
+    still ends up completed, failed or coalesced on its own.
+    """
+    db = SessionLocal()
+    results = []
+    try:
+        videos = []
+        for video_id in video_ids:
+            video = db.query(Video).filter(Video.id == video_id).first()
+            if not video:
+                results.append({"error": f"Video {video_id} not found"})
+                continue
+            coalesced = _coalesce(db, video)
+            if coalesced:
+                results.append(coalesced)
+                continue
+            video.status = "processing"
+            videos.append(video)
+        db.commit()
+
+        # Step 1: Scrape; scrape_many yields once per submitted URL
+        from scraper import scrape_many
+        by_url: dict[str, list[Video]] = {}
+        for video in videos:
+            by_url.setdefault(video.tiktok_url, []).append(video)
+
+        scraped = []
+        try:
+            for url, scrape_result, error in scrape_many([v.tiktok_url for v in videos], priority=priority):
+                video = by_url[url].pop(0)
+                if error:
+                    results.append(_fail(db, video, error))
+                else:
+                    _apply_scrape(video, scrape_result)
+                    scraped.append(video)
             db.commit()
 
-            return {"status": "completed", "video_id": video_id}
+            fresh = []
+            for video in scraped:
+                reused = _near_duplicate(db, video)
+                if reused:
+                    results.append(reused)
+                else:
+                    fresh.append(video)
 
+            # Step 2: Batched LLM analysis
+            from llm_analyzer import analyze_videos_batch
+            analyses = analyze_videos_batch({video.id: _analysis_fields(video) for video in fresh})
         except Exception as e:
-            video.status = "failed"
-            video.error_message = str(e)
-            db.commit()
-            return {"error": str(e), "video_id": video_id}
+            unfinished = [v for v in videos if v.status == "processing"]
+            return results + [_fail(db, video, str(e)) for video in unfinished]
+
+        for video in fresh:
+            try:
+                results.append(_complete(db, video, analyses[video.id]))
+            except Exception as e:
+                results.append(_fail(db, video, str(e)))
+        return results
 
     finally:
         db.close()
+
+
+def main():
+    """
+    Run the video processing worker.
+
+    Uses a non-forking worker so pooled HTTP connections and yt-dlp
+    extractors stay warm across jobs instead of being rebuilt in a fresh
+    work horse for every video.
+    """
+    from rq import SimpleWorker
+    from queue_manager import get_redis_connection
+    from http_client import close_clients
+    from ytdlp_pool import get_pool
+
+    pool = get_pool()
+    try:
+        print(f"yt-dlp pool: warmed {pool.warm()} extractor(s)")
+    except Exception as e:
+        print(f"yt-dlp pool: warm-up failed, instances will be built on demand ({e})")
+
+    worker = SimpleWorker(["video_processing"], connection=get_redis_connection())
+    try:
+        worker.work()
+    finally:
+        pool.close()
+        close_clients()
+
+
+if __name__ == "__main__":
+    main()
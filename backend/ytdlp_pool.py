@@ -0,0 +1,140 @@
+"""Pool of warm, reusable yt-dlp extractor instances."""
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from config import get_settings
+
+settings = get_settings()
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+def build_ytdlp_options() -> dict:
+    """yt-dlp options for metadata-only extraction."""
+    ydl_opts = {
+        "quiet": True,
+        "no_warnings": True,
+        "extract_flat": False,
+        "skip_download": True,
+        "http_headers": {
+            "User-Agent": USER_AGENT,
+        },
+    }
+
+    # Add proxy if configured
+    if settings.proxy_url:
+        ydl_opts["proxy"] = settings.proxy_url
+
+    return ydl_opts
+
+
+def _create_ytdlp():
+    """Build a YoutubeDL instance with the TikTok extractor already loaded."""
+    import yt_dlp
+
+    ydl = yt_dlp.YoutubeDL(build_ytdlp_options())
+    ydl.get_info_extractor("TikTok")
+    return ydl
+
+
+class _Slot:
+    """A pooled instance and how many jobs it has served."""
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.uses = 0
+
+
+class YtdlpPool:
+    """
+    Thread-safe pool of pre-initialised YoutubeDL instances.
+
+    Instances are created lazily up to size (or eagerly via warm), checked
+    out by one thread at a time, and recycled after max_uses jobs or on any
+    error so a poisoned cookie jar or extractor state never leaks into the
+    next job.
+    """
+
+    def __init__(self, size: int, max_uses: int, factory: Callable = _create_ytdlp):
+        self.size = size
+        self.max_uses = max_uses
+        self.factory = factory
+        # None marks a free slot whose instance hasn't been built (or was recycled)
+        self._slots: "queue.LifoQueue[Optional[_Slot]]" = queue.LifoQueue()
+        for _ in range(size):
+            self._slots.put(None)
+
+    def warm(self) -> int:
+        """Build every missing instance up front. Returns how many were created."""
+        taken = []
+        created = 0
+        try:
+            while True:
+                slot = self._slots.get_nowait()
+                if slot is None:
+                    slot = _Slot(self.factory())
+                    created += 1
+                taken.append(slot)
+        except queue.Empty:
+            pass
+        finally:
+            for slot in taken:
+                self._slots.put(slot)
+        return created
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None):
+        """Borrow an instance; blocks until one is free, raising queue.Empty after timeout seconds."""
+        slot = self._slots.get(timeout=timeout)
+        healthy = False
+        try:
+            if slot is None:
+                slot = _Slot(self.factory())
+            yield slot.instance
+            healthy = True
+        finally:
+            if slot is not None:
+                slot.uses += 1
+                if not healthy or slot.uses >= self.max_uses:
+                    self._close(slot)
+                    slot = None
+            self._slots.put(slot)
+
+    def close(self) -> None:
+        """Close every idle instance."""
+        slots = []
+        try:
+            while True:
+                slots.append(self._slots.get_nowait())
+        except queue.Empty:
+            pass
+        for slot in slots:
+            if slot is not None:
+                self._close(slot)
+            self._slots.put(None)
+
+    @staticmethod
+    def _close(slot: _Slot) -> None:
+        """Release an instance's resources."""
+        try:
+            slot.instance.close()
+        except Exception as e:
+            print(f"yt-dlp pool: error closing instance: {e}")
+
+
+_pool: Optional[YtdlpPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> YtdlpPool:
+    """Get this process's yt-dlp pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = YtdlpPool(settings.ytdlp_pool_size, settings.ytdlp_max_uses)
+        return _pool
@@ -42,6 +42,21 @@ describe('API Client', () => {
       );
     });
 
+    it('should include cursor params', async () => {
+      const mockResponse = { videos: [], limit: 20, next_cursor: null };
+      (global.fetch as jest.Mock).mockResolvedValue({
+        ok: true,
+        json: async () => mockResponse,
+      });
+
+      const { fetchVideos } = await import('../src/lib/api');
+      await fetchVideos({ cursor: 'abc', include_total: true });
+
+      expect(global.fetch).toHaveBeenCalledWith(
+        expect.stringContaining('cursor=abc&include_total=true')
+      );
+    });
+
     it('should throw on non-ok response', async () => {
       (global.fetch as jest.Mock).mockResolvedValue({
         ok: false,
@@ -52,4 +67,57 @@ describe('API Client', () => {
       await expect(fetchVideos()).rejects.toThrow('Failed to fetch videos');
     });
   });
+
+  describe('parseSSE', () => {
+    it('should split complete events and keep the remainder', async () => {
+      const { parseSSE } = await import('../src/lib/api');
+      const { events, rest } = parseSSE(
+        'event: delta\ndata: {"content":"Hi"}\n\nevent: done\ndata: {"con'
+      );
+
+      expect(events).toEqual([{ event: 'delta', data: '{"content":"Hi"}' }]);
+      expect(rest).toBe('event: done\ndata: {"con');
+    });
+  });
+
+  describe('streamChatMessage', () => {
+    const streamOf = (text: string) =>
+      new ReadableStream({
+        start(controller) {
+          controller.enqueue(new TextEncoder().encode(text));
+          controller.close();
+        },
+      });
+
+    it('should mark a reply cut off after partial output as incomplete', async () => {
+      (global.fetch as jest.Mock).mockResolvedValue({
+        ok: true,
+        body: streamOf(
+          'event: delta\ndata: {"content":"Hal"}\n\n' +
+            'event: error\ndata: {"detail":"Model timed out"}\n\n' +
+            'event: done\ndata: {"role":"assistant","content":"Hal","created_at":"t"}\n\n'
+        ),
+      });
+
+      const { streamChatMessage } = await import('../src/lib/api');
+      const onDelta = jest.fn();
+      const reply = await streamChatMessage(1, 'hi', onDelta);
+
+      expect(onDelta).toHaveBeenCalledWith('Hal');
+      expect(reply.incomplete).toBe(true);
+    });
+
+    it('should throw with the partial text when the stream just stops', async () => {
+      (global.fetch as jest.Mock).mockResolvedValue({
+        ok: true,
+        body: streamOf('event: delta\ndata: {"content":"Hal"}\n\n'),
+      });
+
+      const { streamChatMessage, ChatStreamError } = await import('../src/lib/api');
+      const result = streamChatMessage(1, 'hi', () => {});
+
+      await expect(result).rejects.toBeInstanceOf(ChatStreamError);
+      await expect(result).rejects.toMatchObject({ partial: 'Hal' });
+    });
+  });
 });
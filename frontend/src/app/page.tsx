@@ -1,15 +1,20 @@
 'use client';
 
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { Search, Heart, RefreshCw, Loader2 } from 'lucide-react';
-import { fetchVideos, Video } from '@/lib/api';
+import { fetchVideos, VideoSummary } from '@/lib/api';
 import { VideoCard } from '@/components/VideoCard';
 import { cn } from '@/lib/utils';
 
+const PAGE_SIZE = 30;
+
 export default function HomePage() {
-  const [videos, setVideos] = useState<Video[]>([]);
+  const [videos, setVideos] = useState<VideoSummary[]>([]);
   const [total, setTotal] = useState(0);
   const [isLoading, setIsLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+  const sentinelRef = useRef<HTMLDivElement>(null);
   const [searchQuery, setSearchQuery] = useState('');
   const [favoritesOnly, setFavoritesOnly] = useState(false);
   const [selectedTag, setSelectedTag] = useState<string | null>(null);
@@ -21,10 +26,12 @@ export default function HomePage() {
         search: searchQuery || undefined,
         favorites_only: favoritesOnly,
         tag: selectedTag || undefined,
-        limit: 50,
+        limit: PAGE_SIZE,
+        include_total: true,
       });
       setVideos(data.videos);
-      setTotal(data.total);
+      setTotal(data.total ?? data.videos.length);
+      setNextCursor(data.next_cursor);
     } catch (error) {
       console.error('Failed to load videos:', error);
     } finally {
@@ -32,10 +39,44 @@ export default function HomePage() {
     }
   }, [searchQuery, favoritesOnly, selectedTag]);
 
+  // Infinite scroll: each page continues from the previous one's cursor
+  const loadMore = useCallback(async () => {
+    if (!nextCursor || isLoadingMore) return;
+    setIsLoadingMore(true);
+    try {
+      const data = await fetchVideos({
+        search: searchQuery || undefined,
+        favorites_only: favoritesOnly,
+        tag: selectedTag || undefined,
+        limit: PAGE_SIZE,
+        cursor: nextCursor,
+      });
+      setVideos((prev) => [...prev, ...data.videos]);
+      setNextCursor(data.next_cursor);
+    } catch (error) {
+      console.error('Failed to load more videos:', error);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  }, [nextCursor, isLoadingMore, searchQuery, favoritesOnly, selectedTag]);
+
   useEffect(() => {
     loadVideos();
   }, [loadVideos]);
 
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel || !nextCursor) return;
+    const observer = new IntersectionObserver(
+      (entries) => {
+        if (entries[0].isIntersecting) loadMore();
+      },
+      { rootMargin: '400px' }
+    );
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [loadMore, nextCursor]);
+
   // Collect all unique tags
   const allTags = Array.from(
     new Set(videos.flatMap((v) => [...v.hashtags, ...v.manual_tags]))
@@ -133,6 +174,11 @@ export default function HomePage() {
                 <VideoCard key={video.id} video={video} onFavoriteChange={loadVideos} />
               ))}
             </div>
+            {nextCursor && (
+              <div ref={sentinelRef} className="flex items-center justify-center py-6">
+                {isLoadingMore && <Loader2 className="w-6 h-6 animate-spin text-primary-500" />}
+              </div>
+            )}
           </>
         )}
       </main>
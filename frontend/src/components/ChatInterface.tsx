@@ -1,8 +1,8 @@
 'use client';
 
 import { useState, useEffect, useRef } from 'react';
-import { Send, Loader2 } from 'lucide-react';
-import { fetchChatHistory, sendChatMessage, ChatMessage } from '@/lib/api';
+import { Send, Loader2, RotateCcw } from 'lucide-react';
+import { fetchChatHistory, streamChatMessage, ChatMessage, ChatStreamError } from '@/lib/api';
 import { cn } from '@/lib/utils';
 
 interface ChatInterfaceProps {
@@ -27,34 +27,57 @@ export function ChatInterface({ videoId }: ChatInterfaceProps) {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   }, [messages]);
 
+  const [lastMessage, setLastMessage] = useState('');
+  // The last exchange failed before the server saved it
+  const [unsaved, setUnsaved] = useState(false);
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!input.trim() || isLoading) return;
 
     const userMessage = input.trim();
     setInput('');
+    await send(userMessage);
+  };
+
+  const retry = () => {
+    // Drop the failed exchange the server never saved so it isn't shown twice
+    if (unsaved) setMessages((prev) => prev.slice(0, -2));
+    send(lastMessage);
+  };
+
+  const send = async (userMessage: string) => {
+    setLastMessage(userMessage);
+    setUnsaved(false);
     setMessages((prev) => [
       ...prev,
       { role: 'user', content: userMessage, created_at: new Date().toISOString() },
     ]);
     setIsLoading(true);
 
-    try {
-      const response = await sendChatMessage(videoId, userMessage);
+    // Placeholder the streamed answer is written into
+    const replaceAssistant = (content: string, incomplete = false) =>
       setMessages((prev) => [
-        ...prev,
-        { role: 'assistant', content: response.content, created_at: new Date().toISOString() },
+        ...prev.slice(0, -1),
+        { role: 'assistant', content, created_at: new Date().toISOString(), incomplete },
       ]);
+    setMessages((prev) => [
+      ...prev,
+      { role: 'assistant', content: '', created_at: new Date().toISOString() },
+    ]);
+
+    let streamed = '';
+    try {
+      const response = await streamChatMessage(videoId, userMessage, (text) => {
+        streamed += text;
+        replaceAssistant(streamed);
+      });
+      replaceAssistant(response.content, response.incomplete);
     } catch (error) {
       console.error('Failed to send message:', error);
-      setMessages((prev) => [
-        ...prev,
-        {
-          role: 'assistant',
-          content: 'Sorry, I encountered an error. Please try again.',
-          created_at: new Date().toISOString(),
-        },
-      ]);
+      const partial = error instanceof ChatStreamError ? error.partial : streamed;
+      replaceAssistant(partial || 'Sorry, I encountered an error. Please try again.', true);
+      setUnsaved(true);
     } finally {
       setIsLoading(false);
     }
@@ -77,7 +100,7 @@ export function ChatInterface({ videoId }: ChatInterfaceProps) {
             Ask questions about this video to research further...
           </p>
         )}
-        {messages.map((msg, i) => (
+        {messages.map((msg, i) => msg.content && (
           <div
             key={i}
             className={cn(
@@ -88,9 +111,20 @@ export function ChatInterface({ videoId }: ChatInterfaceProps) {
             )}
           >
             <p className="text-sm whitespace-pre-wrap">{msg.content}</p>
+            {msg.incomplete && i === messages.length - 1 && (
+              <button
+                type="button"
+                onClick={retry}
+                disabled={isLoading || !lastMessage}
+                className="mt-2 flex items-center gap-1 text-xs text-amber-600 hover:underline disabled:opacity-50"
+              >
+                <RotateCcw className="w-3 h-3" />
+                Response incomplete - retry
+              </button>
+            )}
           </div>
         ))}
-        {isLoading && (
+        {isLoading && !messages[messages.length - 1]?.content && (
           <div className="flex items-center gap-2 text-gray-500">
             <Loader2 className="w-4 h-4 animate-spin" />
             <span className="text-sm">Thinking...</span>
@@ -2,12 +2,12 @@
 
 import { Heart, ExternalLink, Eye, ThumbsUp } from 'lucide-react';
 import Link from 'next/link';
-import { Video, toggleFavorite } from '@/lib/api';
+import { VideoSummary, toggleFavorite } from '@/lib/api';
 import { formatDate, formatNumber, cn } from '@/lib/utils';
 import { useState } from 'react';
 
 interface VideoCardProps {
-  video: Video;
+  video: VideoSummary;
   onFavoriteChange?: () => void;
 }
 
@@ -29,17 +29,37 @@ export interface Video {
   processed_at: string | null;
 }
 
+type HeavyField =
+  | 'description'
+  | 'transcript'
+  | 'investment_analysis'
+  | 'product_analysis'
+  | 'content_analysis'
+  | 'knowledge_analysis';
+
+/** Default list row: heavy columns are left out, lens summaries come instead */
+export type VideoSummary = Omit<Video, HeavyField> & {
+  summaries: Record<'investment' | 'product' | 'content' | 'knowledge', string | null>;
+  /** Highlighted match, present on search results */
+  snippet?: string;
+};
+
 export interface VideosResponse {
-  videos: Video[];
-  total: number;
-  skip: number;
+  videos: VideoSummary[];
+  /** Only present when include_total is set */
+  total?: number;
+  skip?: number;
   limit: number;
+  /** Pass as `cursor` to load the next page; null on the last page */
+  next_cursor: string | null;
 }
 
 export interface ChatMessage {
   role: 'user' | 'assistant';
   content: string;
   created_at: string;
+  /** Set on a streamed reply that was cut off by an error */
+  incomplete?: boolean;
 }
 
 export async function fetchVideos(params?: {
@@ -48,6 +68,8 @@ export async function fetchVideos(params?: {
   favorites_only?: boolean;
   search?: string;
   tag?: string;
+  cursor?: string;
+  include_total?: boolean;
 }): Promise<VideosResponse> {
   const searchParams = new URLSearchParams();
   if (params?.skip) searchParams.set('skip', String(params.skip));
@@ -55,6 +77,8 @@ export async function fetchVideos(params?: {
   if (params?.favorites_only) searchParams.set('favorites_only', 'true');
   if (params?.search) searchParams.set('search', params.search);
   if (params?.tag) searchParams.set('tag', params.tag);
+  if (params?.cursor) searchParams.set('cursor', params.cursor);
+  if (params?.include_total) searchParams.set('include_total', 'true');
 
   const res = await fetch(`${API_BASE}/api/videos?${searchParams}`);
   if (!res.ok) throw new Error('Failed to fetch videos');
@@ -100,3 +124,85 @@ export async function sendChatMessage(videoId: number, message: string): Promise
   if (!res.ok) throw new Error('Failed to send message');
   return res.json();
 }
+
+/**
+ * Split a Server-Sent Events buffer into complete events.
+ * Returns the parsed events and the unfinished remainder of the buffer.
+ */
+export function parseSSE(buffer: string): {
+  events: { event: string; data: string }[];
+  rest: string;
+} {
+  const blocks = buffer.replace(/\r\n/g, '\n').split('\n\n');
+  const rest = blocks.pop() ?? '';
+  const events = blocks
+    .map((block) => {
+      let event = 'message';
+      const data: string[] = [];
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data.push(line.slice(5).trimStart());
+      }
+      return { event, data: data.join('\n') };
+    })
+    .filter((e) => e.data);
+  return { events, rest };
+}
+
+/** A chat stream that failed; partial holds the text received before the failure. */
+export class ChatStreamError extends Error {
+  constructor(message: string, public partial: string) {
+    super(message);
+    this.name = 'ChatStreamError';
+  }
+}
+
+/**
+ * Send a chat message and receive the answer as it is generated.
+ * onDelta is called with each new piece of text; resolves with the saved message.
+ * If the stream fails after some text arrived, the saved partial reply is
+ * returned with incomplete set; otherwise a ChatStreamError is thrown,
+ * carrying any partial text.
+ */
+export async function streamChatMessage(
+  videoId: number,
+  message: string,
+  onDelta: (text: string) => void
+): Promise<ChatMessage> {
+  const res = await fetch(`${API_BASE}/api/videos/${videoId}/chat/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify({ message }),
+  });
+  if (!res.ok || !res.body) throw new Error('Failed to send message');
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let partial = '';
+  let error: string | null = null;
+
+  while (true) {
+    const { done, value } = await reader.read();
+    buffer += decoder.decode(value, { stream: !done });
+    const { events, rest } = parseSSE(done ? buffer + '\n\n' : buffer);
+    buffer = rest;
+
+    for (const { event, data } of events) {
+      const payload = JSON.parse(data);
+      if (event === 'delta') {
+        partial += payload.content;
+        onDelta(payload.content);
+      } else if (event === 'done') {
+        return error ? { ...payload, incomplete: true } : payload;
+      } else if (event === 'error') {
+        const detail: string = payload.detail || 'Failed to send message';
+        error = detail;
+        // With partial output the server still saves and sends the reply
+        if (!partial) throw new ChatStreamError(detail, partial);
+      }
+    }
+    if (done) break;
+  }
+  throw new ChatStreamError(error ?? 'Chat stream ended unexpectedly', partial);
+}